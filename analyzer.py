@@ -7,16 +7,32 @@ import os
 import re
 import json
 import time
+import shelve
+import hashlib
 import logging
 import threading
+import weakref
+import shutil
 import atexit
+import itertools
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from typing import Dict, List, Set, Any, Tuple, Optional, Union
 
 from PySide6.QtCore import QObject, Signal, Slot, QThread
 
-from project_model import ProjectModel, ProjectFolder, CodeFile
+from project_model import Project as ProjectModel
 from api_clients import APIConfig, BaseAPIClient, get_api_client
-from utils import read_file, save_json, write_file
+from utils import (
+    read_file, read_file_bytes, decode_content, load_json, save_json, write_file, severity_sort_key
+)
+from local_analysis import (
+    LocalAnalyzer, LocalSecurityAnalyzer, _LOCAL_ANALYZERS, _detect_language,
+    _local_analyzer_name, _init_analysis_worker, _analyze_one, _analyze_in_worker
+)
 
 logger = logging.getLogger("CodeAnalyzer.Analyzer")
 
@@ -24,335 +40,75 @@ logger = logging.getLogger("CodeAnalyzer.Analyzer")
 class APIThreadManager:
     """مدير خيوط API للتأكد من إيقافها عند إغلاق البرنامج"""
     
-    _threads = set()
+    # مراجع ضعيفة حتى لا يبقي المدير الخيوط المنتهية في الذاكرة
+    _threads = weakref.WeakSet()
+    _lock = threading.Lock()
     
     @classmethod
     def register_thread(cls, thread):
         """تسجيل خيط جديد"""
-        cls._threads.add(thread)
+        with cls._lock:
+            cls._threads.add(thread)
     
     @classmethod
     def unregister_thread(cls, thread):
         """إلغاء تسجيل خيط"""
-        if thread in cls._threads:
-            cls._threads.remove(thread)
+        with cls._lock:
+            cls._threads.discard(thread)
     
     @classmethod
     def stop_all_threads(cls):
-        """إيقاف جميع الخيوط النشطة"""
-        for thread in list(cls._threads):
-            if thread.isRunning():
-                thread.terminate()
-                thread.wait(1000)  # انتظار ثانية كحد أقصى
-            cls.unregister_thread(thread)
-
-# تسجيل دالة لإيقاف جميع الخيوط عند إغلاق البرنامج
-atexit.register(APIThreadManager.stop_all_threads)
-
-class LocalAnalyzer:
-    """محلل الشيفرة البرمجية محلي بدون API"""
-    
-    def __init__(self):
-        # القواعد البسيطة للتحليل المحلي
-        self.rules = {
-            "python": [
-                {
-                    "pattern": r"print\(",
-                    "message": "استخدام print في كود الإنتاج",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"except\s*:",
-                    "message": "استخدام except العام بدون تحديد نوع الاستثناء",
-                    "severity": "متوسطة"
-                },
-                {
-                    "pattern": r"import\s+\*",
-                    "message": "استيراد كل الوحدات من حزمة (يفضل تحديد الوحدات المطلوبة)",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"^\s*#\s*TODO",
-                    "message": "تعليق TODO موجود",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"exec\(",
-                    "message": "استخدام exec لتنفيذ كود ديناميكي (خطر أمني محتمل)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"os\.system\(",
-                    "message": "استخدام os.system لتنفيذ أوامر النظام (خطر أمني محتمل)",
-                    "severity": "عالية"
-                }
-            ],
-            "php": [
-                {
-                    "pattern": r"mysql_",
-                    "message": "استخدام دوال mysql_ المهملة",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"echo\s+\$_",
-                    "message": "عرض متغيرات $_GET أو $_POST أو $_REQUEST مباشرة (خطر XSS)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"eval\(\$",
-                    "message": "استخدام eval على متغير (خطر أمني)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"SELECT.+FROM.+WHERE.+\$_",
-                    "message": "استخدام متغيرات $_GET أو $_POST في استعلام SQL (خطر SQL Injection)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"\bdie\(",
-                    "message": "استخدام die() في كود الإنتاج",
-                    "severity": "متوسطة"
-                }
-            ],
-            "javascript": [
-                {
-                    "pattern": r"console\.log\(",
-                    "message": "استخدام console.log في كود الإنتاج",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"localStorage\.",
-                    "message": "استخدام localStorage بدون تحقق من توفره",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"document\.write\(",
-                    "message": "استخدام document.write (ممارسة سيئة)",
-                    "severity": "متوسطة"
-                },
-                {
-                    "pattern": r"eval\(",
-                    "message": "استخدام eval (خطر أمني)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"new\s+Function\(",
-                    "message": "استخدام Function constructor (مماثل لـ eval)",
-                    "severity": "عالية"
-                }
-            ],
-            "dart": [
-                {
-                    "pattern": r"print\(",
-                    "message": "استخدام print في كود الإنتاج",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"TODO",
-                    "message": "تعليق TODO موجود",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"setState\(\(\)\s*=>",
-                    "message": "استخدام setState قد يكون غير ضروري، فكر في استخدام StatefulBuilder",
-                    "severity": "منخفضة"
-                }
-            ],
-            "flutter": [
-                {
-                    "pattern": r"debugPrint\(",
-                    "message": "استخدام debugPrint في كود الإنتاج",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"TODO",
-                    "message": "تعليق TODO موجود",
-                    "severity": "منخفضة"
-                }
-            ],
-            "laravel_php": [
-                {
-                    "pattern": r"Route::.*",
-                    "message": "تحقق من أمان نقاط النهاية في Laravel",
-                    "severity": "متوسطة"
-                }
-            ],
-            "css": [
-                {
-                    "pattern": r"!important",
-                    "message": "استخدام !important (تجنب استخدامها إلا عند الضرورة)",
-                    "severity": "منخفضة"
-                }
-            ],
-            "html": [
-                {
-                    "pattern": r"<img[^>]+>",
-                    "message": "تحقق من وجود بديل نصي alt للصورة",
-                    "severity": "منخفضة"
-                },
-                {
-                    "pattern": r"<a[^>]*>",
-                    "message": "تحقق من وجود عنوان مناسب لرابط التنقل",
-                    "severity": "منخفضة"
-                }
-            ]
-        }
-    
-    def analyze_file(self, file_path: str, content: str) -> List[Dict[str, Any]]:
-        """تحليل ملف وإرجاع قائمة بالمشاكل"""
-        language = self._detect_language(file_path)
-        if not language or language not in self.rules:
-            return []
+        """
+        إيقاف جميع الخيوط النشطة عند الخروج
         
-        issues = []
-        lines = content.split('\n')
+        لا تُنهى الخيوط قسراً (terminate) لأن ذلك قد يتركها في منتصف كتابة ملف أو
+        ممسكة بقفل، وإنما يُطلب إنهاؤها وتُسجل الخيوط التي لم تنته خلال المهلة.
+        """
+        for thread in cls.cleanup_all_threads(timeout_ms=1000):
+            logger.warning(f"لم ينته الخيط {type(thread).__name__} قبل الخروج")
+    
+    @classmethod
+    def cleanup_all_threads(cls, timeout_ms: int = 2000) -> list:
+        """
+        طلب إنهاء جميع الخيوط النشطة ثم انتظارها معاً (بمهلة إجمالية timeout_ms)
         
-        for rule in self.rules[language]:
-            pattern = rule["pattern"]
-            
-            for i, line in enumerate(lines):
-                if re.search(pattern, line):
-                    issues.append({
-                        "file": file_path,
-                        "line": i + 1,
-                        "severity": rule["severity"],
-                        "message": rule["message"],
-                        "code": line.strip(),
-                        "type": "quality"  # إضافة نوع المشكلة
-                    })
+        Returns:
+            الخيوط التي لم تنته خلال المهلة
+        """
+        with cls._lock:
+            threads = [thread for thread in cls._threads if thread.isRunning()]
         
-        return issues
-    
-    def _detect_language(self, file_path: str) -> Optional[str]:
-        """تحديد لغة البرمجة من امتداد الملف"""
-        ext = os.path.splitext(file_path)[1].lower()
+        # طلب الإنهاء من جميع الخيوط أولاً حتى تنتهي بالتوازي
+        # (الخيوط التي لا تملك حلقة أحداث مثل AnalysisThread تُلغى عبر abort)
+        for thread in threads:
+            thread.requestInterruption()
+            thread.quit()
+            abort = getattr(thread, "abort", None)
+            if callable(abort):
+                abort()
         
-        if ext == '.py':
-            return "python"
-        elif ext == '.php':
-            return "php"
-        elif ext in ['.js', '.jsx', '.ts', '.tsx']:
-            return "javascript"
-        elif ext == '.dart':
-            return "dart"
-        elif ext in ['.css', '.scss', '.sass']:
-            return "css"
-        elif ext in ['.html', '.htm']:
-            return "html"
+        deadline = time.monotonic() + timeout_ms / 1000
+        remaining = []
+        for thread in threads:
+            wait_ms = max(0, int((deadline - time.monotonic()) * 1000))
+            if thread.wait(wait_ms):
+                cls.unregister_thread(thread)
+            else:
+                remaining.append(thread)
         
-        return None
+        return remaining
+
+# تسجيل دالة لإيقاف جميع الخيوط عند إغلاق البرنامج
+atexit.register(APIThreadManager.stop_all_threads)
 
 
-class SecurityAnalyzer:
+class SecurityAnalyzer(LocalSecurityAnalyzer):
     """محلل الثغرات الأمنية"""
     
-    def __init__(self, api_config: APIConfig):
+    def __init__(self, api_config: Optional[APIConfig] = None):
+        super().__init__()
+        # التحليل المحلي لا يحتاج إلى إعدادات API (تستخدم في analyze_with_api فقط)
         self.api_config = api_config
-        self.local_rules = {
-            "php": [
-                {
-                    "pattern": r"\$_(?:GET|POST|REQUEST|COOKIE)\[['\"][^'\"]+['\"]\]",
-                    "message": "استخدام متغيرات $_GET/$_POST/$_REQUEST دون تنظيف (خطر XSS)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"echo\s+\$_",
-                    "message": "عرض متغيرات HTTP دون تنظيف (خطر XSS)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"mysqli_query\s*\(\s*\$[^,]+,\s*[\"']SELECT.+\$_",
-                    "message": "استخدام استعلام SQL مع متغيرات HTTP (SQL Injection)",
-                    "severity": "عالية"
-                }
-            ],
-            "python": [
-                {
-                    "pattern": r"os\.system\s*\(|subprocess\.call\s*\(|subprocess\.Popen\s*\(",
-                    "message": "استخدام أوامر النظام مع مدخلات المستخدم (خطر Remote Code Execution)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"eval\s*\(|exec\s*\(",
-                    "message": "استخدام eval/exec مع مدخلات المستخدم (خطر Code Injection)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"open\s*\([^,]+,\s*['\"]w['\"]",
-                    "message": "فتح ملف للكتابة مع مدخلات المستخدم (خطر Path Traversal)",
-                    "severity": "متوسطة"
-                },
-                {
-                    "pattern": r"flask.*send_file\(",
-                    "message": "تحقق من مسار الملف في send_file لتجنب Path Traversal",
-                    "severity": "متوسطة"
-                },
-                {
-                    "pattern": r"flask.*render_template\([^,]+\+",
-                    "message": "استخدام مدخلات المستخدم في مسار القالب (خطر Template Injection)",
-                    "severity": "عالية"
-                }
-            ],
-            "javascript": [
-                {
-                    "pattern": r"eval\s*\(|new\s+Function\s*\(",
-                    "message": "استخدام eval أو Function constructor (خطر XSS)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"innerHTML\s*=|document\.write\s*\(",
-                    "message": "استخدام innerHTML أو document.write مع مدخلات المستخدم (خطر XSS)",
-                    "severity": "عالية"
-                },
-                {
-                    "pattern": r"localStorage\.|sessionStorage\.",
-                    "message": "تخزين بيانات حساسة في localStorage/sessionStorage",
-                    "severity": "متوسطة"
-                },
-                {
-                    "pattern": r"location\.(href|replace|assign)\s*=",
-                    "message": "توجيه URL غير آمن (خطر Open Redirect)",
-                    "severity": "متوسطة"
-                }
-            ],
-            "html": [
-                {
-                    "pattern": r"<form[^>]*method=['\"]get['\"]",
-                    "message": "استخدام GET في النماذج للبيانات الحساسة (غير آمن)",
-                    "severity": "متوسطة"
-                },
-                {
-                    "pattern": r"<input[^>]*type=['\"]password['\"][^>]*autocomplete=['\"]off['\"]",
-                    "message": "منع الملء التلقائي للكلمات السرية قد لا يعمل في كل المتصفحات",
-                    "severity": "منخفضة"
-                }
-            ]
-        }
-    
-    def analyze_file(self, file_path: str, content: str) -> List[Dict[str, Any]]:
-        """تحليل ملف للثغرات الأمنية محلياً"""
-        language = self._detect_language(file_path)
-        if not language or language not in self.local_rules:
-            return []
-        
-        issues = []
-        lines = content.split('\n')
-        
-        for rule in self.local_rules[language]:
-            pattern = rule["pattern"]
-            
-            for i, line in enumerate(lines):
-                if re.search(pattern, line):
-                    issues.append({
-                        "file": file_path,
-                        "line": i + 1,
-                        "severity": rule["severity"],
-                        "message": rule["message"],
-                        "code": line.strip(),
-                        "type": "security"  # تحديد نوع المشكلة
-                    })
-        
-        return issues
     
     def analyze_with_api(self, file_path: str, content: str) -> List[Dict[str, Any]]:
         """تحليل ملف للثغرات الأمنية باستخدام API"""
@@ -384,21 +140,6 @@ class SecurityAnalyzer:
         except Exception as e:
             logger.error(f"خطأ في تحليل الأمان باستخدام API: {str(e)}")
             return []
-    
-    def _detect_language(self, file_path: str) -> Optional[str]:
-        """تحديد لغة البرمجة من امتداد الملف"""
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        if ext == '.py':
-            return "python"
-        elif ext == '.php':
-            return "php"
-        elif ext in ['.js', '.jsx', '.ts', '.tsx']:
-            return "javascript"
-        elif ext in ['.html', '.htm']:
-            return "html"
-        
-        return None
 
 
 class CodeQualityAnalyzer:
@@ -440,22 +181,216 @@ class CodeQualityAnalyzer:
     
     def _detect_language(self, file_path: str) -> Optional[str]:
         """تحديد لغة البرمجة من امتداد الملف"""
-        ext = os.path.splitext(file_path)[1].lower()
+        return _detect_language(file_path)
+
+
+# أقل عدد من الملفات يستحق توزيع التحليل على عدة عمال
+_PARALLEL_MIN_FILES = 32
+
+# أقل عدد من الملفات يستحق توزيع التحليل المحلي على عمليات منفصلة
+# (بدء العمليات أول مرة أبطأ بكثير من فحص عدد قليل من الملفات)
+_PROCESS_MIN_FILES = 500
+
+# الحد الأقصى للطلبات المتزامنة عند استخدام محللات API
+_API_MAX_WORKERS = 4
+
+# عدد عمليات التحليل المحلي
+_ANALYSIS_WORKERS = os.cpu_count() or 1
+
+# عدد دفعات الملفات لكل عملية (دفعات أكبر تقلل تكلفة التواصل بين العمليات)
+_CHUNKS_PER_WORKER = 4
+
+_analysis_executor = None
+_analysis_executor_lock = threading.Lock()
+
+
+def _get_analysis_executor() -> ProcessPoolExecutor:
+    """الحصول على مجمع عمليات التحليل المشترك (يُنشأ عند أول استخدام ويبقى طوال عمر البرنامج)"""
+    global _analysis_executor
+    with _analysis_executor_lock:
+        if _analysis_executor is None:
+            _analysis_executor = ProcessPoolExecutor(
+                max_workers=_ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_analysis_worker
+            )
+        return _analysis_executor
+
+
+def shutdown_analysis_executor():
+    """إيقاف مجمع عمليات التحليل المشترك وإلغاء المهام التي لم تبدأ"""
+    global _analysis_executor
+    with _analysis_executor_lock:
+        if _analysis_executor is not None:
+            _analysis_executor.shutdown(wait=False, cancel_futures=True)
+            _analysis_executor = None
+
+
+atexit.register(shutdown_analysis_executor)
+
+
+# الحد الأقصى لعدد إشارات التقدم خلال التحليل الواحد
+_PROGRESS_UPDATES = 200
+
+# عدد خيوط القراءة المسبقة لمحتوى الملفات
+_PREFETCH_WORKERS = 8
+
+# الحد الأقصى للملفات المقروءة مسبقاً في الذاكرة
+_PREFETCH_DEPTH = 32
+
+# مسار ذاكرة التخزين المؤقت لنتائج التحليل المحلي
+_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".code_analyzer", "cache", "analysis")
+
+# إصدار منطق التحليل المحلي ضمن مفاتيح الذاكرة المؤقتة (يُزاد عند تغيير طريقة الفحص
+# حتى تُبطل النتائج القديمة؛ تغيير القواعد نفسها يبطلها تلقائياً عبر rules_digest)
+_CACHE_VERSION = 2
+
+# الحد الأقصى لعدد النتائج المخزنة مؤقتاً، وأقصى عمر للنتيجة (بالثواني)
+_CACHE_MAX_ENTRIES = 20000
+_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# أقل فترة بين عمليتي تنظيف للذاكرة المؤقتة عند فتحها (بالثواني)
+_CACHE_PRUNE_INTERVAL = 24 * 3600
+
+# مفتاح البيانات الوصفية للذاكرة المؤقتة (وقت آخر تنظيف)
+_CACHE_META_KEY = "__meta__"
+
+
+def _content_digest(data: bytes) -> str:
+    """حساب بصمة محتوى الملف"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class AnalysisCache:
+    """
+    ذاكرة تخزين مؤقت على القرص لنتائج التحليل المحلي حسب بصمة محتوى الملف
+    
+    تُخزن كل نتيجة مع وقت تخزينها، وتُحذف النتائج الأقدم من max_age، ولا يُحتفظ
+    بأكثر من max_entries نتيجة (الأحدث استخداماً). يُجدد وقت النتيجة عند قراءتها
+    إذا تجاوزت نصف عمرها الأقصى.
+    """
+    
+    def __init__(self, cache_file: str = _CACHE_FILE, max_entries: int = _CACHE_MAX_ENTRIES,
+                 max_age: float = _CACHE_MAX_AGE):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._db = None
+    
+    def open(self) -> bool:
+        """فتح ملف ذاكرة التخزين المؤقت (مع تنظيفه إذا لزم الأمر)"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            self._db = shelve.open(self.cache_file)
+        except Exception as e:
+            logger.error(f"خطأ في فتح ذاكرة التخزين المؤقت للتحليل: {str(e)}")
+            self._db = None
+            return False
         
-        if ext == '.py':
-            return "python"
-        elif ext == '.php':
-            return "php"
-        elif ext in ['.js', '.jsx', '.ts', '.tsx']:
-            return "javascript"
-        elif ext == '.dart':
-            return "dart"
-        elif ext in ['.html', '.htm']:
-            return "html"
-        elif ext in ['.css', '.scss', '.sass']:
-            return "css"
+        try:
+            self._prune_if_needed()
+        except Exception as e:
+            logger.error(f"خطأ في تنظيف ذاكرة التخزين المؤقت للتحليل: {str(e)}")
+        return self._db is not None
+    
+    def _prune_if_needed(self):
+        """تنظيف الذاكرة المؤقتة إذا تجاوزت الحد الأقصى للنتائج أو مضت فترة التنظيف"""
+        meta = self._db.get(_CACHE_META_KEY) or {}
+        now = time.time()
+        if (len(self._db) <= self.max_entries + 1
+                and now - meta.get("pruned_at", 0) < _CACHE_PRUNE_INTERVAL):
+            return
+        
+        # الاحتفاظ بنتائج الإصدار الحالي غير المنتهية فقط، والأحدث منها أولاً
+        prefix = f"v{_CACHE_VERSION}:"
+        entries = []
+        for key in list(self._db.keys()):
+            if not key.startswith(prefix):
+                continue
+            try:
+                stored_at, issues = self._db[key]
+            except Exception:
+                continue
+            if now - stored_at <= self.max_age:
+                entries.append((stored_at, key, issues))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        del entries[self.max_entries:]
+        
+        # إعادة إنشاء الملف بدلاً من حذف المفاتيح، لأن dbm لا يستعيد مساحة المدخلات المحذوفة
+        self._db.close()
+        self._db = None
+        self._db = shelve.open(self.cache_file, flag="n")
+        for stored_at, key, issues in entries:
+            self._db[key] = (stored_at, issues)
+        self._db[_CACHE_META_KEY] = {"pruned_at": now}
+    
+    def close(self):
+        """إغلاق ملف ذاكرة التخزين المؤقت"""
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception as e:
+                logger.error(f"خطأ في إغلاق ذاكرة التخزين المؤقت للتحليل: {str(e)}")
+            self._db = None
+    
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """الحصول على النتائج المخزنة لمفتاح معين"""
+        if self._db is None:
+            return None
+        try:
+            db_key = f"v{_CACHE_VERSION}:{key}"
+            entry = self._db.get(db_key)
+            if entry is None:
+                return None
+            
+            stored_at, issues = entry
+            age = time.time() - stored_at
+            if age > self.max_age:
+                return None
+            if age > self.max_age / 2:
+                self._db[db_key] = (time.time(), issues)
+            return issues
+        except Exception as e:
+            logger.error(f"خطأ في القراءة من ذاكرة التخزين المؤقت للتحليل: {str(e)}")
+            return None
+    
+    def set(self, key: str, issues: List[Dict[str, Any]]):
+        """تخزين نتائج تحليل ملف"""
+        if self._db is None:
+            return
+        try:
+            self._db[f"v{_CACHE_VERSION}:{key}"] = (time.time(), issues)
+        except Exception as e:
+            logger.error(f"خطأ في الكتابة إلى ذاكرة التخزين المؤقت للتحليل: {str(e)}")
+
+
+def _file_data(file_info: Dict[str, Any]) -> Optional[bytes]:
+    """الحصول على محتوى الملف كبايتات، مع قراءته من القرص دون فك ترميزه إذا لم يكن متوفراً"""
+    content = file_info.get("content")
+    if content is not None:
+        return content.encode("utf-8")
+    return read_file_bytes(file_info["path"])
+
+
+def _prefetch_contents(files):
+    """قراءة محتوى الملفات كبايتات مسبقاً في خيوط منفصلة وإرجاع (رقم الملف، معلومات الملف، البايتات) بالترتيب"""
+    with ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS) as executor:
+        pending = deque()
+        try:
+            for index, file_info in files:
+                pending.append((index, file_info, executor.submit(_file_data, file_info)))
+                if len(pending) >= _PREFETCH_DEPTH:
+                    index, file_info, future = pending.popleft()
+                    yield index, file_info, future.result()
+            
+            while pending:
+                index, file_info, future = pending.popleft()
+                yield index, file_info, future.result()
         
-        return None
+        finally:
+            # إلغاء القراءات المتبقية عند التوقف المبكر
+            for _, _, future in pending:
+                future.cancel()
 
 
 class AnalysisThread(QThread):
@@ -493,49 +428,43 @@ class AnalysisThread(QThread):
     def run(self):
         """تنفيذ التحليل"""
         try:
-            for i, file_info in enumerate(self.files_to_analyze):
-                # التحقق من طلب إلغاء التحليل
-                if self.abort_flag:
-                    break
-                    
-                file_path = file_info["path"]
-                content = file_info.get("content")
-                
-                # قراءة محتوى الملف إذا لم يتم توفيره
-                if content is None:
-                    content = read_file(file_path)
-                    if content is None:
-                        continue
+            total = len(self.files_to_analyze)
+            stats = self.results["stats"]
+            file_results = {}
+            severity_counter = Counter()
+            type_counter = Counter()
+            progress_step = max(1, total // _PROGRESS_UPDATES)
+            
+            for i, (index, file_issues) in enumerate(self._iter_file_issues()):
+                # إرسال إشارة التقدم على دفعات لتقليل الإشارات بين الخيوط
+                done = i + 1
+                if done % progress_step == 0 or done == total:
+                    self.analysis_progress.emit(done, total)
                 
-                # تحليل الملف باستخدام كل محلل
-                file_issues = []
-                for analyzer in self.analyzers:
-                    issues = analyzer.analyze_file(file_path, content)
-                    file_issues.extend(issues)
+                if file_issues is None:
+                    continue
                 
-                # إضافة المشاكل إلى النتائج
-                self.results["issues"].extend(file_issues)
+                file_results[index] = file_issues
                 
                 # تحديث الإحصائيات
-                self.results["stats"]["analyzed_files"] += 1
-                self.results["stats"]["total_issues"] += len(file_issues)
-                
-                for issue in file_issues:
-                    severity = issue.get("severity", "متوسطة")
-                    if severity in self.results["stats"]["severity_counts"]:
-                        self.results["stats"]["severity_counts"][severity] += 1
-                    
-                    issue_type = issue.get("type", "quality")
-                    if issue_type in self.results["stats"]["type_counts"]:
-                        self.results["stats"]["type_counts"][issue_type] += 1
-                
-                # إرسال إشارة التقدم
-                self.analysis_progress.emit(i + 1, len(self.files_to_analyze))
+                stats["analyzed_files"] += 1
+                stats["total_issues"] += len(file_issues)
+                severity_counter.update(issue.get("severity", "متوسطة") for issue in file_issues)
+                type_counter.update(issue.get("type", "quality") for issue in file_issues)
+            
+            # دمج عدادات الخطورة والنوع مع الإحصائيات المعروفة فقط
+            for severity in stats["severity_counts"]:
+                stats["severity_counts"][severity] += severity_counter[severity]
+            for issue_type in stats["type_counts"]:
+                stats["type_counts"][issue_type] += type_counter[issue_type]
+            
+            # إضافة المشاكل إلى النتائج دفعة واحدة بترتيب الملفات الأصلي
+            self.results["issues"] = list(itertools.chain.from_iterable(
+                file_results[index] for index in sorted(file_results)
+            ))
             
             # ترتيب المشاكل حسب الخطورة
-            self.results["issues"].sort(
-                key=lambda x: {"عالية": 0, "متوسطة": 1, "منخفضة": 2}.get(x.get("severity", "متوسطة"), 3)
-            )
+            self.results["issues"].sort(key=severity_sort_key)
             
             # إرسال إشارة اكتمال التحليل
             self.analysis_completed.emit(self.results)
@@ -544,9 +473,134 @@ class AnalysisThread(QThread):
             # إلغاء تسجيل الخيط عند الانتهاء
             APIThreadManager.unregister_thread(self)
     
+    def _iter_file_issues(self):
+        """تحليل الملفات وإرجاع (رقم الملف، المشاكل) بترتيب اكتمال التحليل"""
+        files = list(enumerate(self.files_to_analyze))
+        
+        # نتائج محللات API غير ثابتة، لذا لا تخزن إلا نتائج التحليل المحلي
+        if not all(isinstance(analyzer, _LOCAL_ANALYZERS) for analyzer in self.analyzers):
+            yield from self._analyze_files(files)
+            return
+        
+        cache = AnalysisCache()
+        if not cache.open():
+            yield from self._analyze_files(files)
+            return
+        
+        try:
+            analyzers_key = "|".join(
+                f"{analyzer.__class__.__name__}:{analyzer.rules_digest}" for analyzer in self.analyzers
+            )
+            
+            # الملفات غير المتغيرة تؤخذ نتائجها من الذاكرة المؤقتة مباشرة
+            pending = []
+            cache_keys = {}
+            for index, file_info, data in _prefetch_contents(files):
+                if self._should_stop():
+                    return
+                
+                if data is None:
+                    yield index, None
+                    continue
+                
+                file_path = file_info["path"]
+                key = f"{analyzers_key}:{_detect_language(file_path)}:{_content_digest(data)}"
+                cached = cache.get(key)
+                if cached is not None:
+                    yield index, [dict(issue, file=file_path) for issue in cached]
+                    continue
+                
+                # لا يُفك ترميز المحتوى إلا للملفات التي تحتاج إلى تحليل فعلي
+                content = file_info.get("content")
+                if content is None:
+                    content = decode_content(data)
+                
+                cache_keys[index] = key
+                pending.append((index, {"path": file_path, "content": content}))
+            
+            for index, file_issues in self._analyze_files(pending):
+                if file_issues is not None:
+                    cache.set(cache_keys[index], file_issues)
+                yield index, file_issues
+        
+        finally:
+            cache.close()
+    
+    def _analyze_files(self, files):
+        """تحليل قائمة من (رقم الملف، معلومات الملف) وإرجاع النتائج بترتيب اكتمال التحليل"""
+        local = all(isinstance(analyzer, _LOCAL_ANALYZERS) for analyzer in self.analyzers)
+        if local:
+            # العمليات المنفصلة لا تفيد التحليل المحلي إلا مع أكثر من معالج
+            parallel = _ANALYSIS_WORKERS > 1 and len(files) >= _PROCESS_MIN_FILES
+        else:
+            parallel = len(files) >= _PARALLEL_MIN_FILES
+        
+        if not parallel:
+            for index, file_info in files:
+                # التحقق من طلب إلغاء التحليل
+                if self._should_stop():
+                    return
+                yield index, _analyze_one(file_info, self.analyzers)
+            return
+        
+        if local:
+            # التحليل المحلي مقيد بالمعالج، لذا يوزع على عمليات منفصلة
+            yield from self._analyze_files_in_processes(files)
+            return
+        
+        # محللات API تقضي معظم وقتها في انتظار الشبكة، فتكفي الخيوط
+        executor = ThreadPoolExecutor(max_workers=_API_MAX_WORKERS)
+        analyze = partial(_analyze_one, analyzers=self.analyzers)
+        
+        try:
+            futures = {
+                executor.submit(analyze, file_info): index
+                for index, file_info in files
+            }
+            
+            for future in as_completed(futures):
+                # التحقق من طلب إلغاء التحليل
+                if self._should_stop():
+                    return
+                yield futures[future], future.result()
+        
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _analyze_files_in_processes(self, files):
+        """تحليل الملفات بالمحللات المحلية في مجمع العمليات المشترك، على دفعات وبترتيبها الأصلي"""
+        executor = _get_analysis_executor()
+        analyzer_names = tuple(_local_analyzer_name(analyzer) for analyzer in self.analyzers)
+        chunksize = max(1, len(files) // (_ANALYSIS_WORKERS * _CHUNKS_PER_WORKER))
+        results = executor.map(
+            partial(_analyze_in_worker, analyzer_names),
+            [file_info for _, file_info in files],
+            chunksize=chunksize
+        )
+        
+        try:
+            for (index, _), file_issues in zip(files, results):
+                # التحقق من طلب إلغاء التحليل
+                if self._should_stop():
+                    return
+                yield index, file_issues
+        
+        except BrokenProcessPool:
+            # توقفت إحدى العمليات بشكل غير متوقع: يعاد إنشاء المجمع في التحليل التالي
+            shutdown_analysis_executor()
+            raise
+        
+        finally:
+            # إلغاء الدفعات التي لم تبدأ عند التوقف المبكر
+            results.close()
+    
     def abort(self):
         """إلغاء التحليل"""
         self.abort_flag = True
+    
+    def _should_stop(self) -> bool:
+        """التحقق من طلب إلغاء التحليل (عبر abort أو requestInterruption)"""
+        return self.abort_flag or self.isInterruptionRequested()
 
 
 class AnalysisManager(QObject):
@@ -640,7 +694,7 @@ class AnalysisManager(QObject):
         
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         results_file = os.path.join(results_dir, f"analysis_results_{timestamp}.json")
-        save_json(results_file, results)
+        save_json(results, results_file)
         
         # إرسال إشارة اكتمال التحليل
         self.signal_analysis_completed.emit(results)
@@ -692,17 +746,104 @@ class AnalysisManager(QObject):
             return False
 
 
+# مهلة تجميع عمليات حفظ التعديلات المتتالية (بالثواني)
+_SAVE_DELAY = 0.2
+
+# الحد الأقصى لعدد الملفات التي تكتب تعديلاتها بالتوازي
+_WRITE_MAX_WORKERS = 16
+
+# المفاتيح المطلوبة في كل تعديل
+_REQUIRED_MODIFICATION_KEYS = frozenset(("file_path", "content", "description"))
+
+
 class ModificationsManager:
     """مدير التعديلات المقترحة"""
     
+    # المدراء الحاليون، لحفظ تعديلاتهم المؤجلة عند إغلاق البرنامج
+    _instances = weakref.WeakSet()
+    
     def __init__(self, project_model: ProjectModel):
         self.project_model = project_model
-        self.pending_modifications = []
-        self.applied_modifications = []
+        # التعديلات مفهرسة حسب المعرف (بترتيب الإضافة)
+        self.pending_modifications = {}
+        self.applied_modifications = {}
+        
+        # فهرس عكسي: مسار الملف -> معرفات التعديلات المعلقة له
+        self._pending_by_path = {}
+        
+        # الحفظ المؤجل: أسماء دوال الحفظ للملفات المعدلة، ومؤقت واحد لتنفيذها
+        self._dirty = set()
+        self._last_change = 0.0
+        self._save_timer = None
+        self._save_lock = threading.Lock()
+        # قفل الكتابة: يُحمل طوال تنفيذ دوال الحفظ (قبل قفل الجدولة دائماً) حتى لا يكتب
+        # المؤقت وflush_saves الملف نفسه معاً، ولا تنتهي flush_saves قبل حفظ جارٍ
+        self._write_lock = threading.Lock()
+        
+        # نتائج التحقق من وجود الملفات خلال عملية دفعية واحدة (None خارج العمليات الدفعية)
+        self._exists_cache = None
         
         # تحميل التعديلات المعلقة
         self._load_pending_modifications()
         self._load_applied_modifications()
+        
+        ModificationsManager._instances.add(self)
+    
+    def _schedule_save(self, save_func):
+        """
+        تعليم ملف كمعدل وجدولة حفظه بعد انتهاء سلسلة التعديلات المتتالية
+        
+        يُستخدم مؤقت واحد لكل المدير؛ التعديلات خلال فترة الانتظار تكتفي بتحديث
+        وقت آخر تعديل، ويعيد المؤقت جدولة نفسه حتى تهدأ التعديلات.
+        """
+        with self._save_lock:
+            self._dirty.add(save_func.__name__)
+            self._last_change = time.monotonic()
+            if self._save_timer is None:
+                self._start_save_timer(_SAVE_DELAY)
+    
+    def _start_save_timer(self, delay: float):
+        """تشغيل مؤقت الحفظ المؤجل (يُستدعى مع قفل الحفظ)"""
+        self._save_timer = threading.Timer(delay, self._run_scheduled_save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+    
+    def _run_scheduled_save(self):
+        """تنفيذ الحفظ المؤجل عند انتهاء مهلة الانتظار"""
+        with self._write_lock:
+            with self._save_lock:
+                # تجاهل مؤقت تم إلغاؤه أو استبداله
+                if threading.current_thread() is not self._save_timer:
+                    return
+                
+                remaining = self._last_change + _SAVE_DELAY - time.monotonic()
+                if remaining > 0:
+                    self._start_save_timer(remaining)
+                    return
+                
+                self._save_timer = None
+                dirty, self._dirty = self._dirty, set()
+            
+            for name in dirty:
+                getattr(self, name)()
+    
+    def flush_saves(self):
+        """تنفيذ عمليات الحفظ المؤجلة فوراً (بعد انتظار أي حفظ جارٍ)"""
+        with self._write_lock:
+            with self._save_lock:
+                timer, self._save_timer = self._save_timer, None
+                dirty, self._dirty = self._dirty, set()
+            
+            if timer is not None:
+                timer.cancel()
+            for name in dirty:
+                getattr(self, name)()
+    
+    @classmethod
+    def flush_all(cls):
+        """تنفيذ عمليات الحفظ المؤجلة لكل المدراء"""
+        for manager in list(cls._instances):
+            manager.flush_saves()
     
     def _load_pending_modifications(self):
         """تحميل التعديلات المعلقة من ملف"""
@@ -716,11 +857,11 @@ class ModificationsManager:
         
         mods_file = os.path.join(mods_dir, "pending_modifications.json")
         if os.path.exists(mods_file):
-            try:
-                with open(mods_file, 'r', encoding='utf-8') as f:
-                    self.pending_modifications = json.load(f)
-            except Exception as e:
-                logger.error(f"خطأ في تحميل التعديلات المعلقة: {str(e)}")
+            pending_modifications = load_json(mods_file)
+            if pending_modifications is not None:
+                self.pending_modifications = {}
+                for mod_id, mod in self._index_modifications(pending_modifications).items():
+                    self._add_pending(mod_id, mod)
     
     def _save_pending_modifications(self):
         """حفظ التعديلات المعلقة إلى ملف"""
@@ -731,11 +872,7 @@ class ModificationsManager:
         os.makedirs(mods_dir, exist_ok=True)
         
         mods_file = os.path.join(mods_dir, "pending_modifications.json")
-        try:
-            with open(mods_file, 'w', encoding='utf-8') as f:
-                json.dump(self.pending_modifications, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"خطأ في حفظ التعديلات المعلقة: {str(e)}")
+        save_json(list(self.pending_modifications.values()), mods_file)
     
     def _load_applied_modifications(self):
         """تحميل التعديلات المطبقة من ملف"""
@@ -745,11 +882,9 @@ class ModificationsManager:
         mods_dir = os.path.join(self.project_model.project_dir, ".code_analyzer")
         mods_file = os.path.join(mods_dir, "applied_modifications.json")
         if os.path.exists(mods_file):
-            try:
-                with open(mods_file, 'r', encoding='utf-8') as f:
-                    self.applied_modifications = json.load(f)
-            except Exception as e:
-                logger.error(f"خطأ في تحميل التعديلات المطبقة: {str(e)}")
+            applied_modifications = load_json(mods_file)
+            if applied_modifications is not None:
+                self.applied_modifications = self._index_modifications(applied_modifications)
     
     def _save_applied_modifications(self):
         """حفظ التعديلات المطبقة إلى ملف"""
@@ -760,11 +895,73 @@ class ModificationsManager:
         os.makedirs(mods_dir, exist_ok=True)
         
         mods_file = os.path.join(mods_dir, "applied_modifications.json")
+        save_json(list(self.applied_modifications.values()), mods_file)
+    
+    def _add_pending(self, mod_id: str, mod: Dict[str, Any]):
+        """إضافة تعديل إلى القائمة المعلقة وفهرس المسارات"""
+        self.pending_modifications[mod_id] = mod
+        self._pending_by_path.setdefault(mod.get("file_path"), set()).add(mod_id)
+    
+    def _pop_pending(self, mod_id: str) -> Optional[Dict[str, Any]]:
+        """إزالة تعديل من القائمة المعلقة وفهرس المسارات"""
+        mod = self.pending_modifications.pop(mod_id, None)
+        if mod is not None:
+            file_path = mod.get("file_path")
+            mod_ids = self._pending_by_path.get(file_path)
+            if mod_ids is not None:
+                mod_ids.discard(mod_id)
+                if not mod_ids:
+                    del self._pending_by_path[file_path]
+        return mod
+    
+    def _snapshot_path(self, mod_id: str) -> Optional[str]:
+        """مسار ملف المحتوى السابق لتعديل مطبق"""
+        if not self.project_model:
+            return None
+        return os.path.join(self.project_model.project_dir, ".code_analyzer", "snapshots", f"{mod_id}.bak")
+    
+    def _take_snapshot(self, file_path: str, snapshot_path: Optional[str]) -> bool:
+        """نسخ الملف كما هو إلى ملف المحتوى السابق دون قراءته في الذاكرة"""
+        if not snapshot_path:
+            return False
         try:
-            with open(mods_file, 'w', encoding='utf-8') as f:
-                json.dump(self.applied_modifications, f, ensure_ascii=False, indent=2)
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            shutil.copyfile(file_path, snapshot_path)
+            return True
         except Exception as e:
-            logger.error(f"خطأ في حفظ التعديلات المطبقة: {str(e)}")
+            logger.error(f"خطأ في حفظ المحتوى السابق للملف {file_path}: {str(e)}")
+            return False
+    
+    def _new_modification_id(self, taken=()) -> str:
+        """إنشاء معرف فريد لتعديل"""
+        base_id = modification_id = f"mod_{int(time.time() * 1000)}"
+        suffix = 1
+        while (modification_id in self.pending_modifications
+               or modification_id in self.applied_modifications
+               or modification_id in taken):
+            modification_id = f"{base_id}_{suffix}"
+            suffix += 1
+        return modification_id
+    
+    def _index_modifications(self, modifications: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """فهرسة قائمة تعديلات محملة حسب المعرف، مع إعطاء معرفات جديدة للمعرفات المكررة"""
+        indexed = {}
+        for mod in modifications:
+            mod_id = mod.get("id")
+            if not mod_id or mod_id in indexed:
+                mod_id = mod["id"] = self._new_modification_id(indexed)
+            indexed[mod_id] = mod
+        return indexed
+    
+    def _path_exists(self, path: str) -> bool:
+        """التحقق من وجود ملف، مع تذكر النتيجة خلال العملية الدفعية الحالية"""
+        if self._exists_cache is None:
+            return os.path.exists(path)
+        
+        exists = self._exists_cache.get(path)
+        if exists is None:
+            exists = self._exists_cache[path] = os.path.exists(path)
+        return exists
     
     def add_modification(self, modification: Dict[str, Any]) -> bool:
         """إضافة تعديل مقترح إلى القائمة"""
@@ -774,124 +971,187 @@ class ModificationsManager:
         
         # إضافة timestamp للتعديل
         modification["timestamp"] = time.time()
-        modification["id"] = f"mod_{int(time.time() * 1000)}"
+        modification["id"] = self._new_modification_id()
         
         # إضافة التعديل إلى القائمة
-        self.pending_modifications.append(modification)
+        self._add_pending(modification["id"], modification)
         
         # حفظ التعديلات المعلقة
-        self._save_pending_modifications()
+        self._schedule_save(self._save_pending_modifications)
         
         return True
     
     def add_batch_modifications(self, modifications: List[Dict[str, Any]]) -> int:
         """إضافة مجموعة من التعديلات المقترحة"""
         success_count = 0
-        for mod in modifications:
-            if self.add_modification(mod):
-                success_count += 1
+        self._exists_cache = {}
+        try:
+            for mod in modifications:
+                if self.add_modification(mod):
+                    success_count += 1
+        finally:
+            self._exists_cache = None
         return success_count
     
     def remove_modification(self, modification_id: str) -> bool:
         """إزالة تعديل من القائمة بواسطة المعرف"""
-        for i, mod in enumerate(self.pending_modifications):
-            if mod.get("id") == modification_id:
-                del self.pending_modifications[i]
-                self._save_pending_modifications()
-                return True
-        return False
+        if self._pop_pending(modification_id) is None:
+            return False
+        self._schedule_save(self._save_pending_modifications)
+        return True
     
     def get_pending_modifications(self) -> List[Dict[str, Any]]:
         """الحصول على قائمة التعديلات المعلقة"""
-        return self.pending_modifications
+        return list(self.pending_modifications.values())
     
     def get_applied_modifications(self) -> List[Dict[str, Any]]:
         """الحصول على قائمة التعديلات المطبقة"""
-        return self.applied_modifications
+        return list(self.applied_modifications.values())
     
     def has_pending_modifications(self) -> bool:
         """التحقق مما إذا كانت هناك تعديلات معلقة"""
-        return len(self.pending_modifications) > 0
+        return bool(self.pending_modifications)
     
     def has_pending_modifications_for_file(self, file_path: str) -> bool:
         """التحقق مما إذا كانت هناك تعديلات معلقة للملف المحدد"""
-        return any(mod.get("file_path") == file_path for mod in self.pending_modifications)
+        return file_path in self._pending_by_path
     
     def get_modification_by_id(self, modification_id: str) -> Optional[Dict[str, Any]]:
         """الحصول على تعديل بواسطة المعرف"""
-        for mod in self.pending_modifications:
-            if mod.get("id") == modification_id:
-                return mod
-        return None
+        return self.pending_modifications.get(modification_id)
+    
+    def _apply_file_modifications(self, file_path: str, mods: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        تطبيق تعديلات ملف واحد بالترتيب
+        
+        يُكتب المحتوى النهائي (محتوى آخر تعديل) مرة واحدة فقط، وتُسجل كل التعديلات
+        كمطبقة: المحتوى السابق لأول تعديل هو محتوى الملف الحالي، ولكل تعديل تالٍ هو
+        محتوى التعديل الذي قبله.
+        
+        Returns:
+            قاموس من معرف التعديل إلى نسخة التعديل المطبق، أو إلى قاموس الخطأ
+        """
+        first_id = mods[0][0]
+        snapshot_path = self._snapshot_path(first_id)
+        try:
+            # نسخ المحتوى الحالي إلى ملف منفصل حتى لا يتضخم ملف التعديلات المطبقة،
+            # أو قراءته في الذاكرة إذا تعذر النسخ
+            current_content = None
+            if not self._take_snapshot(file_path, snapshot_path):
+                snapshot_path = None
+                current_content = read_file(file_path)
+            
+            # كتابة المحتوى النهائي
+            success = write_file(file_path, mods[-1][1].get("content"))
+            if not success:
+                raise Exception(f"فشل في كتابة الملف: {file_path}")
+        
+        except Exception as e:
+            return {
+                mod_id: {
+                    "id": mod_id,
+                    "file_path": file_path,
+                    "error": str(e)
+                }
+                for mod_id, _ in mods
+            }
+        
+        results = {}
+        applied_at = time.time()
+        previous = None
+        for mod_id, mod in mods:
+            mod_copy = mod.copy()
+            mod_copy["applied_at"] = applied_at
+            if previous is not None:
+                mod_copy["previous_content"] = previous.get("content")
+            elif snapshot_path:
+                mod_copy["previous_content_path"] = snapshot_path
+            else:
+                mod_copy["previous_content"] = current_content
+            results[mod_id] = mod_copy
+            previous = mod
+        
+        return results
     
     def apply_modifications(self, selected_ids: List[str]) -> List[Dict[str, Any]]:
         """تطبيق التعديلات المحددة"""
         applied = []
         errors = []
         
-        for mod_id in selected_ids:
-            mod = self.get_modification_by_id(mod_id)
-            if mod:
-                file_path = mod.get("file_path")
-                new_content = mod.get("content")
-                
-                if file_path and new_content and os.path.exists(file_path):
-                    try:
-                        # قراءة المحتوى الحالي للملف
-                        current_content = read_file(file_path)
-                        
-                        # كتابة المحتوى الجديد
-                        success = write_file(file_path, new_content)
-                        if not success:
-                            raise Exception(f"فشل في كتابة الملف: {file_path}")
-                        
-                        # إضافة التعديل إلى قائمة التعديلات المطبقة
-                        mod_copy = mod.copy()
-                        mod_copy["previous_content"] = current_content
-                        mod_copy["applied_at"] = time.time()
-                        self.applied_modifications.append(mod_copy)
-                        
-                        # إزالة التعديل من قائمة التعديلات المعلقة
-                        self.remove_modification(mod_id)
-                        
-                        # إضافة إلى قائمة التعديلات المطبقة
-                        applied.append(mod_copy)
+        # تجميع التعديلات حسب الملف: تعديلات الملف الواحد تطبق بالترتيب، والملفات المختلفة بالتوازي
+        mods_by_file = {}
+        selected = {}  # المعرفات المحددة بترتيبها، دون تكرار
+        self._exists_cache = {}
+        try:
+            for mod_id in selected_ids:
+                mod = self.get_modification_by_id(mod_id)
+                if mod and mod_id not in selected:
+                    file_path = mod.get("file_path")
+                    new_content = mod.get("content")
                     
-                    except Exception as e:
-                        errors.append({
-                            "id": mod_id,
-                            "file_path": file_path,
-                            "error": str(e)
-                        })
+                    if file_path and new_content and self._path_exists(file_path):
+                        mods_by_file.setdefault(file_path, []).append((mod_id, mod))
+                        selected[mod_id] = mod
+        finally:
+            self._exists_cache = None
         
-        # حفظ التعديلات المطبقة
-        self._save_applied_modifications()
+        results = {}
+        if len(mods_by_file) == 1:
+            results.update(self._apply_file_modifications(*next(iter(mods_by_file.items()))))
+        elif mods_by_file:
+            with ThreadPoolExecutor(max_workers=min(_WRITE_MAX_WORKERS, len(mods_by_file))) as executor:
+                for file_results in executor.map(self._apply_file_modifications,
+                                                 mods_by_file.keys(), mods_by_file.values()):
+                    results.update(file_results)
+        
+        for mod_id in selected:
+            result = results[mod_id]
+            if "error" in result:
+                errors.append(result)
+                continue
+            
+            # نقل التعديل من قائمة التعديلات المعلقة إلى المطبقة (يتم الحفظ مرة واحدة بعد الحلقة)
+            self.applied_modifications[mod_id] = result
+            self._pop_pending(mod_id)
+            applied.append(result)
+        
+        # حفظ التعديلات المطبقة والمعلقة مرة واحدة للدفعة كاملة
+        if applied:
+            self._schedule_save(self._save_applied_modifications)
+            self._schedule_save(self._save_pending_modifications)
         
         return applied
     
-    def apply_all_modifications(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """تطبيق جميع التعديلات المعلقة"""
-        mod_ids = [mod.get("id") for mod in self.pending_modifications]
+    def apply_all_modifications(self, *, ids_only: bool = False) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """
+        تطبيق جميع التعديلات المعلقة
+        
+        Args:
+            ids_only: إرجاع معرفات التعديلات التي فشل تطبيقها بدلاً من التعديلات نفسها
+                (يمكن الحصول على تفاصيلها عند الحاجة عبر get_modification_by_id)
+        """
+        mod_ids = list(self.pending_modifications)
         applied = self.apply_modifications(mod_ids)
         
-        # حساب الأخطاء
-        applied_ids = [mod.get("id") for mod in applied]
-        errors = [mod for mod in self.pending_modifications if mod.get("id") not in applied_ids]
+        # التعديلات المطبقة تُزال من القائمة المعلقة، فما بقي فيها هو الأخطاء
+        if ids_only:
+            errors = list(self.pending_modifications)
+        else:
+            errors = list(self.pending_modifications.values())
         
         return applied, errors
     
     def _validate_modification(self, modification: Dict[str, Any]) -> bool:
         """التحقق من صحة التعديل"""
         # التحقق من وجود المفاتيح المطلوبة
-        required_keys = ["file_path", "content", "description"]
-        for key in required_keys:
-            if key not in modification:
-                logger.error(f"التعديل يفتقد للمفتاح المطلوب: {key}")
-                return False
+        if not _REQUIRED_MODIFICATION_KEYS.issubset(modification):
+            missing = ", ".join(sorted(_REQUIRED_MODIFICATION_KEYS.difference(modification)))
+            logger.error(f"التعديل يفتقد للمفتاح المطلوب: {missing}")
+            return False
         
         # التحقق من وجود الملف
         file_path = modification["file_path"]
-        if not os.path.exists(file_path):
+        if not self._path_exists(file_path):
             logger.error(f"الملف غير موجود: {file_path}")
             return False
         
@@ -899,43 +1159,94 @@ class ModificationsManager:
     
     def revert_modification(self, modification_id: str) -> bool:
         """التراجع عن تعديل تم تطبيقه"""
-        for i, mod in enumerate(self.applied_modifications):
-            if mod.get("id") == modification_id:
-                file_path = mod.get("file_path")
-                previous_content = mod.get("previous_content")
+        mod = self.applied_modifications.get(modification_id)
+        if mod is None:
+            return False
+        
+        file_path = mod.get("file_path")
+        snapshot_path = mod.get("previous_content_path")
+        previous_content = mod.get("previous_content")
+        if snapshot_path:
+            can_restore = os.path.exists(snapshot_path)
+        else:
+            can_restore = bool(previous_content)
+        
+        if file_path and can_restore and self._path_exists(file_path):
+            try:
+                # استعادة المحتوى السابق
+                if snapshot_path:
+                    shutil.copyfile(snapshot_path, file_path)
+                elif not write_file(file_path, previous_content):
+                    raise Exception(f"فشل في استعادة الملف: {file_path}")
+                
+                # إزالة التعديل من قائمة التعديلات المطبقة
+                del self.applied_modifications[modification_id]
+                self._schedule_save(self._save_applied_modifications)
                 
-                if file_path and previous_content and os.path.exists(file_path):
+                # إعادة التعديل إلى قائمة التعديلات المعلقة (اختياري)
+                mod_copy = mod.copy()
+                mod_copy.pop("previous_content", None)  # حذف المحتوى السابق
+                mod_copy.pop("previous_content_path", None)
+                del mod_copy["applied_at"]  # حذف وقت التطبيق
+                self._add_pending(modification_id, mod_copy)
+                self._schedule_save(self._save_pending_modifications)
+                
+                # حذف ملف المحتوى السابق بعد استعادته
+                if snapshot_path:
                     try:
-                        # كتابة المحتوى السابق
-                        success = write_file(file_path, previous_content)
-                        if not success:
-                            raise Exception(f"فشل في استعادة الملف: {file_path}")
-                        
-                        # إزالة التعديل من قائمة التعديلات المطبقة
-                        del self.applied_modifications[i]
-                        self._save_applied_modifications()
-                        
-                        # إعادة التعديل إلى قائمة التعديلات المعلقة (اختياري)
-                        mod_copy = mod.copy()
-                        del mod_copy["previous_content"]  # حذف المحتوى السابق
-                        del mod_copy["applied_at"]  # حذف وقت التطبيق
-                        self.pending_modifications.append(mod_copy)
-                        self._save_pending_modifications()
-                        
-                        return True
-                    
-                    except Exception as e:
-                        logger.error(f"خطأ في التراجع عن التعديل: {str(e)}")
+                        os.remove(snapshot_path)
+                    except OSError as e:
+                        logger.warning(f"تعذر حذف ملف المحتوى السابق {snapshot_path}: {str(e)}")
+                
+                return True
+            
+            except Exception as e:
+                logger.error(f"خطأ في التراجع عن التعديل: {str(e)}")
         
         return False
     
+    def revert_modifications(self, modification_ids: List[str]) -> List[str]:
+        """
+        التراجع عن مجموعة من التعديلات المطبقة
+        
+        يتم التراجع بعكس ترتيب التطبيق (ترتيب الإضافة إلى التعديلات المطبقة)، حتى
+        تعود الملفات التي طُبق عليها أكثر من تعديل إلى محتواها الأصلي.
+        
+        Returns:
+            معرفات التعديلات التي تم التراجع عنها
+        """
+        selected = set(modification_ids)
+        modification_ids = [mod_id for mod_id in reversed(self.applied_modifications) if mod_id in selected]
+        
+        reverted = []
+        self._exists_cache = {}
+        try:
+            for mod_id in modification_ids:
+                if self.revert_modification(mod_id):
+                    reverted.append(mod_id)
+        finally:
+            self._exists_cache = None
+        
+        return reverted
+    
     def create_modification_from_issue(self, issue: Dict[str, Any], new_content: str) -> Dict[str, Any]:
         """إنشاء تعديل مقترح من مشكلة"""
+        get = issue.get
         return {
-            "file_path": issue.get("file", ""),
+            "file_path": get("file", ""),
             "content": new_content,
-            "description": f"إصلاح مشكلة: {issue.get('message', '')}",
-            "issue_line": issue.get("line", 0),
-            "severity": issue.get("severity", "متوسطة"),
-            "type": issue.get("type", "quality")
-        }
\ No newline at end of file
+            "description": "إصلاح مشكلة: " + str(get("message", "")),
+            "issue_line": get("line", 0),
+            "severity": get("severity", "متوسطة"),
+            "type": get("type", "quality")
+        }
+    
+    def create_modifications_from_issues(self, issues: List[Dict[str, Any]],
+                                         new_contents: List[str]) -> List[Dict[str, Any]]:
+        """إنشاء تعديلات مقترحة من قائمة مشاكل ومحتوياتها الجديدة المقابلة (لإضافتها عبر add_batch_modifications)"""
+        create = self.create_modification_from_issue
+        return [create(issue, new_content) for issue, new_content in zip(issues, new_contents)]
+
+
+# حفظ التعديلات المؤجلة عند إغلاق البرنامج
+atexit.register(ModificationsManager.flush_all)
\ No newline at end of file
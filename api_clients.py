@@ -4,16 +4,24 @@
 واجهات برمجة الذكاء الاصطناعي المختلفة
 """
 import os
-import json
+import ssl
 import logging
 import requests
 import urllib3
 import atexit
-from typing import Dict, List, Any, Optional, Tuple, Union
+import threading
+import string
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterator, Callable
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from PySide6.QtCore import QObject, QThread, Signal, Slot
 
+from utils import severity_sort_key, loads_json, save_json
+
 # استيراد APIThreadManager - يجب أن يكون هذا متاحاً
 try:
     from analyzer import APIThreadManager
@@ -30,8 +38,267 @@ from openai import OpenAI
 from urllib3.exceptions import InsecureRequestWarning
 urllib3.disable_warnings(InsecureRequestWarning)
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# مكتبة simdjson (اختيارية) لاستخراج حقل واحد من استجابة المزود دون بناء الشجرة كاملة
+try:
+    import simdjson
+    HAS_SIMDJSON = True
+except ImportError:
+    HAS_SIMDJSON = False
+
 logger = logging.getLogger("CodeAnalyzer.API")
 
+# جلسات HTTP مشتركة لكل مزود، لإعادة استخدام اتصالات TCP/TLS بين الطلبات
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _get_ssl_context() -> Tuple[ssl.SSLContext, Optional[str]]:
+    """سياق SSL مشترك تُحمل فيه شهادات certifi مرة واحدة لكل عملية (مع مسار ملف الشهادات)"""
+    try:
+        import certifi
+        cafile = certifi.where()
+    except ImportError:
+        cafile = None
+    return ssl.create_default_context(cafile=cafile), cafile
+
+
+class _SharedSSLAdapter(HTTPAdapter):
+    """محول HTTP يستخدم سياق SSL المشترك بدلاً من إعادة تحميل ملف الشهادات لكل اتصال"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = _get_ssl_context()[0]
+        super().init_poolmanager(*args, **kwargs)
+    
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        # الشهادات محملة مسبقاً في السياق المشترك: لا حاجة لتمرير ملفها إلى كل اتصال جديد
+        if url.lower().startswith("https") and (verify is True or verify == _get_ssl_context()[1]):
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
+# أقصى انتظار (بالثواني) لترويسة Retry-After قبل إعادة إرسال طلب رُفض بالرمز 429
+_MAX_RETRY_AFTER = 10
+
+
+class _BoundedRetry(Retry):
+    """إعادة محاولة لا تنتظر أكثر من _MAX_RETRY_AFTER ثانية مهما طلبت ترويسة Retry-After"""
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, _MAX_RETRY_AFTER)
+
+
+def get_session(provider: str) -> requests.Session:
+    """الحصول على جلسة HTTP المشتركة للمزود (مع تجمع اتصالات وإعادة محاولة للأخطاء المؤقتة)"""
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            # طلبات المحادثة (POST) غير متكررة الأثر ومدفوعة: لا يعاد إرسالها بعد أخطاء 5xx أو
+            # انتهاء مهلة القراءة (ربما عالجها المزود فعلاً)، بل فقط عند فشل الاتصال قبل الإرسال
+            # أو عند رفضها بالرمز 429 (لم تُعالج)
+            retry = _BoundedRetry(
+                total=3,
+                connect=3,
+                read=0,
+                other=0,
+                status=2,
+                backoff_factor=0.3,
+                status_forcelist=(429,),
+                allowed_methods=frozenset(("GET", "POST")),
+                raise_on_status=False
+            )
+            session.mount("https://", _SharedSSLAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+            _sessions[provider] = session
+        return session
+
+
+def close_sessions():
+    """إغلاق جميع جلسات HTTP المشتركة"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+# إغلاق الجلسات عند إغلاق البرنامج
+atexit.register(close_sessions)
+
+
+@lru_cache(maxsize=32)
+def _template_parts(template: str) -> Optional[Tuple]:
+    """تحليل قالب الطلب مرة واحدة إلى أجزاء نصية وأسماء حقول (None إذا احتوى صيغاً غير بسيطة)"""
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if field is not None:
+            if not field.isidentifier() or spec or conversion:
+                return None
+            parts.append((field,))
+    return tuple(parts)
+
+
+def render_template(template: str, **values) -> str:
+    """ملء قالب الطلب بالقيم دون إعادة تحليله في كل استدعاء (مكافئ لـ template.format)"""
+    parts = _template_parts(template)
+    if parts is None:
+        return template.format(**values)
+    return "".join(part if part.__class__ is str else str(values[part[0]]) for part in parts)
+
+
+# محلل simdjson لكل خيط (المحلل لا يدعم الاستخدام المتزامن)
+_json_parsers = threading.local()
+
+
+@lru_cache(maxsize=8)
+def _pointer_parts(pointer: str) -> Tuple:
+    """تحويل مؤشر JSON مثل /choices/0/text إلى مفاتيح وفهارس"""
+    return tuple(int(part) if part.isdigit() else part for part in pointer.strip("/").split("/"))
+
+
+def extract_response_field(content: bytes, pointer: str) -> Any:
+    """استخراج قيمة واحدة من استجابة JSON حسب مؤشر JSON"""
+    if HAS_SIMDJSON:
+        parser = getattr(_json_parsers, "parser", None)
+        if parser is None:
+            parser = _json_parsers.parser = simdjson.Parser()
+        return parser.parse(content).at_pointer(pointer)
+    
+    value = loads_json(content)
+    for part in _pointer_parts(pointer):
+        value = value[part]
+    return value
+
+
+def _openai_stream_text(event: Dict[str, Any]) -> Optional[str]:
+    """النص الجديد في حدث بث بتنسيق OpenAI"""
+    choices = event.get("choices")
+    if not choices:
+        return None
+    return choices[0].get("delta", {}).get("content")
+
+
+def _claude_stream_text(event: Dict[str, Any]) -> Optional[str]:
+    """النص الجديد في حدث بث من Claude"""
+    event_type = event.get("type")
+    if event_type == "content_block_delta":
+        return event.get("delta", {}).get("text")
+    if event_type == "error":
+        raise RuntimeError(event.get("error", {}).get("message", "خطأ في بث الاستجابة"))
+    return None
+
+
+# ذاكرة مؤقتة لاستجابات التحليل والإصلاح، حتى لا يعاد إرسال الطلب نفسه للمزود
+_RESPONSE_CACHE_SIZE = 128
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def _response_cache_key(provider: str, model: str, system_prompt: str, prompt: str) -> Tuple[str, str, bytes]:
+    """مفتاح الذاكرة المؤقتة: المزود والنموذج وبصمة نص الطلب"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(system_prompt.encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(prompt.encode('utf-8'))
+    return (provider, model, digest.digest())
+
+
+def _get_cached_response(key: Tuple) -> Optional[str]:
+    """الحصول على استجابة محفوظة (None إذا لم توجد)"""
+    with _response_cache_lock:
+        response_text = _response_cache.get(key)
+        if response_text is not None:
+            _response_cache.move_to_end(key)
+        return response_text
+
+
+def _set_cached_response(key: Tuple, response_text: str) -> None:
+    """حفظ استجابة مع إزالة الأقدم عند تجاوز الحد"""
+    with _response_cache_lock:
+        _response_cache[key] = response_text
+        _response_cache.move_to_end(key)
+        if len(_response_cache) > _RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+def clear_response_cache() -> None:
+    """مسح الذاكرة المؤقتة للاستجابات"""
+    with _response_cache_lock:
+        _response_cache.clear()
+
+# الحد الأقصى لعدد طلبات API المتزامنة في المنفذ المشترك
+_REQUEST_MAX_WORKERS = 8
+
+_request_executor = None
+_request_executor_lock = threading.Lock()
+
+
+def _get_request_executor() -> ThreadPoolExecutor:
+    """الحصول على منفذ الطلبات المشترك (يُنشأ عند أول استخدام)"""
+    global _request_executor
+    with _request_executor_lock:
+        if _request_executor is None:
+            _request_executor = ThreadPoolExecutor(max_workers=_REQUEST_MAX_WORKERS, thread_name_prefix="api-request")
+        return _request_executor
+
+
+def shutdown_request_executor():
+    """إيقاف منفذ الطلبات المشترك وإلغاء الطلبات التي لم تبدأ"""
+    global _request_executor
+    with _request_executor_lock:
+        if _request_executor is not None:
+            _request_executor.shutdown(wait=False, cancel_futures=True)
+            _request_executor = None
+
+
+atexit.register(shutdown_request_executor)
+
+
+class ConnectivityProbe(QObject):
+    """اختبار الاتصال بمزود API في منفذ الطلبات المشترك دون حجب خيط الواجهة"""
+    
+    finished = Signal(str, bool)  # المزود، نجاح الاتصال
+    
+    def __init__(self, api_config: 'APIConfig', provider: str = None, parent=None):
+        super().__init__(parent)
+        self.api_config = api_config
+        self.provider = provider or api_config.preferred_provider
+        self.future = None
+    
+    def start(self):
+        """إرسال الاختبار إلى المنفذ المشترك (تصل إشارة النتيجة إلى خيط الواجهة عبر اتصال مؤجل)"""
+        self.future = _get_request_executor().submit(self._run)
+        return self.future
+    
+    def _run(self) -> None:
+        provider = self.provider
+        if not self.api_config.get_api_key(provider):
+            logger.warning(f"لا يوجد مفتاح API لـ {provider}")
+            self.finished.emit(provider, False)
+            return
+        
+        try:
+            logger.info(f"جارٍ اختبار الاتصال بـ {provider}...")
+            connected = get_api_client(self.api_config, provider).ping()
+            if connected:
+                logger.info(f"تم الاتصال بنجاح بـ {provider}")
+            else:
+                logger.warning(f"فشل الاتصال بـ {provider}")
+        except Exception as e:
+            logger.warning(f"فشل الاتصال بـ {provider}: {str(e)}")
+            connected = False
+        
+        self.finished.emit(provider, connected)
+
+
 class APIRequestThread(QThread):
     """خيط للطلبات API لتجنب تجميد واجهة المستخدم"""
     
@@ -53,7 +320,7 @@ class APIRequestThread(QThread):
     def run(self):
         """تنفيذ الطلب API"""
         try:
-            self.response = requests.post(
+            self.response = get_session("default").post(
                 self.url,
                 headers=self.headers,
                 json=self.data,
@@ -62,7 +329,7 @@ class APIRequestThread(QThread):
             )
             
             if self.response.status_code in (200, 201):
-                response_data = self.response.json()
+                response_data = loads_json(self.response.content)
                 self.request_completed.emit(response_data)
             else:
                 error_msg = f"خطأ في الطلب: {self.response.status_code}, {self.response.text}"
@@ -80,6 +347,22 @@ class APIRequestThread(QThread):
                 APIThreadManager.unregister_thread(self)
 
 
+# المزودون المدعومون (بترتيب الأولوية عند عرض المزودين المتاحين)
+PROVIDERS = ("openai", "claude", "grok", "xai", "deepseek")
+
+# أسماء حقول مفتاح API والنموذج لكل مزود في APIConfig
+_KEY_FIELDS = {provider: f"{provider}_api_key" for provider in PROVIDERS}
+_MODEL_FIELDS = {provider: f"{provider}_model" for provider in PROVIDERS}
+_URL_FIELDS = {provider: f"{provider}_api_url" for provider in PROVIDERS}
+_KEY_FIELD_NAMES = frozenset(_KEY_FIELDS.values())
+
+# لواحق نقاط المحادثة (تُحذف للوصول إلى جذر واجهة المزود)
+_CHAT_URL_SUFFIXES = ("/chat/completions", "/messages")
+
+# ترتيب المزودين البديلين عند غياب مفتاح المزود المطلوب
+_FALLBACK_PROVIDERS = ("xai", "openai", "claude", "grok", "deepseek")
+
+
 @dataclass
 class APIConfig:
     """إعدادات API"""
@@ -181,6 +464,17 @@ class APIConfig:
     }}
     """
     
+    def __setattr__(self, name, value):
+        # زيادة رقم إصدار المفاتيح عند تغيير أي مفتاح API (لإبطال القوائم المحفوظة)
+        if name in _KEY_FIELD_NAMES:
+            object.__setattr__(self, "_keys_version", getattr(self, "_keys_version", 0) + 1)
+        object.__setattr__(self, name, value)
+    
+    @property
+    def keys_version(self) -> int:
+        """رقم إصدار مفاتيح API (يتغير عند تعيين أي مفتاح)"""
+        return getattr(self, "_keys_version", 0)
+    
     @classmethod
     def from_config_file(cls, config_path: str) -> 'APIConfig':
         """إنشاء كائن APIConfig من ملف التكوين"""
@@ -188,13 +482,13 @@ class APIConfig:
         
         if os.path.exists(config_path):
             try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+                with open(config_path, 'rb') as f:
+                    config_data = loads_json(f.read())
                 
-                # تعيين الخصائص من البيانات المحملة
-                for key, value in config_data.items():
-                    if hasattr(config, key):
-                        setattr(config, key, value)
+                # تعيين الخصائص المعروفة من البيانات المحملة
+                fields = cls.__dataclass_fields__
+                vars(config).update({key: value for key, value in config_data.items() if key in fields})
+                config._keys_version = config.keys_version + 1
             
             except Exception as e:
                 logger.error(f"خطأ في تحميل ملف التكوين: {str(e)}")
@@ -202,114 +496,199 @@ class APIConfig:
                 config.save_to_file(config_path)
         else:
             # إنشاء ملف تكوين جديد إذا لم يكن موجوداً
-            os.makedirs(os.path.dirname(config_path), exist_ok=True)
             config.save_to_file(config_path)
         
         return config
     
     def save_to_file(self, config_path: str) -> bool:
         """حفظ الإعدادات إلى ملف"""
-        try:
-            # إنشاء المجلد إذا لم يكن موجوداً
-            os.makedirs(os.path.dirname(config_path), exist_ok=True)
-            
-            # تحويل الكائن إلى قاموس
-            config_data = {}
-            for key, value in self.__dict__.items():
-                config_data[key] = value
-            
-            # حفظ البيانات إلى ملف JSON
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
-            
-            return True
-        
-        except Exception as e:
-            logger.error(f"خطأ في حفظ ملف التكوين: {str(e)}")
+        # حفظ البيانات إلى ملف JSON (كتابة ذرية عبر ملف مؤقت)
+        fields = self.__dataclass_fields__
+        config_data = {key: value for key, value in self.__dict__.items() if key in fields}
+        if not save_json(config_data, config_path):
+            logger.error(f"خطأ في حفظ ملف التكوين: {config_path}")
             return False
+        
+        return True
     
     def get_api_key(self, provider: str) -> str:
         """الحصول على مفتاح API للمزود المحدد"""
-        if provider == "openai":
-            return self.openai_api_key
-        elif provider == "claude":
-            return self.claude_api_key
-        elif provider == "grok":
-            return self.grok_api_key
-        elif provider == "xai":
-            return self.xai_api_key
-        elif provider == "deepseek":
-            return self.deepseek_api_key
-        else:
-            return ""
+        field = _KEY_FIELDS.get(provider)
+        return getattr(self, field) if field else ""
     
     def set_api_key(self, provider: str, api_key: str) -> None:
         """تعيين مفتاح API للمزود المحدد"""
-        if provider == "openai":
-            self.openai_api_key = api_key
-        elif provider == "claude":
-            self.claude_api_key = api_key
-        elif provider == "grok":
-            self.grok_api_key = api_key
-        elif provider == "xai":
-            self.xai_api_key = api_key
-        elif provider == "deepseek":
-            self.deepseek_api_key = api_key
+        field = _KEY_FIELDS.get(provider)
+        if field:
+            setattr(self, field, api_key)
+    
+    def pick_available_provider(self, preferred: str) -> str:
+        """
+        اختيار المزود المطلوب إذا كان له مفتاح API، وإلا أول مزود بديل متاح
+        
+        تُحفظ النتيجة حتى يتغير أحد مفاتيح API.
+        """
+        version = self.keys_version
+        cached = getattr(self, "_picked_provider", None)
+        if cached is not None and cached[0] == version and cached[1] == preferred:
+            return cached[2]
+        
+        if self.get_api_key(preferred):
+            provider = preferred
+        else:
+            for provider in _FALLBACK_PROVIDERS:
+                if self.get_api_key(provider):
+                    break
+            else:
+                raise ValueError("لا يوجد مفتاح API متاح. يرجى إضافة مفتاح API في الإعدادات.")
+        
+        self._picked_provider = (version, preferred, provider)
+        return provider
     
     def get_model(self, provider: str) -> str:
         """الحصول على نموذج للمزود المحدد"""
-        if provider == "openai":
-            return self.openai_model
-        elif provider == "claude":
-            return self.claude_model
-        elif provider == "grok":
-            return self.grok_model
-        elif provider == "xai":
-            return self.xai_model
-        elif provider == "deepseek":
-            return self.deepseek_model
-        else:
-            return ""
+        field = _MODEL_FIELDS.get(provider)
+        return getattr(self, field) if field else ""
     
     def set_model(self, provider: str, model: str) -> None:
         """تعيين نموذج للمزود المحدد"""
-        if provider == "openai":
-            self.openai_model = model
-        elif provider == "claude":
-            self.claude_model = model
-        elif provider == "grok":
-            self.grok_model = model
-        elif provider == "xai":
-            self.xai_model = model
-        elif provider == "deepseek":
-            self.deepseek_model = model
+        field = _MODEL_FIELDS.get(provider)
+        if field:
+            setattr(self, field, model)
 
 
 class BaseAPIClient(ABC):
     """فئة أساسية لعملاء API"""
     
+    provider = ""  # اسم المزود (يحدد جلسة HTTP المشتركة)
+    
+    # رسائل النظام المستخدمة في التحليل والإصلاح (مشتركة بين جميع المزودين)
+    ANALYSIS_SYSTEM_PROMPT = "أنت مساعد برمجة خبير يحلل الشيفرة البرمجية ويكتشف المشاكل. قدم نتائج التحليل بتنسيق JSON فقط."
+    SECURITY_SYSTEM_PROMPT = "أنت خبير أمني متخصص في اكتشاف الثغرات الأمنية في الشيفرة البرمجية. قدم نتائج التحليل بتنسيق JSON فقط."
+    FIX_SYSTEM_PROMPT = "أنت مساعد برمجة خبير يعمل على إصلاح المشاكل في الشيفرة البرمجية. قدم الشيفرة المصححة بتنسيق JSON فقط."
+    
     def __init__(self, api_config: APIConfig):
         self.api_config = api_config
+        self._headers_cache = (None, None)  # (مفتاح API، الترويسات المبنية له)
+    
+    def _build_headers(self, api_key: str) -> Dict[str, str]:
+        """بناء ترويسات الطلب لمفتاح API"""
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+    
+    def _get_headers(self, api_key: str) -> Dict[str, str]:
+        """الحصول على ترويسات الطلب (يعاد بناؤها فقط عند تغير مفتاح API)"""
+        cached_key, headers = self._headers_cache
+        if cached_key != api_key:
+            headers = self._build_headers(api_key)
+            self._headers_cache = (api_key, headers)
+        return headers
+    
+    @property
+    def session(self) -> requests.Session:
+        """جلسة HTTP المشتركة لهذا المزود"""
+        return get_session(self.provider)
     
     @abstractmethod
     def chat(self, messages: List[Dict[str, str]]) -> str:
         """إرسال رسائل إلى API والحصول على استجابة"""
         pass
     
-    @abstractmethod
+    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """إرسال رسائل إلى API واستلام الاستجابة على دفعات (الافتراضي: دفعة واحدة)"""
+        yield self.chat(messages)
+    
+    def ping(self, timeout: float = 10) -> bool:
+        """
+        اختبار اتصال خفيف: طلب قائمة النماذج (GET /models) بدلاً من إرسال محادثة
+        """
+        api_key = self.api_config.get_api_key(self.provider)
+        if not api_key:
+            return False
+        
+        # نقطة قائمة النماذج مجاورة لنقطة المحادثة (مثل /v1/chat/completions -> /v1/models)
+        chat_url = getattr(self.api_config, _URL_FIELDS[self.provider])
+        for suffix in _CHAT_URL_SUFFIXES:
+            if chat_url.endswith(suffix):
+                chat_url = chat_url[:-len(suffix)]
+                break
+        
+        response = self.session.get(f"{chat_url}/models", headers=self._get_headers(api_key), timeout=timeout)
+        return response.ok
+    
+    def _stream_events(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                       extract_text: Callable[[Dict[str, Any]], Optional[str]], name: str) -> Iterator[str]:
+        """إرسال طلب بث (Server-Sent Events) وإرجاع النصوص الجديدة من كل حدث"""
+        try:
+            with self.session.post(url, headers=headers, json=data, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                
+                for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    
+                    payload = line[5:].strip()
+                    if payload == b"[DONE]":
+                        break
+                    
+                    text = extract_text(loads_json(payload))
+                    if text:
+                        yield text
+        
+        except Exception as e:
+            logger.error(f"خطأ في {name} API: {str(e)}")
+            raise
+    
     def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
         """تحليل الشيفرة البرمجية باستخدام API"""
-        pass
+        prompt = render_template(
+            self.api_config.analysis_prompt_template,
+            language=language,
+            code=code
+        )
+        
+        return self._complete(self.ANALYSIS_SYSTEM_PROMPT, prompt)
     
-    @abstractmethod
     def analyze_security(self, code: str, language: str) -> Dict[str, Any]:
         """تحليل الثغرات الأمنية في الشيفرة البرمجية"""
-        pass
+        prompt = render_template(
+            self.api_config.security_prompt_template,
+            language=language,
+            code=code
+        )
+        
+        return self._complete(self.SECURITY_SYSTEM_PROMPT, prompt)
     
-    @abstractmethod
     def fix_issue(self, code: str, language: str, line: int, message: str) -> Dict[str, Any]:
         """إصلاح مشكلة في الشيفرة البرمجية"""
-        pass
+        prompt = render_template(
+            self.api_config.fix_prompt_template,
+            language=language,
+            code=code,
+            line=line,
+            message=message
+        )
+        
+        return self._complete(self.FIX_SYSTEM_PROMPT, prompt)
+    
+    def _complete(self, system_prompt: str, prompt: str) -> Dict[str, Any]:
+        """إرسال الطلب (أو استخدام استجابة محفوظة لنفس الطلب) واستخراج JSON منها"""
+        key = _response_cache_key(self.provider, self.api_config.get_model(self.provider), system_prompt, prompt)
+        response_text = _get_cached_response(key)
+        
+        if response_text is None:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ]
+            
+            response_text = self.chat(messages)
+            _set_cached_response(key, response_text)
+        
+        # يعاد التحليل في كل مرة حتى يحصل كل مستدعٍ على نسخة مستقلة من النتائج
+        return self._extract_json_from_text(response_text)
     
     def _extract_json_from_text(self, text: str) -> Dict[str, Any]:
         """استخراج JSON من النص"""
@@ -319,8 +698,10 @@ class BaseAPIClient(ABC):
             end_idx = text.rfind('}') + 1
             
             if start_idx >= 0 and end_idx > start_idx:
-                json_str = text[start_idx:end_idx]
-                return json.loads(json_str)
+                # تجنب نسخ النص عندما يكون JSON هو النص كاملاً
+                if start_idx == 0 and end_idx == len(text):
+                    return loads_json(text)
+                return loads_json(text[start_idx:end_idx])
             else:
                 return {}
         
@@ -332,6 +713,8 @@ class BaseAPIClient(ABC):
 class OpenAIClient(BaseAPIClient):
     """عميل API لـ OpenAI"""
     
+    provider = "openai"
+    
     def chat(self, messages: List[Dict[str, str]]) -> str:
         """إرسال رسائل إلى API والحصول على استجابة"""
         api_key = self.api_config.openai_api_key
@@ -341,10 +724,7 @@ class OpenAIClient(BaseAPIClient):
         url = self.api_config.openai_api_url
         model = self.api_config.openai_model
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
+        headers = self._get_headers(api_key)
         
         data = {
             "model": model,
@@ -353,83 +733,48 @@ class OpenAIClient(BaseAPIClient):
         }
         
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=60)
+            response = self.session.post(url, headers=headers, json=data, timeout=60)
             response.raise_for_status()
             
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+            return extract_response_field(response.content, "/choices/0/message/content")
         
         except Exception as e:
             logger.error(f"خطأ في OpenAI API: {str(e)}")
             raise
     
-    def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الشيفرة البرمجية باستخدام OpenAI"""
-        prompt = self.api_config.analysis_prompt_template.format(
-            language=language,
-            code=code
-        )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يحلل الشيفرة البرمجية ويكتشف المشاكل. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def analyze_security(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الثغرات الأمنية في الشيفرة البرمجية"""
-        prompt = self.api_config.security_prompt_template.format(
-            language=language,
-            code=code
-        )
+    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """إرسال رسائل إلى API واستلام الاستجابة على دفعات"""
+        api_key = self.api_config.openai_api_key
+        if not api_key:
+            raise ValueError("مفتاح API غير موجود لـ OpenAI")
         
-        messages = [
-            {"role": "system", "content": "أنت خبير أمني متخصص في اكتشاف الثغرات الأمنية في الشيفرة البرمجية. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
+        data = {
+            "model": self.api_config.openai_model,
+            "messages": messages,
+            "temperature": 0.1,
+            "stream": True
+        }
         
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def fix_issue(self, code: str, language: str, line: int, message: str) -> Dict[str, Any]:
-        """إصلاح مشكلة في الشيفرة البرمجية"""
-        prompt = self.api_config.fix_prompt_template.format(
-            language=language,
-            code=code,
-            line=line,
-            message=message
+        yield from self._stream_events(
+            self.api_config.openai_api_url, self._get_headers(api_key), data, _openai_stream_text, "OpenAI"
         )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يعمل على إصلاح المشاكل في الشيفرة البرمجية. قدم الشيفرة المصححة بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
 
 
 class ClaudeClient(BaseAPIClient):
     """عميل API لـ Claude من Anthropic"""
     
-    def chat(self, messages: List[Dict[str, str]]) -> str:
-        """إرسال رسائل إلى API والحصول على استجابة"""
-        api_key = self.api_config.claude_api_key
-        if not api_key:
-            raise ValueError("مفتاح API غير موجود لـ Claude")
-        
-        url = self.api_config.claude_api_url
-        model = self.api_config.claude_model
-        
-        headers = {
+    provider = "claude"
+    
+    def _build_headers(self, api_key: str) -> Dict[str, str]:
+        """بناء ترويسات الطلب لمفتاح API"""
+        return {
             "Content-Type": "application/json",
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01"
         }
-        
-        # تحويل تنسيق الرسائل من OpenAI إلى Claude
+    
+    def _build_payload(self, model: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """بناء جسم الطلب مع تحويل تنسيق الرسائل من OpenAI إلى Claude"""
         system_content = ""
         claude_messages = []
         
@@ -442,76 +787,56 @@ class ClaudeClient(BaseAPIClient):
                     "content": msg["content"]
                 })
         
-        data = {
+        return {
             "model": model,
             "messages": claude_messages,
             "system": system_content,
             "temperature": 0.1,
             "max_tokens": 4000
         }
+    
+    def chat(self, messages: List[Dict[str, str]]) -> str:
+        """إرسال رسائل إلى API والحصول على استجابة"""
+        api_key = self.api_config.claude_api_key
+        if not api_key:
+            raise ValueError("مفتاح API غير موجود لـ Claude")
+        
+        url = self.api_config.claude_api_url
+        model = self.api_config.claude_model
+        
+        headers = self._get_headers(api_key)
+        
+        data = self._build_payload(model, messages)
         
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=60)
+            response = self.session.post(url, headers=headers, json=data, timeout=60)
             response.raise_for_status()
             
-            result = response.json()
-            return result["content"][0]["text"]
+            return extract_response_field(response.content, "/content/0/text")
         
         except Exception as e:
             logger.error(f"خطأ في Claude API: {str(e)}")
             raise
     
-    def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الشيفرة البرمجية باستخدام Claude"""
-        prompt = self.api_config.analysis_prompt_template.format(
-            language=language,
-            code=code
-        )
+    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """إرسال رسائل إلى API واستلام الاستجابة على دفعات"""
+        api_key = self.api_config.claude_api_key
+        if not api_key:
+            raise ValueError("مفتاح API غير موجود لـ Claude")
         
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يحلل الشيفرة البرمجية ويكتشف المشاكل. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
+        data = self._build_payload(self.api_config.claude_model, messages)
+        data["stream"] = True
         
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def analyze_security(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الثغرات الأمنية في الشيفرة البرمجية"""
-        prompt = self.api_config.security_prompt_template.format(
-            language=language,
-            code=code
+        yield from self._stream_events(
+            self.api_config.claude_api_url, self._get_headers(api_key), data, _claude_stream_text, "Claude"
         )
-        
-        messages = [
-            {"role": "system", "content": "أنت خبير أمني متخصص في اكتشاف الثغرات الأمنية في الشيفرة البرمجية. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def fix_issue(self, code: str, language: str, line: int, message: str) -> Dict[str, Any]:
-        """إصلاح مشكلة في الشيفرة البرمجية"""
-        prompt = self.api_config.fix_prompt_template.format(
-            language=language,
-            code=code,
-            line=line,
-            message=message
-        )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يعمل على إصلاح المشاكل في الشيفرة البرمجية. قدم الشيفرة المصححة بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
 
 
 class GrokClient(BaseAPIClient):
     """عميل API لـ Grok"""
     
+    provider = "grok"
+    
     def chat(self, messages: List[Dict[str, str]]) -> str:
         """إرسال رسائل إلى API والحصول على استجابة"""
         api_key = self.api_config.grok_api_key
@@ -521,10 +846,7 @@ class GrokClient(BaseAPIClient):
         url = self.api_config.grok_api_url
         model = self.api_config.grok_model
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
+        headers = self._get_headers(api_key)
         
         data = {
             "model": model,
@@ -533,67 +855,47 @@ class GrokClient(BaseAPIClient):
         }
         
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=60)
+            response = self.session.post(url, headers=headers, json=data, timeout=60)
             response.raise_for_status()
             
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+            return extract_response_field(response.content, "/choices/0/message/content")
         
         except Exception as e:
             logger.error(f"خطأ في Grok API: {str(e)}")
             raise
     
-    def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الشيفرة البرمجية باستخدام Grok"""
-        prompt = self.api_config.analysis_prompt_template.format(
-            language=language,
-            code=code
-        )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يحلل الشيفرة البرمجية ويكتشف المشاكل. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def analyze_security(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الثغرات الأمنية في الشيفرة البرمجية"""
-        prompt = self.api_config.security_prompt_template.format(
-            language=language,
-            code=code
-        )
+    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """إرسال رسائل إلى API واستلام الاستجابة على دفعات"""
+        api_key = self.api_config.grok_api_key
+        if not api_key:
+            raise ValueError("مفتاح API غير موجود لـ Grok")
         
-        messages = [
-            {"role": "system", "content": "أنت خبير أمني متخصص في اكتشاف الثغرات الأمنية في الشيفرة البرمجية. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
+        data = {
+            "model": self.api_config.grok_model,
+            "messages": messages,
+            "temperature": 0.1,
+            "stream": True
+        }
         
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def fix_issue(self, code: str, language: str, line: int, message: str) -> Dict[str, Any]:
-        """إصلاح مشكلة في الشيفرة البرمجية"""
-        prompt = self.api_config.fix_prompt_template.format(
-            language=language,
-            code=code,
-            line=line,
-            message=message
+        yield from self._stream_events(
+            self.api_config.grok_api_url, self._get_headers(api_key), data, _openai_stream_text, "Grok"
         )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يعمل على إصلاح المشاكل في الشيفرة البرمجية. قدم الشيفرة المصححة بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
+
+
+@lru_cache(maxsize=4)
+def _get_xai_sdk_client(api_key: str) -> OpenAI:
+    """عميل مكتبة OpenAI لنقطة نهاية X.AI، مشترك لكل مفتاح حتى يعاد استخدام اتصالاته"""
+    return OpenAI(
+        api_key=api_key,
+        base_url="https://api.x.ai/v1",
+    )
 
 
 class XAIClient(BaseAPIClient):
     """عميل API لـ X.AI (Grok-3-beta)"""
     
+    provider = "xai"
+    
     def chat(self, messages: List[Dict[str, str]]) -> str:
         """إرسال رسائل إلى API والحصول على استجابة"""
         api_key = self.api_config.xai_api_key
@@ -604,10 +906,7 @@ class XAIClient(BaseAPIClient):
         
         try:
             # استخدام مكتبة OpenAI مع تغيير نقطة النهاية
-            client = OpenAI(
-                api_key=api_key,
-                base_url="https://api.x.ai/v1",
-            )
+            client = _get_xai_sdk_client(api_key)
             
             completion = client.chat.completions.create(
                 model=model,
@@ -621,57 +920,38 @@ class XAIClient(BaseAPIClient):
             logger.error(f"خطأ في X.AI API: {str(e)}")
             raise
     
-    def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الشيفرة البرمجية باستخدام X.AI (Grok-3-beta)"""
-        prompt = self.api_config.analysis_prompt_template.format(
-            language=language,
-            code=code
-        )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يحلل الشيفرة البرمجية ويكتشف المشاكل. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def analyze_security(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الثغرات الأمنية في الشيفرة البرمجية"""
-        prompt = self.api_config.security_prompt_template.format(
-            language=language,
-            code=code
-        )
-        
-        messages = [
-            {"role": "system", "content": "أنت خبير أمني متخصص في اكتشاف الثغرات الأمنية في الشيفرة البرمجية. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def fix_issue(self, code: str, language: str, line: int, message: str) -> Dict[str, Any]:
-        """إصلاح مشكلة في الشيفرة البرمجية"""
-        prompt = self.api_config.fix_prompt_template.format(
-            language=language,
-            code=code,
-            line=line,
-            message=message
-        )
+    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """إرسال رسائل إلى API واستلام الاستجابة على دفعات"""
+        api_key = self.api_config.xai_api_key
+        if not api_key:
+            raise ValueError("مفتاح API غير موجود لـ X.AI")
         
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يعمل على إصلاح المشاكل في الشيفرة البرمجية. قدم الشيفرة المصححة بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
+        try:
+            client = _get_xai_sdk_client(api_key)
+            
+            stream = client.chat.completions.create(
+                model=self.api_config.xai_model,
+                messages=messages,
+                temperature=0.1,
+                stream=True,
+            )
+            
+            for chunk in stream:
+                if chunk.choices:
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        yield text
         
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
+        except Exception as e:
+            logger.error(f"خطأ في X.AI API: {str(e)}")
+            raise
 
 
 class DeepSeekClient(BaseAPIClient):
     """عميل API لـ DeepSeek"""
     
+    provider = "deepseek"
+    
     def chat(self, messages: List[Dict[str, str]]) -> str:
         """إرسال رسائل إلى API والحصول على استجابة"""
         api_key = self.api_config.deepseek_api_key
@@ -681,10 +961,7 @@ class DeepSeekClient(BaseAPIClient):
         url = self.api_config.deepseek_api_url
         model = self.api_config.deepseek_model
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
+        headers = self._get_headers(api_key)
         
         data = {
             "model": model,
@@ -693,83 +970,62 @@ class DeepSeekClient(BaseAPIClient):
         }
         
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=60)
+            response = self.session.post(url, headers=headers, json=data, timeout=60)
             response.raise_for_status()
             
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+            return extract_response_field(response.content, "/choices/0/message/content")
         
         except Exception as e:
             logger.error(f"خطأ في DeepSeek API: {str(e)}")
             raise
     
-    def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الشيفرة البرمجية باستخدام DeepSeek"""
-        prompt = self.api_config.analysis_prompt_template.format(
-            language=language,
-            code=code
-        )
+    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """إرسال رسائل إلى API واستلام الاستجابة على دفعات"""
+        api_key = self.api_config.deepseek_api_key
+        if not api_key:
+            raise ValueError("مفتاح API غير موجود لـ DeepSeek")
         
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يحلل الشيفرة البرمجية ويكتشف المشاكل. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
+        data = {
+            "model": self.api_config.deepseek_model,
+            "messages": messages,
+            "temperature": 0.1,
+            "stream": True
+        }
         
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def analyze_security(self, code: str, language: str) -> Dict[str, Any]:
-        """تحليل الثغرات الأمنية في الشيفرة البرمجية"""
-        prompt = self.api_config.security_prompt_template.format(
-            language=language,
-            code=code
+        yield from self._stream_events(
+            self.api_config.deepseek_api_url, self._get_headers(api_key), data, _openai_stream_text, "DeepSeek"
         )
-        
-        messages = [
-            {"role": "system", "content": "أنت خبير أمني متخصص في اكتشاف الثغرات الأمنية في الشيفرة البرمجية. قدم نتائج التحليل بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
-    
-    def fix_issue(self, code: str, language: str, line: int, message: str) -> Dict[str, Any]:
-        """إصلاح مشكلة في الشيفرة البرمجية"""
-        prompt = self.api_config.fix_prompt_template.format(
-            language=language,
-            code=code,
-            line=line,
-            message=message
-        )
-        
-        messages = [
-            {"role": "system", "content": "أنت مساعد برمجة خبير يعمل على إصلاح المشاكل في الشيفرة البرمجية. قدم الشيفرة المصححة بتنسيق JSON فقط."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response_text = self.chat(messages)
-        return self._extract_json_from_text(response_text)
+
+
+# فئة العميل لكل مزود
+_CLIENT_CLASSES = {
+    "openai": OpenAIClient,
+    "claude": ClaudeClient,
+    "grok": GrokClient,
+    "xai": XAIClient,
+    "deepseek": DeepSeekClient
+}
 
 
 def get_api_client(api_config: APIConfig, provider: str = None) -> BaseAPIClient:
     """الحصول على عميل API المناسب"""
-    if provider is None:
-        provider = api_config.preferred_provider
-    
-    if provider == "openai":
-        return OpenAIClient(api_config)
-    elif provider == "claude":
-        return ClaudeClient(api_config)
-    elif provider == "grok":
-        return GrokClient(api_config)
-    elif provider == "xai":
-        return XAIClient(api_config)
-    elif provider == "deepseek":
-        return DeepSeekClient(api_config)
-    else:
-        # استخدام المزود المفضل إذا كان المزود المطلوب غير معروف
-        provider = api_config.preferred_provider
-        return get_api_client(api_config, provider)
+    client_class = _CLIENT_CLASSES.get(provider)
+    if client_class is None:
+        # استخدام المزود المفضل إذا كان المزود المطلوب غير محدد أو غير معروف
+        client_class = _CLIENT_CLASSES.get(api_config.preferred_provider)
+        if client_class is None:
+            raise ValueError(f"مزود API غير معروف: {api_config.preferred_provider}")
+    
+    # عميل واحد لكل مزود في كل إعدادات (العملاء يقرأون المفاتيح من الإعدادات عند كل طلب)
+    clients = getattr(api_config, "_clients", None)
+    if clients is None:
+        clients = {}
+        object.__setattr__(api_config, "_clients", clients)
+    
+    client = clients.get(client_class)
+    if client is None:
+        client = clients.setdefault(client_class, client_class(api_config))
+    return client
 
 
 class APIManager:
@@ -777,18 +1033,30 @@ class APIManager:
     
     def __init__(self, api_config: APIConfig):
         self.api_config = api_config
-        self.clients = {}
+        self.clients = {}  # عميل واحد لكل مزود (محدود بعدد المزودين)
+        self._lock = threading.Lock()
+        self._available_cache = None  # (رقم إصدار المفاتيح، المزودون المتاحون)
     
     def get_client(self, provider: str = None) -> BaseAPIClient:
         """الحصول على عميل API"""
         if provider is None:
             provider = self.api_config.preferred_provider
         
-        # إنشاء العميل إذا لم يكن موجوداً
-        if provider not in self.clients:
-            self.clients[provider] = get_api_client(self.api_config, provider)
+        client = self.clients.get(provider)
+        if client is None:
+            # إنشاء العميل إذا لم يكن موجوداً (القفل فقط عند عدم الوجود)
+            with self._lock:
+                client = self.clients.get(provider)
+                if client is None:
+                    client = get_api_client(self.api_config, provider)
+                    self.clients[provider] = client
         
-        return self.clients[provider]
+        return client
+    
+    def prewarm(self) -> None:
+        """إنشاء عملاء جميع المزودين المتاحين مسبقاً"""
+        for provider in self.get_available_providers():
+            self.get_client(provider)
     
     def test_connection(self, provider: str) -> bool:
         """اختبار الاتصال بمزود API"""
@@ -805,26 +1073,15 @@ class APIManager:
             logger.error(f"فشل اختبار الاتصال لـ {provider}: {str(e)}")
             return False
     
-    def get_available_providers(self) -> List[str]:
+    def get_available_providers(self) -> Tuple[str, ...]:
         """الحصول على قائمة بمزودي API المتاحين (لديهم مفاتيح API)"""
-        providers = []
-        
-        if self.api_config.openai_api_key:
-            providers.append("openai")
-        
-        if self.api_config.claude_api_key:
-            providers.append("claude")
-        
-        if self.api_config.grok_api_key:
-            providers.append("grok")
-        
-        if self.api_config.xai_api_key:
-            providers.append("xai")
-        
-        if self.api_config.deepseek_api_key:
-            providers.append("deepseek")
-        
-        return providers
+        version = self.api_config.keys_version
+        cache = self._available_cache
+        if cache is None or cache[0] != version:
+            providers = tuple(provider for provider, field in _KEY_FIELDS.items() if getattr(self.api_config, field))
+            cache = (version, providers)
+            self._available_cache = cache
+        return cache[1]
     
     def analyze_code_with_multiple_providers(self, code: str, language: str) -> Dict[str, Any]:
         """تحليل الشيفرة باستخدام عدة مزودين وجمع النتائج"""
@@ -832,11 +1089,20 @@ class APIManager:
         if not providers:
             raise ValueError("لا يوجد مزودي API متاحين")
         
+        # إرسال الطلبات لكل المزودين بالتوازي، فيصبح الزمن الكلي زمن أبطأ مزود بدلاً من مجموعها
+        with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+            futures = {}
+            for provider in providers:
+                try:
+                    futures[provider] = executor.submit(self.get_client(provider).analyze_code, code, language)
+                except Exception as e:
+                    logger.error(f"خطأ في تحليل الشيفرة باستخدام {provider}: {str(e)}")
+        
+        # جمع النتائج بترتيب المزودين حتى تبقى إزالة التكرارات كما هي
         all_issues = []
-        for provider in providers:
+        for provider, future in futures.items():
             try:
-                client = self.get_client(provider)
-                results = client.analyze_code(code, language)
+                results = future.result()
                 
                 if "issues" in results and isinstance(results["issues"], list):
                     for issue in results["issues"]:
@@ -848,18 +1114,20 @@ class APIManager:
         
         # تخلص من التكرارات وجمع النتائج
         unique_issues = []
-        seen_messages = set()
+        append_issue = unique_issues.append
+        seen = set()
+        add_seen = seen.add
         
         for issue in all_issues:
-            key = f"{issue.get('line', 0)}_{issue.get('message', '')}"
-            if key not in seen_messages:
-                seen_messages.add(key)
-                unique_issues.append(issue)
+            # السطر والرسالة كنصوص حتى يتطابق 12 و "12" القادمان من مزودين مختلفين،
+            # ولا يفشل التحليل إذا أعاد أحد المزودين رسالة كقائمة أو قاموس
+            key = (str(issue.get('line', 0)), str(issue.get('message', '')))
+            if key not in seen:
+                add_seen(key)
+                append_issue(issue)
         
         # ترتيب المشاكل حسب الخطورة
-        unique_issues.sort(
-            key=lambda x: {"عالية": 0, "متوسطة": 1, "منخفضة": 2}.get(x.get("severity", "متوسطة"), 3)
-        )
+        unique_issues.sort(key=severity_sort_key)
         
         return {
             "issues": unique_issues,
@@ -5,14 +5,17 @@
 """
 import os
 import re
-import json
+import sys
 import logging
 import time
+import bisect
+import contextlib
 from typing import Dict, List, Any, Tuple, Optional, Union
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 
-from PySide6.QtCore import QObject, Signal, Slot, QThread
+from PySide6.QtCore import QObject, Signal, Slot, QThread, QTimer, QRunnable, QThreadPool
 from PySide6.QtWidgets import QWidget
 
 # استيراد المكونات الضرورية مع معالجة استثناءات الاستيراد
@@ -23,17 +26,55 @@ except ImportError:
     HAS_THREAD_MANAGER = False
     logging.getLogger("CodeAnalyzer.Chat").warning("تعذر استيراد APIThreadManager. لن يتم تنظيف خيوط المحادثة تلقائياً.")
 
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
 from api_clients import APIConfig, get_api_client, XAIClient
-from utils import save_json, read_file, write_file, ensure_dir
+from utils import save_json, loads_json, dumps_json, write_bytes_atomic, write_file, ensure_dir
 
 logger = logging.getLogger("CodeAnalyzer.Chat")
 
-@dataclass
+# مهلة تجميع عمليات حفظ الجلسة (بالمللي ثانية)
+_SESSION_SAVE_DELAY_MS = 500
+
+# ملف فهرس الجلسات (بيانات وصفية فقط، دون الرسائل)
+_SESSION_INDEX_FILE = "_index.json"
+
+# امتداد ملفات الجلسات: MessagePack إذا كانت المكتبة متوفرة، وإلا JSON
+_SESSION_FILE_EXT = ".msgp" if HAS_MSGPACK else ".json"
+_SESSION_FILE_EXTS = (".msgp", ".json")
+
+# الجلسات الأطول من هذا العدد تحفظ رسائلها بتنسيق أعمدة (SoA) بدلاً من قائمة كائنات
+_SOA_MIN_MESSAGES = 32
+
+# أنماط استخراج تعديلات الكود (تترجم مرة واحدة عند تحميل الوحدة)
+_CODE_BLOCK_RE = re.compile(r"```(?:\w+)?\s*([\s\S]*?)```")
+_FILE_PATH_RE = re.compile(r"[`'\"]([^`'\"]+\.(py|js|dart|php|html|css|json))[`'\"]")
+_DESCRIPTION_RE = re.compile(r"(?:يمكن|يجب|اقترح)\s+(?:تعديل|تغيير|تحديث)([^.]+)")
+
+# أنماط استخراج الشيفرة العامة من الرد
+_GENERIC_CODE_RE = re.compile(r"```(.*?)```", re.DOTALL)
+_INLINE_CODE_RE = re.compile(r"`(.*?)`", re.DOTALL)
+
+
+@lru_cache(maxsize=16)
+def _code_patterns(language: str) -> Tuple[re.Pattern, ...]:
+    """أنماط استخراج الشيفرة بالترتيب: لغة محددة ثم عام ثم بديل"""
+    return (
+        re.compile(rf"```{re.escape(language)}(.*?)```", re.DOTALL),
+        _GENERIC_CODE_RE,
+        _INLINE_CODE_RE
+    )
+
+@dataclass(slots=True)
 class ChatMessage:
     """تمثيل رسالة محادثة"""
     role: str  # "user" أو "assistant" أو "system"
     content: str
-    timestamp: float = field(default_factory=lambda: datetime.now().timestamp())
+    timestamp: float = field(default_factory=time.time)
     
     def to_dict(self) -> Dict[str, Any]:
         """تحويل الرسالة إلى قاموس"""
@@ -47,19 +88,57 @@ class ChatMessage:
     def from_dict(cls, data: Dict[str, Any]) -> 'ChatMessage':
         """إنشاء رسالة من قاموس"""
         return cls(
-            role=data.get("role", "user"),
+            role=sys.intern(data.get("role", "user")),
             content=data.get("content", ""),
-            timestamp=data.get("timestamp", datetime.now().timestamp())
+            timestamp=data["timestamp"] if "timestamp" in data else time.time()
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatSession:
     """تمثيل جلسة محادثة"""
     id: str  # معرف فريد للجلسة
     title: str  # عنوان الجلسة
     messages: List[ChatMessage] = field(default_factory=list)
-    created_at: float = field(default_factory=lambda: datetime.now().timestamp())
+    created_at: float = field(default_factory=time.time)
+    
+    # ترميز JSON المحفوظ لحقول كل رسالة، حتى لا يعاد ترميز المحادثة كاملة عند كل حفظ
+    _encoded_messages: List[Tuple[bytes, bytes, bytes]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _encoded_source: Optional[List[ChatMessage]] = field(default=None, init=False, repr=False, compare=False)
+    
+    # الرسائل بتنسيق API، تُبنى للرسائل الجديدة فقط
+    _api_messages: List[Dict[str, str]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _api_source: Optional[List[ChatMessage]] = field(default=None, init=False, repr=False, compare=False)
+    
+    # الجلسات المحملة من الفهرس لا تحتوي رسائلها حتى يتم فتحها
+    _loaded: bool = field(default=True, init=False, repr=False, compare=False)
+    _indexed_message_count: int = field(default=0, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_index_entry(cls, entry: Dict[str, Any]) -> 'ChatSession':
+        """إنشاء جلسة خفيفة من مدخل الفهرس (تُحمل رسائلها عند فتحها)"""
+        session = cls(
+            id=entry.get("id", ""),
+            title=entry.get("title", ""),
+            created_at=entry.get("created_at", 0)
+        )
+        session._loaded = False
+        session._indexed_message_count = entry.get("message_count", 0)
+        return session
+    
+    def index_entry(self) -> Dict[str, Any]:
+        """مدخل الجلسة في فهرس الجلسات"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "created_at": self.created_at,
+            "message_count": self.message_count
+        }
+    
+    @property
+    def message_count(self) -> int:
+        """عدد الرسائل في الجلسة (من الفهرس إذا لم تحمل الرسائل بعد)"""
+        return len(self.messages) if self._loaded else self._indexed_message_count
     
     def add_message(self, role: str, content: str) -> ChatMessage:
         """إضافة رسالة إلى الجلسة"""
@@ -68,7 +147,23 @@ class ChatSession:
         return message
     
     def to_dict(self) -> Dict[str, Any]:
-        """تحويل الجلسة إلى قاموس"""
+        """
+        تحويل الجلسة إلى قاموس
+        
+        تحفظ رسائل الجلسات الطويلة كأعمدة ("roles" و"contents" و"timestamps")
+        لتجنب تكرار أسماء الحقول في كل رسالة، والجلسات القصيرة كقائمة رسائل.
+        """
+        if len(self.messages) > _SOA_MIN_MESSAGES:
+            return {
+                "id": self.id,
+                "title": self.title,
+                "format": "soa",
+                "roles": [msg.role for msg in self.messages],
+                "contents": [msg.content for msg in self.messages],
+                "timestamps": [msg.timestamp for msg in self.messages],
+                "created_at": self.created_at
+            }
+        
         return {
             "id": self.id,
             "title": self.title,
@@ -82,25 +177,88 @@ class ChatSession:
         session = cls(
             id=data.get("id", ""),
             title=data.get("title", ""),
-            created_at=data.get("created_at", datetime.now().timestamp())
+            created_at=data["created_at"] if "created_at" in data else time.time()
         )
         
-        session.messages = [
-            ChatMessage.from_dict(msg) for msg in data.get("messages", [])
-        ]
+        if data.get("format") == "soa":
+            session.messages = [
+                ChatMessage(sys.intern(role), content, timestamp)
+                for role, content, timestamp in zip(data["roles"], data["contents"], data["timestamps"])
+            ]
+        else:
+            session.messages = [
+                ChatMessage.from_dict(msg) for msg in data.get("messages", [])
+            ]
         
         return session
     
     def clear_messages(self):
         """مسح جميع الرسائل في الجلسة"""
         self.messages = []
+        self._encoded_messages = []
+        self._api_messages = []
+    
+    def to_json_bytes(self) -> bytes:
+        """
+        ترميز الجلسة إلى JSON (مكافئ لـ to_dict)
+        
+        تُرمّز الرسائل الجديدة فقط، ويعاد استخدام ترميز الرسائل السابقة.
+        """
+        encoded = self._encoded_messages
+        messages = self.messages
+        if self._encoded_source is not messages or len(encoded) > len(messages):
+            # استبدال قائمة الرسائل أو حذف رسائل منها يبطل الترميز المحفوظ
+            encoded.clear()
+            self._encoded_source = messages
+        
+        for message in messages[len(encoded):]:
+            encoded.append((
+                dumps_json(message.role),
+                dumps_json(message.content),
+                dumps_json(message.timestamp)
+            ))
+        
+        if len(encoded) > _SOA_MIN_MESSAGES:
+            roles, contents, timestamps = zip(*encoded)
+            messages_json = (
+                b',"format":"soa","roles":[', b','.join(roles),
+                b'],"contents":[', b','.join(contents),
+                b'],"timestamps":[', b','.join(timestamps), b']'
+            )
+        else:
+            messages_json = (
+                b',"messages":[',
+                b','.join(
+                    b'{"role":%s,"content":%s,"timestamp":%s}' % fields
+                    for fields in encoded
+                ),
+                b']'
+            )
+        
+        return b''.join((
+            b'{"id":', dumps_json(self.id),
+            b',"title":', dumps_json(self.title),
+            *messages_json,
+            b',"created_at":', dumps_json(self.created_at),
+            b'}'
+        ))
     
     def get_api_messages(self) -> List[Dict[str, str]]:
         """الحصول على الرسائل بتنسيق مناسب لواجهة API"""
-        return [
+        api_messages = self._api_messages
+        messages = self.messages
+        if self._api_source is not messages or len(api_messages) > len(messages):
+            # استبدال قائمة الرسائل أو حذف رسائل منها يبطل القائمة المحفوظة
+            api_messages.clear()
+            self._api_source = messages
+        
+        api_messages.extend(
             {"role": msg.role, "content": msg.content}
-            for msg in self.messages
-        ]
+            for msg in messages[len(api_messages):]
+        )
+        
+        # نسخة سطحية لأن المستدعي يضيف إلى القائمة المعادة (مثل تاريخ المحادثة)
+        return list(api_messages)
 
 
 class ChatThread(QThread):
@@ -122,18 +280,8 @@ class ChatThread(QThread):
     def run(self):
         """تنفيذ المحادثة"""
         try:
-            # اختيار المزود المناسب
-            provider = self.provider
-            
-            # التحقق من وجود مفتاح API
-            if not self.api_config.get_api_key(provider):
-                # محاولة استخدام مزود آخر متاح
-                for alt_provider in ["xai", "openai", "claude", "grok", "deepseek"]:
-                    if self.api_config.get_api_key(alt_provider):
-                        provider = alt_provider
-                        break
-                else:
-                    raise ValueError("لا يوجد مفتاح API متاح. يرجى إضافة مفتاح API في الإعدادات.")
+            # اختيار المزود المناسب (أو مزود بديل متاح إذا لم يكن له مفتاح API)
+            provider = self.api_config.pick_available_provider(self.provider)
             
             # الحصول على العميل المناسب
             client = get_api_client(self.api_config, provider)
@@ -157,7 +305,9 @@ class ChatWorker(QObject):
     """عامل معالجة المحادثة في خلفية البرنامج"""
     
     finished = Signal(str)  # إشارة لإنهاء المعالجة
+    chunk = Signal(str)  # إشارة لكل جزء جديد من الاستجابة أثناء البث
     error = Signal(str)  # إشارة للأخطاء
+    done = Signal()  # إشارة انتهاء المهمة (تُرسل دائماً، حتى للعامل الملغى)
     
     def __init__(self, api_config: APIConfig, message: str, history: List[Dict[str, str]]):
         super().__init__()
@@ -165,106 +315,149 @@ class ChatWorker(QObject):
         self.message = message
         self.history = history
         self.provider = api_config.preferred_provider
+        self.canceled = False  # تُتجاهل نتيجة العامل الملغى
     
     @Slot()
     def process(self):
         """معالجة الرسالة والحصول على استجابة"""
         try:
-            # إعداد الرسائل
-            messages = self.history.copy()
-            messages.append({"role": "user", "content": self.message})
-            
-            # اختيار المزود المناسب
-            provider = self.provider
+            # إعداد الرسائل: إذا كان التاريخ ينتهي برسالة المستخدم (كما يفعل ChatComponent.send_message)
+            # يُستخدم كما هو دون نسخه، وإلا تضاف الرسالة إلى نسخة جديدة
+            user_message = {"role": "user", "content": self.message}
+            if self.history and self.history[-1] == user_message:
+                messages = self.history
+            else:
+                messages = [*self.history, user_message]
             
-            # التحقق من وجود مفتاح API
-            if not self.api_config.get_api_key(provider):
-                # محاولة استخدام مزود آخر متاح
-                for alt_provider in ["xai", "openai", "claude", "grok", "deepseek"]:
-                    if self.api_config.get_api_key(alt_provider):
-                        provider = alt_provider
-                        break
-                else:
-                    raise ValueError("لا يوجد مفتاح API متاح. يرجى إضافة مفتاح API في الإعدادات.")
+            # اختيار المزود المناسب (أو مزود بديل متاح إذا لم يكن له مفتاح API)
+            provider = self.api_config.pick_available_provider(self.provider)
             
             # الحصول على العميل المناسب
             client = get_api_client(self.api_config, provider)
             
-            # إرسال الرسائل والحصول على الاستجابة
-            response = client.chat(messages)
+            # إرسال الرسائل واستلام الاستجابة على دفعات (يتوقف البث عند إلغاء العامل)
+            parts = []
+            for part in client.chat_stream(messages):
+                if self.canceled:
+                    break
+                parts.append(part)
+                self.chunk.emit(part)
             
-            self.finished.emit(response)
+            self.finished.emit("".join(parts))
         
         except Exception as e:
             logger.error(f"خطأ في معالجة المحادثة: {str(e)}")
             self.error.emit(str(e))
 
 
+class ChatRunnable(QRunnable):
+    """مهمة محادثة تنفذ في مجمع خيوط Qt المشترك بدلاً من إنشاء خيط لكل رسالة"""
+    
+    def __init__(self, worker: ChatWorker):
+        super().__init__()
+        # QRunnable ليس QObject، لذا تُرسل الإشارات عبر ChatWorker
+        self.worker = worker
+        self.setAutoDelete(False)
+    
+    def run(self):
+        """تنفيذ المحادثة ما لم يتم إلغاؤها قبل البدء"""
+        try:
+            if not self.worker.canceled:
+                self.worker.process()
+        finally:
+            # إشعار المكون بانتهاء المهمة حتى يحررها، سواء نُفذت أم ألغيت
+            self.worker.done.emit()
+
+
 class CodeModificationExtractor:
     """استخراج التعديلات المقترحة من ردود المحادثة"""
     
     def __init__(self):
-        # أنماط استخراج تعديلات الكود
+        # أنماط استخراج تعديلات الكود (مترجمة مسبقاً)
         self.patterns = {
             # نمط لاستخراج قسم من الشيفرة البرمجية
-            "code_block": r"```(?:\w+)?\s*([\s\S]*?)```",
+            "code_block": _CODE_BLOCK_RE,
             
             # نمط لاستخراج مسار الملف
-            "file_path": r"[`'\"]([^`'\"]+\.(py|js|dart|php|html|css|json))[`'\"]",
+            "file_path": _FILE_PATH_RE,
             
             # نمط لاستخراج وصف التعديل
-            "modification_description": r"(?:يمكن|يجب|اقترح)\s+(?:تعديل|تغيير|تحديث)([^.]+)"
+            "modification_description": _DESCRIPTION_RE
         }
     
     def extract_code_blocks(self, text: str) -> List[str]:
         """
         استخراج كتل الكود من النص
         """
-        return re.findall(self.patterns["code_block"], text)
+        return self.patterns["code_block"].findall(text)
 
     def extract_file_paths(self, text: str) -> List[str]:
         """
         استخراج مسارات الملفات من النص
         """
-        return [match[0] for match in re.findall(self.patterns["file_path"], text)]
+        return [match[0] for match in self.patterns["file_path"].findall(text)]
 
     def extract_modifications(self, response: str) -> List[Dict[str, Any]]:
         """
         استخراج التعديلات المقترحة من رد المحادثة
         """
         modifications = []
-        code_blocks = self.extract_code_blocks(response)
-        file_paths = self.extract_file_paths(response)
+        code_matches = list(self.patterns["code_block"].finditer(response))
+        path_matches = list(self.patterns["file_path"].finditer(response))
+
+        if code_matches and path_matches:
+            # فهرسة أوصاف التعديلات في مرور واحد على النص (مواضع البداية والنصوص)
+            descriptions = [
+                (match.start(), match.group(1).strip())
+                for match in self.patterns["modification_description"].finditer(response)
+            ]
+            description_starts = [start for start, _ in descriptions]
 
-        if code_blocks and file_paths:
-            if len(code_blocks) == len(file_paths):
-                for i in range(len(code_blocks)):
+            if len(code_matches) == len(path_matches):
+                description = descriptions[0][1] if descriptions else "تعديل مقترح"
+                for path_match, code_match in zip(path_matches, code_matches):
                     modifications.append({
-                        "file_path": file_paths[i],
-                        "code": code_blocks[i],
-                        "description": self._extract_description(response)
+                        "file_path": path_match.group(1),
+                        "code": code_match.group(1),
+                        "description": description
                     })
             else:
-                paragraphs = response.split('\n\n')
-                for paragraph in paragraphs:
-                    code_in_paragraph = self.extract_code_blocks(paragraph)
-                    files_in_paragraph = self.extract_file_paths(paragraph)
+                # دمج بمؤشرين في مرور واحد: كل كتلة كود تقترن بآخر مسار ملف يسبقها
+                # (المسار ثم الكود، كما يطلب قالب توليد الميزات)
+                paths = iter(path_matches)
+                next_path = next(paths, None)
+                pending_path = None
+                segment_start = 0
+
+                for code_match in code_matches:
+                    code_start = code_match.start()
+                    while next_path is not None and next_path.end() <= code_start:
+                        # تجاهل المسارات الواردة داخل كتلة الكود السابقة
+                        if next_path.start() >= segment_start:
+                            pending_path = next_path
+                        next_path = next(paths, None)
 
-                    for j in range(min(len(code_in_paragraph), len(files_in_paragraph))):
+                    if pending_path is not None:
                         modifications.append({
-                            "file_path": files_in_paragraph[j],
-                            "code": code_in_paragraph[j],
-                            "description": self._extract_description(paragraph)
+                            "file_path": pending_path.group(1),
+                            "code": code_match.group(1),
+                            "description": self._find_description(descriptions, description_starts, segment_start, code_start)
                         })
+                        pending_path = None
+
+                    segment_start = code_match.end()
 
         return modifications
 
-    def _extract_description(self, text: str) -> str:
+    @staticmethod
+    def _find_description(descriptions: List[Tuple[int, str]], starts: List[int], start: int, end: int) -> str:
         """
-        استخراج وصف التعديل
+        الوصف الأقرب قبل الموضع end ضمن الجزء [start, end) من النص
         """
-        match = re.search(self.patterns["modification_description"], text)
-        return match.group(1).strip() if match else "تعديل مقترح"
+        idx = bisect.bisect_left(starts, end) - 1
+        if idx >= 0 and starts[idx] >= start:
+            return descriptions[idx][1]
+        return "تعديل مقترح"
 
 
 class FeatureDevelopmentHelper:
@@ -318,6 +511,7 @@ class FeatureDevelopmentHelper:
     def apply_feature(self, feature_data: Dict[str, Any]) -> List[str]:
         """تطبيق الميزة المقترحة على المشروع"""
         applied_files = []
+        created_dirs = set()  # المجلدات التي تم التأكد من وجودها
         
         for mod in feature_data.get("modifications", []):
             file_path = mod.get("file_path", "")
@@ -330,19 +524,14 @@ class FeatureDevelopmentHelper:
             if not os.path.isabs(file_path):
                 file_path = os.path.join(self.project_dir, file_path)
             
-            # التحقق من وجود الملف
-            file_exists = os.path.exists(file_path)
+            # إنشاء مجلد الملف إن لم يكن موجوداً (مرة واحدة لكل مجلد)
+            parent_dir = os.path.dirname(file_path)
+            if parent_dir not in created_dirs:
+                os.makedirs(parent_dir, exist_ok=True)
+                created_dirs.add(parent_dir)
             
-            if file_exists:
-                # تعديل ملف موجود
-                original_content = read_file(file_path) or ""
-                if write_file(file_path, code):
-                    applied_files.append(file_path)
-            else:
-                # إنشاء ملف جديد
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                if write_file(file_path, code):
-                    applied_files.append(file_path)
+            if write_file(file_path, code):
+                applied_files.append(file_path)
         
         return applied_files
 
@@ -352,6 +541,7 @@ class ChatComponent(QWidget):
     
     message_sent = Signal(ChatMessage)
     message_received = Signal(ChatMessage)
+    message_chunk_received = Signal(str)  # جزء جديد من رد المساعد أثناء البث
     error_occurred = Signal(str)
     
     def __init__(self, api_config: APIConfig, project_dir: str = None, parent=None):
@@ -362,14 +552,26 @@ class ChatComponent(QWidget):
         self.api_config = api_config
         self.project_dir = project_dir
         self.current_session = None
-        self.sessions = []
-        self.chat_threads = []  # قائمة لتتبع جميع الخيوط النشطة
+        self.sessions = []  # مرتبة حسب تاريخ الإنشاء (الأحدث أولاً)
+        self._session_keys: List[float] = []  # مفاتيح ترتيب الجلسات (سالب تاريخ الإنشاء) بمحاذاة self.sessions
+        self._sessions_by_id: Dict[str, ChatSession] = {}  # فهرس الجلسات حسب المعرف
+        self._active_runnables = {}  # مهام المحادثة الجارية (العامل -> المهمة)
         self.conversation_history = []  # تاريخ المحادثة
         
+        # مؤقت لتجميع عمليات حفظ الجلسة، حتى لا يكتب الملف مرتين في كل دورة محادثة
+        self._pending_save_session = None
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self.flush_session_save)
+        
+        # فهرس الجلسات في الذاكرة (معرف الجلسة -> بياناتها الوصفية)، يحمل عند أول استخدام
+        self._session_index = None
+        
         # تهيئة مساعد تطوير الميزات ومجلد الجلسات
         if project_dir:
             self.feature_helper = FeatureDevelopmentHelper(project_dir, api_config)
             self.sessions_dir = os.path.join(project_dir, "_chat_sessions")
+            self._index_path = os.path.join(self.sessions_dir, _SESSION_INDEX_FILE)
             os.makedirs(self.sessions_dir, exist_ok=True)
             
         # تهيئة واجهة المستخدم
@@ -402,28 +604,55 @@ class ChatComponent(QWidget):
         # حفظ الجلسة الحالية إذا كانت موجودة
         if self.current_session:
             self.current_session.add_message("user", message)
-            self.save_current_session()
+            self.schedule_session_save()
         
-        # إزالة أي خيوط سابقة نشطة
+        # إلغاء أي طلبات سابقة نشطة
         self.stop_active_threads()
         
-        # إنشاء عامل جديد للمحادثة وخيط
+        # إنشاء عامل جديد للمحادثة وتنفيذه في مجمع الخيوط المشترك
         chat_worker = ChatWorker(self.api_config, message, self.conversation_history)
-        chat_thread = QThread()
-        chat_worker.moveToThread(chat_thread)
-        
-        # تسجيل الخيط وتوصيل الإشارات
-        self.chat_threads.append(chat_thread)
-        
-        chat_thread.started.connect(chat_worker.process)
-        chat_worker.finished.connect(lambda response: self.handle_response(response))
-        chat_worker.error.connect(lambda error: self.handle_error(error))
-        chat_worker.finished.connect(chat_thread.quit)
-        chat_worker.finished.connect(chat_worker.deleteLater)
-        chat_thread.finished.connect(lambda: self.cleanup_thread(chat_thread))
+        chat_worker.finished.connect(self._on_worker_finished)
+        chat_worker.chunk.connect(self._on_worker_chunk)
+        chat_worker.error.connect(self._on_worker_error)
+        chat_worker.done.connect(self._on_worker_done)
         
-        # بدء الخيط
-        chat_thread.start()
+        runnable = ChatRunnable(chat_worker)
+        self._active_runnables[chat_worker] = runnable
+        QThreadPool.globalInstance().start(runnable)
+    
+    @Slot(str)
+    def _on_worker_finished(self, response: str):
+        """
+        استلام استجابة عامل المحادثة (تُتجاهل استجابات العمال الملغاة)
+        """
+        worker = self.sender()
+        if worker is None or not worker.canceled:
+            self.handle_response(response)
+    
+    @Slot(str)
+    def _on_worker_chunk(self, chunk: str):
+        """
+        تمرير جزء جديد من الرد لعرضه فوراً (يُحدث التاريخ عند اكتمال الرد فقط)
+        """
+        worker = self.sender()
+        if worker is None or not worker.canceled:
+            self.message_chunk_received.emit(chunk)
+    
+    @Slot(str)
+    def _on_worker_error(self, error: str):
+        """
+        استلام خطأ عامل المحادثة (تُتجاهل أخطاء العمال الملغاة)
+        """
+        worker = self.sender()
+        if worker is None or not worker.canceled:
+            self.handle_error(error)
+    
+    @Slot()
+    def _on_worker_done(self):
+        """
+        تحرير مهمة المحادثة المنتهية (بما فيها المهام الملغاة التي بدأت قبل إزالتها من المجمع)
+        """
+        self._active_runnables.pop(self.sender(), None)
     
     def handle_response(self, response: str):
         """
@@ -442,7 +671,7 @@ class ChatComponent(QWidget):
         # حفظ الجلسة الحالية إذا كانت موجودة
         if self.current_session:
             self.current_session.add_message("assistant", response)
-            self.save_current_session()
+            self.schedule_session_save()
     
     def handle_error(self, error: str):
         """
@@ -451,28 +680,18 @@ class ChatComponent(QWidget):
         self.error_occurred.emit(error)
         logger.error(f"خطأ في المحادثة: {error}")
     
-    def cleanup_thread(self, thread: QThread):
-        """
-        تنظيف الخيط بعد انتهاء العمل
-        """
-        if thread in self.chat_threads:
-            self.chat_threads.remove(thread)
-    
     def stop_active_threads(self):
         """
-        إيقاف جميع الخيوط النشطة
+        إلغاء جميع طلبات المحادثة النشطة
+        
+        لا يمكن مقاطعة طلب جارٍ بأمان، لذلك يُلغى العامل وتُتجاهل نتيجته عند وصولها،
+        وتُزال المهام التي لم تبدأ بعد من مجمع الخيوط.
         """
-        for thread in self.chat_threads[:]:  # نسخة من القائمة لتجنب التعديل أثناء التكرار
-            if thread.isRunning():
-                thread.quit()
-                thread.wait(1000)  # انتظار ثانية واحدة للتوقف الطبيعي
-                
-                if thread.isRunning():
-                    logger.warning("الخيط لم يتوقف بشكل طبيعي، سيتم إنهاؤه بالقوة.")
-                    thread.terminate()
-                    thread.wait()
-                
-                self.chat_threads.remove(thread)
+        pool = QThreadPool.globalInstance()
+        for worker, runnable in list(self._active_runnables.items()):
+            worker.canceled = True
+            if pool.tryTake(runnable):
+                del self._active_runnables[worker]
     
     def create_new_session(self, title: str = None) -> ChatSession:
         """
@@ -492,7 +711,7 @@ class ChatComponent(QWidget):
         self.current_session.add_message("system", "أنت مساعد برمجة ذكي ومفيد. أجب دائماً باللغة العربية.")
         
         # إضافة الجلسة إلى قائمة الجلسات
-        self.sessions.append(self.current_session)
+        self._insert_session(self.current_session)
         
         # حفظ الجلسة
         self.save_current_session()
@@ -503,9 +722,30 @@ class ChatComponent(QWidget):
         """
         تحميل جلسة محادثة
         """
-        # البحث عن الجلسة في القائمة
-        for session in self.sessions:
-            if session.id == session_id:
+        # البحث عن الجلسة في فهرس الجلسات
+        session = self._sessions_by_id.get(session_id)
+        if session is not None:
+            if not session._loaded:
+                # جلسة من الفهرس: تحميل رسائلها من ملفها عند فتحها أول مرة
+                loaded_session = self._read_session_file(session_id)
+                if loaded_session is None:
+                    return None
+                self._remove_session(session)
+                self._insert_session(loaded_session)
+                session = loaded_session
+            
+            self.current_session = session
+            
+            # تحديث تاريخ المحادثة
+            self.conversation_history = session.get_api_messages()
+            
+            return session
+        
+        # إذا لم يتم العثور على الجلسة، حاول تحميلها من الملف
+        if self.project_dir:
+            session = self._read_session_file(session_id)
+            if session is not None:
+                self._insert_session(session)
                 self.current_session = session
                 
                 # تحديث تاريخ المحادثة
@@ -513,26 +753,122 @@ class ChatComponent(QWidget):
                 
                 return session
         
-        # إذا لم يتم العثور على الجلسة، حاول تحميلها من الملف
-        if self.project_dir:
-            session_path = os.path.join(self.sessions_dir, f"{session_id}.json")
-            if os.path.exists(session_path):
+        return None
+    
+    def _insert_session(self, session: ChatSession):
+        """
+        إضافة جلسة إلى قائمة الجلسات في موضعها حسب تاريخ الإنشاء (الأحدث أولاً)
+        """
+        key = -session.created_at
+        idx = bisect.bisect_left(self._session_keys, key)
+        self._session_keys.insert(idx, key)
+        self.sessions.insert(idx, session)
+        self._sessions_by_id[session.id] = session
+    
+    def _remove_session(self, session: ChatSession):
+        """
+        إزالة جلسة من قائمة الجلسات
+        """
+        key = -session.created_at
+        idx = bisect.bisect_left(self._session_keys, key)
+        while self.sessions[idx] is not session:
+            idx += 1
+        del self._session_keys[idx]
+        del self.sessions[idx]
+        self._sessions_by_id.pop(session.id, None)
+    
+    def _session_path(self, session_id: str, ext: str = _SESSION_FILE_EXT) -> str:
+        """مسار ملف الجلسة"""
+        return os.path.join(self.sessions_dir, f"{session_id}{ext}")
+    
+    def _read_session_file(self, session_id: str) -> Optional[ChatSession]:
+        """
+        قراءة جلسة كاملة من ملفها (MessagePack أولاً، ثم JSON من الإصدارات السابقة)
+        """
+        try:
+            if HAS_MSGPACK:
                 try:
-                    with open(session_path, 'r', encoding='utf-8') as f:
-                        session_data = json.load(f)
-                    
-                    session = ChatSession.from_dict(session_data)
-                    self.sessions.append(session)
-                    self.current_session = session
-                    
-                    # تحديث تاريخ المحادثة
-                    self.conversation_history = session.get_api_messages()
-                    
-                    return session
-                except Exception as e:
-                    logger.error(f"خطأ في تحميل الجلسة: {str(e)}")
+                    with open(self._session_path(session_id, ".msgp"), 'rb') as f:
+                        return ChatSession.from_dict(msgpack.unpack(f, raw=False))
+                except FileNotFoundError:
+                    pass
+            
+            json_path = self._session_path(session_id, ".json")
+            with open(json_path, 'rb') as f:
+                session = ChatSession.from_dict(loads_json(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"خطأ في تحميل الجلسة: {str(e)}")
+            return None
         
-        return None
+        if HAS_MSGPACK:
+            # ترحيل ملف JSON القديم إلى MessagePack
+            try:
+                write_bytes_atomic(self._session_path(session_id, ".msgp"), self._encode_session(session))
+                os.remove(json_path)
+            except Exception as e:
+                logger.warning(f"تعذر ترحيل ملف الجلسة إلى MessagePack: {str(e)}")
+        
+        return session
+    
+    @staticmethod
+    def _encode_session(session: ChatSession) -> bytes:
+        """ترميز الجلسة بتنسيق ملف الجلسات الحالي"""
+        if HAS_MSGPACK:
+            return msgpack.packb(session.to_dict(), use_bin_type=True)
+        
+        # تُرمّز الرسائل الجديدة فقط
+        return session.to_json_bytes()
+    
+    def _get_session_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        الحصول على فهرس الجلسات (يقرأ من الملف عند أول استخدام)
+        """
+        if self._session_index is None:
+            self._session_index = {}
+            try:
+                with open(self._index_path, 'rb') as f:
+                    for entry in loads_json(f.read()):
+                        self._session_index[entry["id"]] = entry
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"خطأ في قراءة فهرس الجلسات: {str(e)}")
+        
+        return self._session_index
+    
+    def _write_session_index(self) -> bool:
+        """
+        كتابة فهرس الجلسات (الأحدث أولاً)
+        """
+        entries = sorted(self._get_session_index().values(), key=lambda entry: entry["created_at"], reverse=True)
+        return save_json(entries, self._index_path)
+    
+    def schedule_session_save(self):
+        """
+        جدولة حفظ الجلسة الحالية بعد مهلة قصيرة (تُجمع عمليات الحفظ المتتالية في عملية واحدة)
+        """
+        session = self.current_session
+        if not session or not self.project_dir:
+            return
+        
+        # حفظ الجلسة السابقة فوراً إذا تغيرت الجلسة الحالية قبل انتهاء المهلة
+        if self._pending_save_session is not None and self._pending_save_session is not session:
+            self.flush_session_save()
+        
+        self._pending_save_session = session
+        self._save_timer.start(_SESSION_SAVE_DELAY_MS)
+    
+    def flush_session_save(self) -> bool:
+        """
+        تنفيذ الحفظ المجدول فوراً إن وجد
+        """
+        self._save_timer.stop()
+        session, self._pending_save_session = self._pending_save_session, None
+        if session is None:
+            return True
+        return self._save_session(session)
     
     def save_current_session(self) -> bool:
         """
@@ -541,14 +877,27 @@ class ChatComponent(QWidget):
         if not self.current_session or not self.project_dir:
             return False
         
+        # الحفظ الفوري يغني عن الحفظ المجدول للجلسة نفسها
+        if self._pending_save_session is self.current_session:
+            self._save_timer.stop()
+            self._pending_save_session = None
+        
+        return self._save_session(self.current_session)
+    
+    def _save_session(self, session: ChatSession) -> bool:
+        """
+        كتابة الجلسة إلى ملفها
+        """
         try:
             # التأكد من وجود المجلد
             os.makedirs(self.sessions_dir, exist_ok=True)
             
             # حفظ الجلسة في ملف
-            session_path = os.path.join(self.sessions_dir, f"{self.current_session.id}.json")
-            with open(session_path, 'w', encoding='utf-8') as f:
-                json.dump(self.current_session.to_dict(), f, ensure_ascii=False, indent=2)
+            write_bytes_atomic(self._session_path(session.id), self._encode_session(session))
+            
+            # تحديث مدخل الجلسة في الفهرس
+            self._get_session_index()[session.id] = session.index_entry()
+            self._write_session_index()
             
             return True
         except Exception as e:
@@ -559,26 +908,34 @@ class ChatComponent(QWidget):
         """
         حذف جلسة محادثة
         """
-        # البحث عن الجلسة في القائمة
-        for i, session in enumerate(self.sessions):
-            if session.id == session_id:
-                # حذف الجلسة من القائمة
-                del self.sessions[i]
-                
-                # إذا كانت الجلسة الحالية، قم بإعادة تعيينها
-                if self.current_session and self.current_session.id == session_id:
-                    self.current_session = None
-                    self.conversation_history = []
-                
-                # حذف ملف الجلسة
-                if self.project_dir:
-                    session_path = os.path.join(self.sessions_dir, f"{session_id}.json")
-                    if os.path.exists(session_path):
-                        os.remove(session_path)
-                
-                return True
+        # البحث عن الجلسة في فهرس الجلسات
+        session = self._sessions_by_id.get(session_id)
+        if session is None:
+            return False
+        
+        # حذف الجلسة من القائمة
+        self._remove_session(session)
+        
+        # إلغاء الحفظ المجدول حتى لا يعاد إنشاء ملف الجلسة بعد حذفه
+        if self._pending_save_session is session:
+            self._save_timer.stop()
+            self._pending_save_session = None
         
-        return False
+        # إذا كانت الجلسة الحالية، قم بإعادة تعيينها
+        if self.current_session and self.current_session.id == session_id:
+            self.current_session = None
+            self.conversation_history = []
+        
+        # حذف ملف الجلسة ومدخلها في الفهرس
+        if self.project_dir:
+            for ext in _SESSION_FILE_EXTS:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._session_path(session_id, ext))
+            
+            if self._get_session_index().pop(session_id, None) is not None:
+                self._write_session_index()
+        
+        return True
     
     def get_all_sessions(self) -> List[Dict[str, Any]]:
         """
@@ -589,7 +946,7 @@ class ChatComponent(QWidget):
                 "id": session.id,
                 "title": session.title,
                 "created_at": session.created_at,
-                "message_count": len(session.messages)
+                "message_count": session.message_count
             }
             for session in self.sessions
         ]
@@ -602,26 +959,44 @@ class ChatComponent(QWidget):
             return
         
         self.sessions = []
+        self._session_keys = []
+        self._sessions_by_id = {}
         
         try:
             # التأكد من وجود المجلد
             os.makedirs(self.sessions_dir, exist_ok=True)
             
-            # قراءة جميع ملفات الجلسات
-            for filename in os.listdir(self.sessions_dir):
-                if filename.endswith(".json"):
-                    session_path = os.path.join(self.sessions_dir, filename)
-                    try:
-                        with open(session_path, 'r', encoding='utf-8') as f:
-                            session_data = json.load(f)
-                        
-                        session = ChatSession.from_dict(session_data)
-                        self.sessions.append(session)
-                    except Exception as e:
-                        logger.error(f"خطأ في تحميل الجلسة {filename}: {str(e)}")
+            # الجلسات الموجودة على القرص (أسماء الملفات فقط، دون قراءتها)
+            with os.scandir(self.sessions_dir) as entries:
+                session_ids = {
+                    os.path.splitext(entry.name)[0] for entry in entries
+                    if entry.name.endswith(_SESSION_FILE_EXTS) and entry.name != _SESSION_INDEX_FILE and entry.is_file()
+                }
+            
+            index = self._get_session_index()
+            index_changed = False
             
-            # ترتيب الجلسات حسب تاريخ الإنشاء (الأحدث أولاً)
-            self.sessions.sort(key=lambda s: s.created_at, reverse=True)
+            # إزالة مدخلات الجلسات المحذوفة من خارج البرنامج
+            for session_id in [session_id for session_id in index if session_id not in session_ids]:
+                del index[session_id]
+                index_changed = True
+            
+            for session_id in session_ids:
+                entry = index.get(session_id)
+                if entry is not None:
+                    # جلسة مفهرسة: تحميل بياناتها الوصفية فقط
+                    self._insert_session(ChatSession.from_index_entry(entry))
+                else:
+                    # جلسة غير مفهرسة (مثل ملفات الإصدارات السابقة): قراءتها مرة واحدة وإضافتها للفهرس
+                    session = self._read_session_file(session_id)
+                    if session is None:
+                        continue
+                    index[session_id] = session.index_entry()
+                    index_changed = True
+                    self._insert_session(session)
+            
+            if index_changed:
+                self._write_session_index()
         
         except Exception as e:
             logger.error(f"خطأ في تحميل جلسات المحادثة: {str(e)}")
@@ -662,22 +1037,12 @@ class ChatComponent(QWidget):
     def _extract_code(self, text: str, language: str) -> str:
         """استخراج الشيفرة البرمجية من النص"""
         # البحث عن الشيفرة المحاطة بعلامات ```
-        
-        # أنماط مختلفة لعلامات الشيفرة
-        patterns = [
-            # نمط لغة محددة: ```python
-            rf"```{language}(.*?)```",
-            # نمط عام: ```
-            r"```(.*?)```",
-            # نمط بديل: `
-            r"`(.*?)`"
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
-            if matches:
-                # استخدام أول مطابقة
-                return matches[0].strip()
+        # (نمط لغة محددة: ```python، ثم نمط عام: ```، ثم نمط بديل: `)
+        for pattern in _code_patterns(language):
+            # أول مطابقة فقط تكفي، فلا حاجة لبناء قائمة بكل المطابقات
+            match = pattern.search(text)
+            if match:
+                return match.group(1).strip()
         
         # إذا لم يتم العثور على علامات، أعد النص كما هو
         return text
\ No newline at end of file
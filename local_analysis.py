@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+محللات الشيفرة المحلية (بالقواعد فقط، دون API)
+
+لا تستورد هذه الوحدة Qt ولا عملاء API، لأن كل عملية من عمليات التحليل المتوازي
+تستوردها عند بدئها.
+"""
+import os
+import re
+import json
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple, Optional
+
+from utils import read_file
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+def _compile(pattern: str):
+    """
+    ترجمة نمط قاعدة تحليل
+    
+    تستخدم re دائماً ولا تستخدم محركات بديلة مثل RE2/PCRE2: دلالات \\s و\\w و\\b فيها
+    تختلف (ASCII فقط في RE2)، ولا تدعم RE2 النظر للأمام/للخلف والإحالات الخلفية،
+    فتصبح نتائج التحليل متوقفة على الحزم المثبتة.
+    """
+    return re.compile(pattern)
+
+
+# لغات البرمجة حسب امتداد الملف
+_EXT_TO_LANG = {
+    '.py': "python",
+    '.php': "php",
+    '.js': "javascript",
+    '.jsx': "javascript",
+    '.ts': "javascript",
+    '.tsx': "javascript",
+    '.dart': "dart",
+    '.css': "css",
+    '.scss': "css",
+    '.sass': "css",
+    '.html': "html",
+    '.htm': "html"
+}
+
+# اللغات التي يدعمها تحليل الأمان
+_SECURITY_LANGUAGES = frozenset(("python", "php", "javascript", "html"))
+
+
+@lru_cache(maxsize=None)
+def _language_for_extension(ext: str) -> Optional[str]:
+    """تحديد لغة البرمجة من امتداد الملف (مع تخزين النتيجة لكل امتداد)"""
+    return _EXT_TO_LANG.get(ext.lower())
+
+
+def _detect_language(file_path: str) -> Optional[str]:
+    """تحديد لغة البرمجة من امتداد الملف"""
+    return _language_for_extension(os.path.splitext(file_path)[1])
+
+
+# بداية فئة محارف منفية غير مسبوقة بشرطة مائلة، مثل [^>]
+_NEGATED_CLASS_RE = re.compile(r"(?<!\\)\[\^")
+
+
+def _rules_digest(rules: Dict[str, List[Dict[str, Any]]]) -> str:
+    """حساب بصمة لقواعد التحليل"""
+    data = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def _line_bounded(pattern: str) -> str:
+    """استثناء \n من الفئات المنفية في النمط حتى لا يمتد التطابق عبر الأسطر"""
+    return _NEGATED_CLASS_RE.sub(r"[^\\n", pattern)
+
+
+def _sequence_literals(items) -> Optional[Tuple[str, ...]]:
+    """أفضل مجموعة نصوص ثابتة يجب ظهور أحدها في أي تطابق لتسلسل من عناصر النمط"""
+    candidates = []
+    current = ""
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            current += chr(av)
+            continue
+        
+        if current:
+            candidates.append((current,))
+            current = ""
+        
+        if op == sre_parse.BRANCH:
+            alternatives = [_sequence_literals(branch) for branch in av[1]]
+            if all(alternatives):
+                candidates.append(tuple(literal for alternative in alternatives for literal in alternative))
+        elif op == sre_parse.SUBPATTERN and not av[1] & re.IGNORECASE:
+            group_literals = _sequence_literals(av[-1])
+            if group_literals:
+                candidates.append(group_literals)
+    
+    if current:
+        candidates.append((current,))
+    if not candidates:
+        return None
+    
+    # المجموعة الأفضل هي التي يكون أقصر نص فيها أطول ما يمكن
+    return max(candidates, key=lambda literals: min(len(literal) for literal in literals))
+
+
+def _required_literals(pattern: str) -> Optional[Tuple[str, ...]]:
+    """
+    استخراج نصوص ثابتة يجب أن يحتوي المحتوى على أحدها حتى يطابق النمط، أو None إذا تعذر ذلك
+    
+    تعتمد على بنية شجرة التحليل في وحدة re الداخلية، لذا يعطل أي خطأ فيها (مثل تغير
+    البنية في إصدار لاحق من Python) الفلترة المسبقة لهذا النمط فقط بدلاً من إفشال المحلل.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+        if parsed.state.flags & re.IGNORECASE:
+            return None
+        return _sequence_literals(parsed)
+    except Exception:
+        return None
+
+
+def _language_literals(rules: List[Dict[str, Any]]) -> Optional[frozenset]:
+    """النصوص الثابتة لقواعد لغة واحدة، أو None إذا كانت إحدى القواعد بلا نص ثابت"""
+    literals = set()
+    for rule in rules:
+        rule_literals = _required_literals(rule["pattern"])
+        if rule_literals is None:
+            return None
+        literals.update(rule_literals)
+    return frozenset(literals)
+
+
+def _compile_combined_rules(rules: List[Dict[str, Any]]):
+    """دمج أنماط قواعد لغة واحدة في نمط واحد بمجموعات مسماة (r0, r1, ...)"""
+    # النمط المدمج يُطبق على المحتوى كاملاً، لذا (?m) ليطابق ^ بداية كل سطر
+    return _compile("(?m)" + "|".join(
+        f"(?P<r{i}>{_line_bounded(rule['pattern'])})" for i, rule in enumerate(rules)
+    ))
+
+
+def _scan_rules(file_path: str, content: str, combined, rules: List[Dict[str, Any]],
+                issue_type: str, literals: Optional[frozenset] = None) -> List[Dict[str, Any]]:
+    """
+    فحص المحتوى بقواعد لغة واحدة
+    
+    يبحث النمط المدمج في المحتوى كاملاً دون تقسيمه إلى أسطر، ولا تُختبر القواعد
+    منفردة إلا على السطر الذي بدأ فيه التطابق، مع الإبقاء على مشكلة واحدة لكل
+    قاعدة في كل سطر. يُستأنف البحث من بداية السطر التالي.
+    
+    إذا توفرت النصوص الثابتة للقواعد ولم يحتو المحتوى على أي منها، يُتخطى الفحص.
+    """
+    if literals is not None and not any(literal in content for literal in literals):
+        return []
+    
+    issues = []
+    length = len(content)
+    pos = 0  # بداية السطر الحالي
+    line_no = 1  # رقم السطر الذي يبدأ عند pos
+    
+    while pos <= length:
+        match = combined.search(content, pos)
+        if not match:
+            break
+        
+        # تحديد حدود السطر الذي بدأ فيه التطابق
+        start = match.start()
+        line_start = content.rfind('\n', pos, start) + 1
+        if line_start == 0:
+            line_start = pos
+        line_no += content.count('\n', pos, line_start)
+        line_end = content.find('\n', start)
+        if line_end < 0:
+            line_end = length
+        
+        line = content[line_start:line_end]
+        code = line.strip()
+        issues.extend(
+            {
+                "file": file_path,
+                "line": line_no,
+                "severity": rule["severity"],
+                "message": rule["message"],
+                "code": code,
+                "type": issue_type
+            }
+            for rule in rules if rule["_re"].search(line)
+        )
+        
+        pos = line_end + 1
+        line_no += 1
+    
+    return issues
+
+
+class LocalAnalyzer:
+    """محلل الشيفرة البرمجية محلي بدون API"""
+    
+    def __init__(self):
+        # القواعد البسيطة للتحليل المحلي
+        self.rules = {
+            "python": [
+                {
+                    "pattern": r"print\(",
+                    "message": "استخدام print في كود الإنتاج",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"except\s*:",
+                    "message": "استخدام except العام بدون تحديد نوع الاستثناء",
+                    "severity": "متوسطة"
+                },
+                {
+                    "pattern": r"import\s+\*",
+                    "message": "استيراد كل الوحدات من حزمة (يفضل تحديد الوحدات المطلوبة)",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"^\s*#\s*TODO",
+                    "message": "تعليق TODO موجود",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"exec\(",
+                    "message": "استخدام exec لتنفيذ كود ديناميكي (خطر أمني محتمل)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"os\.system\(",
+                    "message": "استخدام os.system لتنفيذ أوامر النظام (خطر أمني محتمل)",
+                    "severity": "عالية"
+                }
+            ],
+            "php": [
+                {
+                    "pattern": r"mysql_",
+                    "message": "استخدام دوال mysql_ المهملة",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"echo\s+\$_",
+                    "message": "عرض متغيرات $_GET أو $_POST أو $_REQUEST مباشرة (خطر XSS)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"eval\(\$",
+                    "message": "استخدام eval على متغير (خطر أمني)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"SELECT.+FROM.+WHERE.+\$_",
+                    "message": "استخدام متغيرات $_GET أو $_POST في استعلام SQL (خطر SQL Injection)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"\bdie\(",
+                    "message": "استخدام die() في كود الإنتاج",
+                    "severity": "متوسطة"
+                }
+            ],
+            "javascript": [
+                {
+                    "pattern": r"console\.log\(",
+                    "message": "استخدام console.log في كود الإنتاج",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"localStorage\.",
+                    "message": "استخدام localStorage بدون تحقق من توفره",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"document\.write\(",
+                    "message": "استخدام document.write (ممارسة سيئة)",
+                    "severity": "متوسطة"
+                },
+                {
+                    "pattern": r"eval\(",
+                    "message": "استخدام eval (خطر أمني)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"new\s+Function\(",
+                    "message": "استخدام Function constructor (مماثل لـ eval)",
+                    "severity": "عالية"
+                }
+            ],
+            "dart": [
+                {
+                    "pattern": r"print\(",
+                    "message": "استخدام print في كود الإنتاج",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"TODO",
+                    "message": "تعليق TODO موجود",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"setState\(\(\)\s*=>",
+                    "message": "استخدام setState قد يكون غير ضروري، فكر في استخدام StatefulBuilder",
+                    "severity": "منخفضة"
+                }
+            ],
+            "flutter": [
+                {
+                    "pattern": r"debugPrint\(",
+                    "message": "استخدام debugPrint في كود الإنتاج",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"TODO",
+                    "message": "تعليق TODO موجود",
+                    "severity": "منخفضة"
+                }
+            ],
+            "laravel_php": [
+                {
+                    "pattern": r"Route::.*",
+                    "message": "تحقق من أمان نقاط النهاية في Laravel",
+                    "severity": "متوسطة"
+                }
+            ],
+            "css": [
+                {
+                    "pattern": r"!important",
+                    "message": "استخدام !important (تجنب استخدامها إلا عند الضرورة)",
+                    "severity": "منخفضة"
+                }
+            ],
+            "html": [
+                {
+                    "pattern": r"<img[^>]+>",
+                    "message": "تحقق من وجود بديل نصي alt للصورة",
+                    "severity": "منخفضة"
+                },
+                {
+                    "pattern": r"<a[^>]*>",
+                    "message": "تحقق من وجود عنوان مناسب لرابط التنقل",
+                    "severity": "منخفضة"
+                }
+            ]
+        }
+        
+        # بصمة القواعد لإبطال النتائج المخزنة مؤقتاً عند تغييرها
+        self.rules_digest = _rules_digest(self.rules)
+        
+        # ترجمة الأنماط مرة واحدة بدلاً من كل سطر
+        self._combined = {}
+        self._literals = {}
+        for language, rules in self.rules.items():
+            for rule in rules:
+                rule["_re"] = _compile(rule["pattern"])
+            self._combined[language] = _compile_combined_rules(rules)
+            self._literals[language] = _language_literals(rules)
+    
+    def analyze_file(self, file_path: str, content: str) -> List[Dict[str, Any]]:
+        """تحليل ملف وإرجاع قائمة بالمشاكل"""
+        language = self._detect_language(file_path)
+        if not language or language not in self.rules:
+            return []
+        
+        return _scan_rules(file_path, content, self._combined[language],
+                           self.rules[language], "quality", self._literals[language])
+    
+    def _detect_language(self, file_path: str) -> Optional[str]:
+        """تحديد لغة البرمجة من امتداد الملف"""
+        return _detect_language(file_path)
+
+
+class LocalSecurityAnalyzer:
+    """محلل الثغرات الأمنية المحلي (بالقواعد فقط، دون API)"""
+    
+    def __init__(self):
+        self.local_rules = {
+            "php": [
+                {
+                    "pattern": r"\$_(?:GET|POST|REQUEST|COOKIE)\[['\"][^'\"]+['\"]\]",
+                    "message": "استخدام متغيرات $_GET/$_POST/$_REQUEST دون تنظيف (خطر XSS)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"echo\s+\$_",
+                    "message": "عرض متغيرات HTTP دون تنظيف (خطر XSS)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"mysqli_query\s*\(\s*\$[^,]+,\s*[\"']SELECT.+\$_",
+                    "message": "استخدام استعلام SQL مع متغيرات HTTP (SQL Injection)",
+                    "severity": "عالية"
+                }
+            ],
+            "python": [
+                {
+                    "pattern": r"os\.system\s*\(|subprocess\.call\s*\(|subprocess\.Popen\s*\(",
+                    "message": "استخدام أوامر النظام مع مدخلات المستخدم (خطر Remote Code Execution)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"eval\s*\(|exec\s*\(",
+                    "message": "استخدام eval/exec مع مدخلات المستخدم (خطر Code Injection)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"open\s*\([^,]+,\s*['\"]w['\"]",
+                    "message": "فتح ملف للكتابة مع مدخلات المستخدم (خطر Path Traversal)",
+                    "severity": "متوسطة"
+                },
+                {
+                    "pattern": r"flask.*send_file\(",
+                    "message": "تحقق من مسار الملف في send_file لتجنب Path Traversal",
+                    "severity": "متوسطة"
+                },
+                {
+                    "pattern": r"flask.*render_template\([^,]+\+",
+                    "message": "استخدام مدخلات المستخدم في مسار القالب (خطر Template Injection)",
+                    "severity": "عالية"
+                }
+            ],
+            "javascript": [
+                {
+                    "pattern": r"eval\s*\(|new\s+Function\s*\(",
+                    "message": "استخدام eval أو Function constructor (خطر XSS)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"innerHTML\s*=|document\.write\s*\(",
+                    "message": "استخدام innerHTML أو document.write مع مدخلات المستخدم (خطر XSS)",
+                    "severity": "عالية"
+                },
+                {
+                    "pattern": r"localStorage\.|sessionStorage\.",
+                    "message": "تخزين بيانات حساسة في localStorage/sessionStorage",
+                    "severity": "متوسطة"
+                },
+                {
+                    "pattern": r"location\.(href|replace|assign)\s*=",
+                    "message": "توجيه URL غير آمن (خطر Open Redirect)",
+                    "severity": "متوسطة"
+                }
+            ],
+            "html": [
+                {
+                    "pattern": r"<form[^>]*method=['\"]get['\"]",
+                    "message": "استخدام GET في النماذج للبيانات الحساسة (غير آمن)",
+                    "severity": "متوسطة"
+                },
+                {
+                    "pattern": r"<input[^>]*type=['\"]password['\"][^>]*autocomplete=['\"]off['\"]",
+                    "message": "منع الملء التلقائي للكلمات السرية قد لا يعمل في كل المتصفحات",
+                    "severity": "منخفضة"
+                }
+            ]
+        }
+        
+        # بصمة القواعد لإبطال النتائج المخزنة مؤقتاً عند تغييرها
+        self.rules_digest = _rules_digest(self.local_rules)
+        
+        # ترجمة الأنماط مرة واحدة بدلاً من كل سطر
+        self._combined = {}
+        self._literals = {}
+        for language, rules in self.local_rules.items():
+            for rule in rules:
+                rule["_re"] = _compile(rule["pattern"])
+            self._combined[language] = _compile_combined_rules(rules)
+            self._literals[language] = _language_literals(rules)
+    
+    def analyze_file(self, file_path: str, content: str) -> List[Dict[str, Any]]:
+        """تحليل ملف للثغرات الأمنية محلياً"""
+        language = self._detect_language(file_path)
+        if not language or language not in self.local_rules:
+            return []
+        
+        return _scan_rules(file_path, content, self._combined[language],
+                           self.local_rules[language], "security", self._literals[language])
+    
+    def _detect_language(self, file_path: str) -> Optional[str]:
+        """تحديد لغة البرمجة من امتداد الملف"""
+        language = _detect_language(file_path)
+        return language if language in _SECURITY_LANGUAGES else None
+
+
+# المحللات التي لا تعتمد على API ويمكن تشغيلها في عمليات منفصلة
+_LOCAL_ANALYZERS = (LocalAnalyzer, LocalSecurityAnalyzer)
+
+# المحللات المستخدمة داخل عملية العامل حسب اسم الفئة (يتم تعيينها عند تهيئة العملية)
+_worker_analyzers = None
+
+
+def _local_analyzer_name(analyzer) -> str:
+    """اسم فئة المحلل المحلي التي يعاد بناء المحلل منها في عملية العامل"""
+    for cls in _LOCAL_ANALYZERS:
+        if isinstance(analyzer, cls):
+            return cls.__name__
+    raise TypeError(f"{type(analyzer).__name__} ليس محللاً محلياً")
+
+
+def _init_analysis_worker():
+    """
+    تهيئة عملية عامل التحليل ببناء المحللات المحلية
+    
+    لا تُمرر كائنات المحللات نفسها إلى العامل لأنها قد تحمل إعدادات API (ومفاتيحها)،
+    فلا تُنسخ إلى العمليات الأخرى.
+    """
+    global _worker_analyzers
+    _worker_analyzers = {cls.__name__: cls() for cls in _LOCAL_ANALYZERS}
+
+
+def _analyze_one(file_info: Dict[str, Any], analyzers) -> Optional[List[Dict[str, Any]]]:
+    """تحليل ملف واحد بكل المحللات، وإرجاع None إذا تعذرت قراءته"""
+    file_path = file_info["path"]
+    content = file_info.get("content")
+    
+    # قراءة محتوى الملف إذا لم يتم توفيره
+    if content is None:
+        content = read_file(file_path)
+        if content is None:
+            return None
+    
+    # تحليل الملف باستخدام كل محلل
+    file_issues = []
+    for analyzer in analyzers:
+        file_issues.extend(analyzer.analyze_file(file_path, content))
+    
+    return file_issues
+
+
+def _analyze_in_worker(analyzer_names: Tuple[str, ...], file_info: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """تحليل ملف واحد في عملية العامل بالمحللات المحلية المحددة بأسمائها"""
+    return _analyze_one(file_info, [_worker_analyzers[name] for name in analyzer_names])
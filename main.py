@@ -7,21 +7,18 @@ Code Analyzer - Application Entry Point
 import os
 import sys
 import logging
-import argparse
+import logging.handlers
+import queue
 import subprocess
 from pathlib import Path
 import time
 import platform
 import traceback
 import atexit
+import functools
 
-from PySide6.QtCore import QTranslator, QLocale, QLibraryInfo, QDir, Qt, QCoreApplication, QEvent
-from PySide6.QtGui import QFont, QIcon, QPixmap, QSplashScreen
-from PySide6.QtWidgets import QApplication, QMessageBox
-
-from ui_main import MainWindow
-from api_clients import APIConfig, get_api_client
-from analyzer import APIThreadManager
+# ملاحظة: تستورد PySide6 ووحدات التطبيق داخل الدوال التي تحتاجها،
+# حتى لا يدفع --version و--help كلفة تحميل Qt عند بدء التشغيل
 
 # معلومات التطبيق
 APP_NAME = "محلل الشيفرة البرمجية"
@@ -29,80 +26,143 @@ APP_VERSION = "1.0.0"
 APP_ORGANIZATION = "AIDev"
 APP_DOMAIN = "aidev.example.com"
 
+# نظام التشغيل (يحسب مرة واحدة عند تحميل الوحدة)
+_SYSTEM = platform.system()
+
+# الحد الأدنى للمدة بين محاولات تحديث مكتبة certifi (بالثواني)
+CERTIFI_CHECK_INTERVAL = 7 * 86400
+
+# إعدادات ملف السجل: عدد السجلات المجمعة قبل الكتابة، ومدة الكتابة الدورية (بالمللي ثانية)
+LOG_BUFFER_CAPACITY = 512
+LOG_FLUSH_INTERVAL_MS = 30000
+LOG_BACKUP_DAYS = 14
+
+# أقدم إصدار مقبول من مكتبة certifi (لا يُشغل pip إذا كان المثبت أحدث منه)
+CERTIFI_MIN_VERSION = (2024, 7, 4)
+
 # مسارات التطبيق
+def _ensure_dirs(paths):
+    """التأكد من وجود مجلدات بيانات التطبيق (ينشأ data_dir ضمنياً كأب للمجلدات الفرعية)"""
+    for key in ("logs_dir", "config_dir", "plugins_dir"):
+        Path(paths[key]).mkdir(parents=True, exist_ok=True)
+
+@functools.lru_cache(maxsize=None)
 def get_app_paths():
-    """الحصول على مسارات التطبيق الأساسية"""
+    """
+    الحصول على مسارات التطبيق الأساسية
+    
+    تحسب المسارات وتنشأ المجلدات مرة واحدة، ويعاد القاموس نفسه في الاستدعاءات التالية.
+    """
     # مسار التطبيق
     app_dir = os.path.dirname(os.path.abspath(__file__))
     
     # مسار البيانات
-    if platform.system() == "Windows":
+    if _SYSTEM == "Windows":
         data_dir = os.path.join(os.environ.get("APPDATA", ""), APP_ORGANIZATION, APP_NAME)
-    elif platform.system() == "Darwin":  # macOS
+    elif _SYSTEM == "Darwin":  # macOS
         data_dir = os.path.join(os.path.expanduser("~/Library/Application Support"), APP_ORGANIZATION, APP_NAME)
     else:  # Linux وأنظمة Unix الأخرى
         data_dir = os.path.join(os.path.expanduser("~/.local/share"), APP_NAME.lower().replace(" ", "_"))
     
-    # التأكد من وجود المجلدات
-    os.makedirs(data_dir, exist_ok=True)
-    
-    # مسار السجلات
-    logs_dir = os.path.join(data_dir, "logs")
-    os.makedirs(logs_dir, exist_ok=True)
-    
-    # مسار الإعدادات
-    config_dir = os.path.join(data_dir, "config")
-    os.makedirs(config_dir, exist_ok=True)
-    
-    # مسار المكونات الإضافية
-    plugins_dir = os.path.join(data_dir, "plugins")
-    os.makedirs(plugins_dir, exist_ok=True)
-    
-    # مسار الموارد
-    resources_dir = os.path.join(app_dir, "resources")
-    
-    return {
+    paths = {
         "app_dir": app_dir,
         "data_dir": data_dir,
-        "logs_dir": logs_dir,
-        "config_dir": config_dir,
-        "plugins_dir": plugins_dir,
-        "resources_dir": resources_dir
+        "logs_dir": os.path.join(data_dir, "logs"),  # مسار السجلات
+        "config_dir": os.path.join(data_dir, "config"),  # مسار الإعدادات
+        "plugins_dir": os.path.join(data_dir, "plugins"),  # مسار المكونات الإضافية
+        "resources_dir": os.path.join(app_dir, "resources")  # مسار الموارد
     }
+    
+    # التأكد من وجود المجلدات
+    _ensure_dirs(paths)
+    
+    return paths
+
+# أحداث بدء التشغيل (تسجل في سجل واحد عند اكتمال البدء بدلاً من سجل لكل حدث)
+_startup_events = {}
+
+def log_startup_summary():
+    """تسجيل أحداث بدء التشغيل المجمعة في سجل واحد"""
+    if _startup_events:
+        logger.info("اكتمل بدء التشغيل: " + "، ".join(f"{key}: {value}" for key, value in _startup_events.items()))
+        _startup_events.clear()
 
 # إعداد التسجيل (Setup logging)
+# مخزن سجلات الملف المؤقت (يُكتب دورياً من create_app)
+_log_buffer = None
+
 def setup_logging():
     """إعداد تسجيل الأحداث"""
+    global _log_buffer
     app_paths = get_app_paths()
-    log_file = os.path.join(app_paths["logs_dir"], f"code_analyzer_{time.strftime('%Y%m%d')}.log")
+    
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    
+    # ملف سجل يدور عند منتصف الليل (يحتفظ بسجلات LOG_BACKUP_DAYS يوماً)
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        os.path.join(app_paths["logs_dir"], "code_analyzer.log"),
+        when="midnight",
+        backupCount=LOG_BACKUP_DAYS,
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+    
+    # تجميع سجلات الملف وكتابتها دفعة واحدة (تُكتب فوراً عند الأخطاء)
+    _log_buffer = logging.handlers.MemoryHandler(
+        capacity=LOG_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=file_handler,
+        flushOnClose=True
+    )
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    
+    # الكتابة الفعلية في خيط مستقل، فيقتصر التسجيل في خيط الواجهة على إضافة السجل إلى طابور
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, _log_buffer, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    # عند الخروج: إيقاف المستمع بعد تفريغ الطابور، ثم كتابة السجلات المجمعة
+    atexit.register(_log_buffer.flush)
+    atexit.register(listener.stop)
+    
+    # يُنسق السجل بالكامل في معالجات المستمع، ويمرر الطابور نص الرسالة فقط
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
     
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            logging.StreamHandler()
-        ]
+        handlers=[queue_handler]
     )
     
     # إنشاء مساحة تسجيل عامة للتطبيق
     app_logger = logging.getLogger("CodeAnalyzer")
     
-    # تسجيل معلومات النظام
-    app_logger.info(f"نظام التشغيل: {platform.system()} {platform.version()}")
-    app_logger.info(f"إصدار Python: {platform.python_version()}")
-    app_logger.info(f"مسار التطبيق: {app_paths['app_dir']}")
-    app_logger.info(f"مسار البيانات: {app_paths['data_dir']}")
+    # معلومات النظام (تسجل مع ملخص بدء التشغيل)
+    _startup_events["نظام التشغيل"] = f"{_SYSTEM} {platform.version()}"
+    _startup_events["إصدار Python"] = platform.python_version()
+    _startup_events["مسار التطبيق"] = app_paths['app_dir']
+    _startup_events["مسار البيانات"] = app_paths['data_dir']
     
     return app_logger
 
-# إنشاء المسجل (Create logger)
-logger = setup_logging()
+def flush_logs():
+    """كتابة سجلات الملف المجمعة"""
+    if _log_buffer is not None:
+        _log_buffer.flush()
+
+# المسجل العام للتطبيق (يُهيأ بـ setup_logging عند التشغيل كبرنامج رئيسي فقط، حتى لا
+# تعيد عمليات العمال التي تستورد هذه الوحدة فتح ملف السجل وتشغيل مستمع جديد)
+logger = logging.getLogger("CodeAnalyzer")
 
 # تنفيذ دالة update_certifi محلياً في حالة عدم وجود الملف
 def update_certifi_local():
-    """تحديث شهادات SSL محلياً"""
+    """تعيين شهادات SSL محلياً من مكتبة certifi المثبتة"""
     try:
         # محاولة استيراد certifi
         import certifi
@@ -111,73 +171,116 @@ def update_certifi_local():
         os.environ['SSL_CERT_FILE'] = certifi.where()
         os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
         
-        logger.info(f"تم تعيين مسار شهادات SSL: {certifi.where()}")
-        
-        # محاولة تحديث certifi
-        subprocess.check_call([
-            sys.executable, "-m", "pip", "install", "--upgrade", "certifi"
-        ])
-        
-        logger.info("تم تحديث مكتبة certifi بنجاح")
+        _startup_events["شهادات SSL"] = certifi.where()
         return True
     
     except ImportError:
         logger.warning("مكتبة certifi غير مثبتة")
         return False
-    except subprocess.CalledProcessError as e:
-        logger.warning(f"فشل تحديث مكتبة certifi: {e}")
-        return False
     except Exception as e:
         logger.warning(f"خطأ أثناء معالجة الشهادات: {e}")
         return False
 
-# استيراد وتحديث شهادات SSL
-try:
-    from update_certifi import update_certifi, set_ssl_cert_env
-    # تحديث شهادات SSL
-    update_result = update_certifi()
-    # تعيين متغيرات البيئة للشهادات
-    set_ssl_result = set_ssl_cert_env()
+def setup_ssl_certs():
+    """تهيئة شهادات SSL من مكتبة certifi المثبتة (دون تحديثها)"""
+    try:
+        from update_certifi import set_ssl_cert_env
+        # تعيين متغيرات البيئة للشهادات
+        if set_ssl_cert_env():
+            _startup_events["شهادات SSL"] = os.environ.get('SSL_CERT_FILE', "")
+        else:
+            logger.warning("تم تنفيذ set_ssl_cert_env ولكن قد تكون هناك مشكلات")
+    except ImportError:
+        logger.warning("ملف update_certifi.py غير موجود، سيتم استخدام التنفيذ المحلي")
+        update_certifi_local()
+    except Exception as e:
+        logger.error(f"خطأ أثناء معالجة شهادات SSL: {e}")
+        # محاولة استخدام التنفيذ المحلي
+        update_certifi_local()
+
+def schedule_certifi_upgrade():
+    """
+    تحديث مكتبة certifi في عملية منفصلة دون انتظارها
+    (فقط إذا كان الإصدار المثبت أقدم من CERTIFI_MIN_VERSION،
+    ومرة واحدة على الأكثر كل CERTIFI_CHECK_INTERVAL ثانية)
+    """
+    from importlib.metadata import version, PackageNotFoundError
     
-    if update_result and set_ssl_result:
-        logger.info("تم تحديث وتهيئة شهادات SSL بنجاح")
-    else:
-        logger.warning("تم تنفيذ update_certifi ولكن قد تكون هناك مشكلات")
-except ImportError:
-    logger.warning("ملف update_certifi.py غير موجود، سيتم استخدام التنفيذ المحلي")
-    update_certifi_local()
-except Exception as e:
-    logger.error(f"خطأ أثناء معالجة شهادات SSL: {e}")
-    # محاولة استخدام التنفيذ المحلي
-    update_certifi_local()
+    # قراءة الإصدار المثبت من بيانات الحزمة دون تشغيل pip
+    try:
+        installed = tuple(int(part) for part in version("certifi").split(".")[:3])
+        if installed >= CERTIFI_MIN_VERSION:
+            return
+    except PackageNotFoundError:
+        pass
+    except ValueError:
+        # رقم إصدار غير متوقع: يترك قرار التحديث لـ pip
+        pass
+    
+    stamp_path = os.path.join(get_app_paths()["config_dir"], ".certifi_last_check")
+    
+    try:
+        if time.time() - os.path.getmtime(stamp_path) < CERTIFI_CHECK_INTERVAL:
+            return
+    except OSError:
+        pass
+    
+    try:
+        Path(stamp_path).touch()
+        subprocess.Popen(
+            [
+                sys.executable, "-m", "pip",
+                "--disable-pip-version-check", "--no-input",
+                "install", "--upgrade", "--quiet", "--no-warn-script-location", "certifi"
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        logger.info("تم بدء تحديث مكتبة certifi في الخلفية")
+    except Exception as e:
+        logger.warning(f"تعذر بدء تحديث مكتبة certifi: {e}")
 
 def setup_ui_language(app):
     """إعداد لغة واجهة المستخدم"""
-    # تحديد اللغة الافتراضية
-    locale = QLocale.system().name()
+    from PySide6.QtCore import QTranslator, QLocale, QLibraryInfo, Qt
+    
+    # تحديد اللغة الافتراضية (مرة واحدة)
+    is_arabic = QLocale.system().name().startswith('ar')
     
     # إذا كانت اللغة العربية متاحة، استخدمها
-    if locale.startswith('ar'):
-        # تحميل ملف الترجمة
+    if is_arabic:
+        # تحميل ملف الترجمة (يُبحث عن مسار الترجمات فقط عند الحاجة)
         translator = QTranslator(app)
         translations_path = QLibraryInfo.location(QLibraryInfo.TranslationsPath)
         
         if translator.load("qt_ar", translations_path):
             app.installTranslator(translator)
-            logger.info("تم تحميل ملف ترجمة اللغة العربية")
+            _startup_events["ترجمة Qt"] = "qt_ar"
         else:
             logger.warning("فشل تحميل ملف ترجمة اللغة العربية")
-    
-    # تعيين اتجاه التخطيط الافتراضي حسب اللغة
-    if locale.startswith('ar'):
+        
+        # تعيين اتجاه التخطيط الافتراضي حسب اللغة
         app.setLayoutDirection(Qt.RightToLeft)
-        logger.info("تم تعيين اتجاه التخطيط من اليمين إلى اليسار")
+        _startup_events["اتجاه التخطيط"] = "RTL"
     else:
         app.setLayoutDirection(Qt.LeftToRight)
-        logger.info("تم تعيين اتجاه التخطيط من اليسار إلى اليمين")
+        _startup_events["اتجاه التخطيط"] = "LTR"
+
+@functools.lru_cache(maxsize=None)
+def load_style_sheet():
+    """قراءة ورقة النمط من ملف الموارد style.qss (مرة واحدة لكل عملية)"""
+    style_path = os.path.join(get_app_paths()["resources_dir"], "style.qss")
+    try:
+        with open(style_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError as e:
+        logger.warning(f"تعذر قراءة ورقة النمط: {e}")
+        return ""
 
 def setup_ui_style(app):
     """إعداد نمط واجهة المستخدم"""
+    from PySide6.QtGui import QFont
+    
     # تعيين الخط الافتراضي
     font = QFont("Arial", 10)
     app.setFont(font)
@@ -185,132 +288,76 @@ def setup_ui_style(app):
     # تعيين نمط المواضيع الافتراضي
     app.setStyle("Fusion")
     
-    # تطبيق ورقة نمط خاصة (CSS)
-    style_sheet = """
-    QMainWindow {
-        background-color: #f8f8f8;
-    }
-    
-    QToolBar {
-        background-color: #ffffff;
-        border-bottom: 1px solid #e0e0e0;
-        spacing: 8px;
-    }
-    
-    QToolButton {
-        border: 1px solid transparent;
-        border-radius: 4px;
-        padding: 4px;
-    }
-    
-    QToolButton:hover {
-        background-color: #e0e0e0;
-    }
-    
-    QStatusBar {
-        background-color: #f0f0f0;
-        border-top: 1px solid #e0e0e0;
-    }
-    
-    QTabWidget::pane {
-        border: 1px solid #e0e0e0;
-        border-top: 0px;
-    }
-    
-    QTabBar::tab {
-        background-color: #f0f0f0;
-        border: 1px solid #e0e0e0;
-        border-bottom: 0px;
-        padding: 6px 12px;
-        margin-right: 2px;
-        border-top-left-radius: 4px;
-        border-top-right-radius: 4px;
-    }
-    
-    QTabBar::tab:selected {
-        background-color: #ffffff;
-    }
-    
-    QGroupBox {
-        border: 1px solid #e0e0e0;
-        border-radius: 4px;
-        margin-top: 16px;
-        padding-top: 16px;
-    }
-    
-    QGroupBox::title {
-        subcontrol-origin: margin;
-        left: 8px;
-        padding: 0 5px;
-    }
-    
-    QLineEdit, QTextEdit, QPlainTextEdit {
-        border: 1px solid #e0e0e0;
-        border-radius: 4px;
-        padding: 4px;
-        background-color: white;
-    }
-    
-    QPushButton {
-        background-color: #f0f0f0;
-        border: 1px solid #d0d0d0;
-        border-radius: 4px;
-        padding: 6px 12px;
-    }
-    
-    QPushButton:hover {
-        background-color: #e0e0e0;
-    }
-    
-    QPushButton:pressed {
-        background-color: #d0d0d0;
-    }
-    
-    QComboBox {
-        border: 1px solid #e0e0e0;
-        border-radius: 4px;
-        padding: 4px;
-        background-color: white;
-    }
-    
-    QTreeView, QTableView, QListView {
-        border: 1px solid #e0e0e0;
-        background-color: white;
-    }
+    # تطبيق ورقة نمط خاصة (CSS)، تُحمل من ملف الموارد بدلاً من نص مضمن في الشيفرة
+    style_sheet = load_style_sheet()
+    if style_sheet:
+        app.setStyleSheet(style_sheet)
+    _startup_events["نمط الواجهة"] = "Fusion"
+
+# رسائل الأخطاء المنتظرة للعرض، ومستقبل أحداثها في خيط الواجهة (يُنشأ بعد QApplication)
+_pending_errors = queue.Queue()
+_error_dialogs = None
+
+def install_error_dialogs(app):
+    """
+    إنشاء مستقبل أحداث الأخطاء في خيط الواجهة
     
-    QTreeView::item:selected, QTableView::item:selected, QListView::item:selected {
-        background-color: #0078d7;
-        color: white;
-    }
+    تعرض رسائل الأخطاء من حلقة الأحداث عند معالجة الحدث المرسل، بدلاً من فتح
+    QMessageBox مباشرة من sys.excepthook (حلقة أحداث متداخلة أثناء التهيئة).
     """
+    global _error_dialogs
+    from PySide6.QtCore import QObject, QEvent
+    from PySide6.QtWidgets import QApplication, QMessageBox
     
-    app.setStyleSheet(style_sheet)
-    logger.info("تم تطبيق نمط واجهة المستخدم")
+    class ErrorDialogs(QObject):
+        event_type = QEvent.Type(QEvent.registerEventType())
+        
+        def event(self, event):
+            if event.type() != self.event_type:
+                return super().event(event)
+            
+            while True:
+                try:
+                    error_msg = _pending_errors.get_nowait()
+                except queue.Empty:
+                    return True
+                QMessageBox.critical(QApplication.activeWindow(), "خطأ", error_msg)
+    
+    _error_dialogs = ErrorDialogs(app)
 
 def setup_exception_handler():
     """إعداد معالج الاستثناءات غير المتوقعة"""
     def exception_hook(exctype, value, tb):
         """معالج الاستثناءات العام"""
         # تسجيل الاستثناء
-        logger.critical(f"استثناء غير متوقع: {value}", exc_info=True)
+        logger.critical(f"استثناء غير متوقع: {value}", exc_info=(exctype, value, tb))
         
         # رسالة خطأ للمستخدم
         error_msg = f"حدث خطأ غير متوقع في البرنامج:\n\n{exctype.__name__}: {value}\n\n"
         error_msg += "تم تسجيل تفاصيل الخطأ في ملف السجل."
         
-        # عرض الرسالة فقط إذا كان التطبيق لا يزال قيد التشغيل
-        if QApplication.instance():
-            QMessageBox.critical(None, "خطأ", error_msg)
+        # تأجيل عرض الرسالة إلى حلقة الأحداث (إذا كان التطبيق لا يزال قيد التشغيل)
+        # (وإلا تكفي طباعة الاستثناء في stderr أدناه)
+        if _error_dialogs is not None:
+            from PySide6.QtCore import QCoreApplication, QEvent
+            try:
+                _pending_errors.put(error_msg)
+                QCoreApplication.postEvent(_error_dialogs, QEvent(_error_dialogs.event_type))
+            except RuntimeError:
+                # تم حذف التطبيق بالفعل
+                pass
         
         # استدعاء معالج الاستثناءات الافتراضي
         sys.__excepthook__(exctype, value, tb)
     
     # تعيين معالج الاستثناءات
     sys.excepthook = exception_hook
-    logger.info("تم تعيين معالج الاستثناءات")
+    _startup_events["معالج الاستثناءات"] = "مفعل"
 
 def parse_arguments():
     """تحليل وسيطات سطر الأوامر"""
+    import argparse
+    
     parser = argparse.ArgumentParser(description="محلل الشيفرة البرمجية بالذكاء الاصطناعي")
     
     parser.add_argument(
@@ -359,13 +406,15 @@ def show_version():
 
 def setup_api_config():
     """إعداد تكوين API للذكاء الاصطناعي"""
+    from api_clients import APIConfig
+    
     app_paths = get_app_paths()
     config_path = os.path.join(app_paths["config_dir"], "api_config.json")
     
     try:
         # تحميل أو إنشاء تكوين API
         api_config = APIConfig.from_config_file(config_path)
-        logger.info("تم تحميل تكوين API بنجاح")
+        _startup_events["تكوين API"] = config_path
         return api_config
     except Exception as e:
         logger.error(f"فشل تحميل تكوين API: {str(e)}")
@@ -373,52 +422,115 @@ def setup_api_config():
         api_config = APIConfig()
         # حفظ التكوين الافتراضي
         api_config.save_to_file(config_path)
-        logger.info("تم إنشاء تكوين API افتراضي")
+        _startup_events["تكوين API"] = f"{config_path} (افتراضي)"
         return api_config
 
 def cleanup_resources():
     """تنظيف الموارد عند إغلاق التطبيق"""
     logger.info("جارٍ تنظيف الموارد...")
     
-    # إغلاق جميع الخيوط المفتوحة
+    # إغلاق جميع الخيوط المفتوحة (مع مهلة، وتُسجل الخيوط التي لم تنته خلالها)
     try:
-        APIThreadManager.cleanup_all_threads()
-        logger.info("تم إغلاق جميع الخيوط بنجاح")
+        from analyzer import APIThreadManager
+        remaining = APIThreadManager.cleanup_all_threads(timeout_ms=2000)
+        if remaining:
+            logger.warning(f"لم تنته {len(remaining)} من الخيوط خلال المهلة")
+        else:
+            logger.info("تم إغلاق جميع الخيوط بنجاح")
     except Exception as e:
         logger.error(f"حدث خطأ أثناء إغلاق الخيوط: {str(e)}")
     
     logger.info("تم إغلاق التطبيق بنجاح")
 
-def check_api_connectivity(api_config):
-    """التحقق من الاتصال بخدمات API"""
-    # اختبار الاتصال بالمزود المفضل إذا كان هناك مفتاح API
-    provider = api_config.preferred_provider
-    api_key = api_config.get_api_key(provider)
-    
-    if api_key:
-        try:
-            client = get_api_client(api_config, provider)
-            test_message = [
-                {"role": "system", "content": "اختبار اتصال."},
-                {"role": "user", "content": "مرحباً، هذا اختبار."}
-            ]
+def check_api_connectivity(api_config, main_window=None):
+    """
+    التحقق من الاتصال بالمزود المفضل في الخلفية (دون حجب خيط الواجهة)
+    
+    تُعرض النتيجة في شريط الحالة للنافذة الرئيسية عند انتهاء الاختبار.
+    """
+    from api_clients import ConnectivityProbe
+    
+    probe = ConnectivityProbe(api_config, parent=main_window)
+    
+    if main_window is not None:
+        def show_result(provider, connected):
+            if connected:
+                main_window.statusBar().showMessage(f"تم الاتصال بنجاح بـ {provider}", 5000)
+            else:
+                main_window.statusBar().showMessage(f"تعذر الاتصال بـ {provider}", 5000)
+        
+        probe.finished.connect(show_result)
+    
+    probe.start()
+    return probe
+
+def load_splash_pixmap(app):
+    """
+    تحميل صورة شاشة البداية بحجم لا يتجاوز نصف الشاشة
+    
+    تُفك الصورة مصغرة مباشرة عبر QImageReader، وتُحفظ النسخة المصغرة في
+    data_dir/cache لتُقرأ في المرات التالية دون تصغير.
+    
+    Returns:
+        QPixmap أو None إذا لم يوجد ملف شاشة البداية
+    """
+    from PySide6.QtCore import QSize, Qt
+    from PySide6.QtGui import QImageReader, QPixmap
+    
+    app_paths = get_app_paths()
+    splash_path = os.path.join(app_paths["resources_dir"], "splash.png")
+    try:
+        source_mtime = os.path.getmtime(splash_path)
+    except OSError:
+        return None
+    
+    reader = QImageReader(splash_path)
+    reader.setAutoTransform(True)
+    
+    # تصغير الصورة عند فك ترميزها إذا كانت أكبر من نصف الشاشة
+    size = reader.size()
+    screen = app.primaryScreen()
+    if size.isValid() and screen is not None:
+        max_size = screen.availableGeometry().size() / 2
+        if size.width() > max_size.width() or size.height() > max_size.height():
+            size = size.scaled(max_size, Qt.KeepAspectRatio)
+            cache_path = os.path.join(
+                app_paths["data_dir"], "cache", f"splash_{size.width()}x{size.height()}.png"
+            )
             
-            # اختبار طلب خفيف
-            logger.info(f"جارٍ اختبار الاتصال بـ {provider}...")
-            _ = client.chat(test_message)
-            logger.info(f"تم الاتصال بنجاح بـ {provider}")
-            return True
-        except Exception as e:
-            logger.warning(f"فشل الاتصال بـ {provider}: {str(e)}")
-            return False
-    else:
-        logger.warning(f"لا يوجد مفتاح API لـ {provider}")
-        return False
+            # استخدام النسخة المصغرة المحفوظة إذا كانت أحدث من الصورة الأصلية
+            try:
+                if os.path.getmtime(cache_path) >= source_mtime:
+                    cached = QPixmap(cache_path)
+                    if not cached.isNull():
+                        return cached
+            except OSError:
+                pass
+            
+            reader.setScaledSize(QSize(size))
+            image = reader.read()
+            if not image.isNull():
+                Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+                image.save(cache_path)
+            return QPixmap.fromImage(image)
+    
+    return QPixmap.fromImage(reader.read())
 
-def create_app():
+def create_app(on_ready=None):
     """
     إنشاء وتهيئة تطبيق المحلل
+    
+    تُعرض شاشة البداية فوراً، ثم تُنفذ بقية التهيئة على مراحل من حلقة الأحداث
+    (تحميل الإعدادات، ثم إنشاء النافذة الرئيسية، ثم إظهارها) حتى يعاد رسم شاشة البداية بينها.
+    تستدعى on_ready(main_window, api_config) بعد إظهار النافذة الرئيسية.
+    
+    Returns:
+        (app, state): التطبيق وقاموس يحتوي "main_window" و"api_config" بعد اكتمال المراحل
     """
+    from PySide6.QtCore import QTimer, QEventLoop
+    from PySide6.QtWidgets import QApplication, QSplashScreen
+    from ui_main import MainWindow
+    
     # إعداد معالج الاستثناءات
     setup_exception_handler()
     
@@ -428,46 +540,87 @@ def create_app():
     app.setApplicationVersion(APP_VERSION)
     app.setOrganizationName(APP_ORGANIZATION)
     app.setOrganizationDomain(APP_DOMAIN)
+    install_error_dialogs(app)
     
     # إعداد مسارات التطبيق
     app_paths = get_app_paths()
     
     # إعداد شاشة البداية
-    splash_path = os.path.join(app_paths.get("resources_dir", ""), "splash.png")
-    if os.path.exists(splash_path):
-        splash_pixmap = QPixmap(splash_path)
+    splash_pixmap = load_splash_pixmap(app)
+    if splash_pixmap is not None:
         splash = QSplashScreen(splash_pixmap)
         splash.show()
-        app.processEvents()
     else:
         splash = None
         logger.warning("ملف شاشة البداية غير موجود")
     
-    # إعداد لغة واجهة المستخدم
-    setup_ui_language(app)
+    def pump_splash():
+        """إعادة رسم شاشة البداية قبل كل مرحلة تهيئة (دون معالجة مدخلات المستخدم)"""
+        if splash:
+            app.processEvents(QEventLoop.ExcludeUserInputEvents)
     
-    # إعداد نمط واجهة المستخدم
-    setup_ui_style(app)
+    pump_splash()
     
-    # تحميل تكوين API
-    api_config = setup_api_config()
+    # كتابة سجلات الملف المجمعة دورياً
+    log_flush_timer = QTimer(app)
+    log_flush_timer.timeout.connect(flush_logs)
+    log_flush_timer.start(LOG_FLUSH_INTERVAL_MS)
     
-    # إنشاء النافذة الرئيسية
-    main_window = MainWindow(api_config)
+    # إعداد شهادات SSL بعد إظهار شاشة البداية، وتأجيل تحديث certifi إلى ما بعد بدء حلقة الأحداث
+    setup_ssl_certs()
+    QTimer.singleShot(0, schedule_certifi_upgrade)
     
-    # تسجيل دالة التنظيف عند الخروج
-    atexit.register(cleanup_resources)
+    # يحتفظ بالنافذة الرئيسية طوال عمر التطبيق
+    state = {}
     
-    # إخفاء شاشة البداية وإظهار النافذة الرئيسية
-    if splash:
-        splash.finish(main_window)
+    def load_settings_phase():
+        pump_splash()
+        
+        # إعداد لغة ونمط واجهة المستخدم
+        setup_ui_language(app)
+        setup_ui_style(app)
+        
+        # تحميل تكوين API
+        state["api_config"] = setup_api_config()
+        
+        QTimer.singleShot(0, build_window_phase)
     
-    main_window.show()
+    def build_window_phase():
+        pump_splash()
+        
+        # إنشاء النافذة الرئيسية
+        state["main_window"] = MainWindow(state["api_config"])
+        
+        # التنظيف قبل انتهاء حلقة الأحداث (بينما لا تزال كائنات Qt صالحة)
+        app.aboutToQuit.connect(cleanup_resources)
+        
+        QTimer.singleShot(0, show_window_phase)
     
-    return app, main_window, api_config
+    def show_window_phase():
+        main_window = state["main_window"]
+        
+        # إخفاء شاشة البداية وإظهار النافذة الرئيسية
+        if splash:
+            splash.finish(main_window)
+        
+        main_window.show()
+        
+        if on_ready is not None:
+            on_ready(main_window, state["api_config"])
+        
+        log_startup_summary()
+    
+    QTimer.singleShot(0, load_settings_phase)
+    
+    return app, state
 
 def main():
     """الدالة الرئيسية للتطبيق"""
+    # مسار سريع لعرض الإصدار دون بناء محلل الوسيطات
+    argv = sys.argv[1:]
+    if argv and argv[0] in ("-v", "--version"):
+        show_version()
+    
     # تحليل وسيطات سطر الأوامر
     args = parse_arguments()
     
@@ -480,39 +633,47 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
         logger.debug("تم تفعيل وضع التصحيح")
     
-    # إنشاء تطبيق Qt
-    app, main_window, api_config = create_app()
-    
-    # تبديل اتجاه الواجهة إذا تم تحديده
-    if args.rtl:
-        app.setLayoutDirection(Qt.RightToLeft)
-        logger.info("تم تعيين اتجاه الواجهة من اليمين إلى اليسار (RTL)")
-    elif args.ltr:
-        app.setLayoutDirection(Qt.LeftToRight)
-        logger.info("تم تعيين اتجاه الواجهة من اليسار إلى اليمين (LTR)")
-    
-    # اختبار الاتصال بخدمات API
-    check_api_connectivity(api_config)
-    
-    # فتح المشروع تلقائيًا إذا تم تحديده
-    if args.project:
-        project_path = Path(args.project).resolve()
-        if project_path.exists() and project_path.is_dir():
-            logger.info(f"جاري فتح المشروع: {project_path}")
-            main_window.open_project(str(project_path))
-            
-            # بدء التحليل تلقائيًا إذا تم تحديده
-            if args.analyze:
-                logger.info("بدء التحليل التلقائي للمشروع")
-                main_window.start_analysis()
-        else:
-            logger.error(f"مجلد المشروع غير موجود: {args.project}")
+    def on_ready(main_window, api_config):
+        """إكمال بدء التشغيل بعد إظهار النافذة الرئيسية"""
+        # تبديل اتجاه الواجهة إذا تم تحديده
+        from PySide6.QtCore import Qt
+        if args.rtl:
+            app.setLayoutDirection(Qt.RightToLeft)
+            _startup_events["اتجاه التخطيط"] = "RTL (--rtl)"
+        elif args.ltr:
+            app.setLayoutDirection(Qt.LeftToRight)
+            _startup_events["اتجاه التخطيط"] = "LTR (--ltr)"
+        
+        # اختبار الاتصال بخدمات API في الخلفية
+        check_api_connectivity(api_config, main_window)
+        
+        # فتح المشروع تلقائيًا إذا تم تحديده
+        if args.project:
+            project_path = Path(args.project).resolve()
+            if project_path.exists() and project_path.is_dir():
+                logger.info(f"جاري فتح المشروع: {project_path}")
+                main_window.open_project(str(project_path))
+                
+                # بدء التحليل تلقائيًا إذا تم تحديده
+                if args.analyze:
+                    logger.info("بدء التحليل التلقائي للمشروع")
+                    main_window.start_analysis()
+            else:
+                logger.error(f"مجلد المشروع غير موجود: {args.project}")
+    
+    # إنشاء تطبيق Qt (تكتمل التهيئة بعد بدء حلقة الأحداث)
+    app, startup_state = create_app(on_ready)
     
     # تشغيل حلقة الأحداث
-    logger.info("بدء تشغيل التطبيق")
     return app.exec()
 
 if __name__ == "__main__":
+    # يجب أن يسبق أي شيء آخر: في النسخ المجمدة تعيد عمليات العمال تشغيل الملف التنفيذي نفسه
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
+    setup_logging()
+    
     try:
         sys.exit(main())
     except Exception as e:
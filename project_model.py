@@ -12,15 +12,200 @@ from typing import Dict, List, Set, Any, Tuple, Optional, Union
 import networkx as nx
 import time
 import hashlib
+import bisect
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 
 from utils import (
-    get_file_type, read_file, find_files, detect_project_type, calculate_file_hash,
-    write_file, SUPPORTED_EXTENSIONS, ensure_dir
+    get_file_type, read_file, read_file_bytes, decode_content, find_files, detect_project_type,
+    calculate_file_hash, calculate_content_hash, write_file, count_lines, SUPPORTED_EXTENSIONS, ensure_dir
 )
 
 logger = logging.getLogger("CodeAnalyzer.ProjectModel")
 
+# فواصل الأسطر التي يعتمدها str.splitlines (محتوى فئة محارف في التعابير النمطية)
+_LINE_BREAK_CHARS = r'\n\r\v\f\x1c-\x1e\x85\u2028\u2029'
+
+# فواصل الأسطر التي يعتمدها str.splitlines
+_LINE_BREAK_RE = re.compile(rf'\r\n|[{_LINE_BREAK_CHARS}]')
+
+# بداية سطر كما في splitlines (^ مع MULTILINE لا تعتبر إلا \n فاصلاً للأسطر)
+_PY_LINE_START = r'(?:\A|(?<=[\n\v\f\x1c-\x1e\x85\u2028\u2029])|(?<=\r)(?!\n))'
+
+# مسافة بيضاء داخل السطر (ليست فاصل سطر)
+_PY_SPACE = rf'[^\S{_LINE_BREAK_CHARS}]'
+
+# نمط مسح كيانات Python في مرور واحد على المحتوى (سطر واحد لكل تطابق، لذا _PY_SPACE بدلاً من \s)
+_PY_SCAN_RE = re.compile(
+    _PY_LINE_START + r'(?:'
+    rf'(?P<class>class{_PY_SPACE}+(?P<class_name>\w+)(?:\((?P<class_parents>[^){_LINE_BREAK_CHARS}]*)\))?:)'
+    rf'|(?P<function>def{_PY_SPACE}+(?P<function_name>\w+){_PY_SPACE}*\()'
+    rf'|(?P<method>(?P<method_indent>{_PY_SPACE}+)def{_PY_SPACE}+(?P<method_name>\w+){_PY_SPACE}*\()'
+    rf'|(?P<variable>(?P<variable_name>\w+){_PY_SPACE}*=)'
+    rf'|(?P<import>import{_PY_SPACE}+(?P<import_module>\w+(?:\.\w+)*)|from{_PY_SPACE}+(?P<from_module>[.\w]+){_PY_SPACE}+import)'
+    r')'
+)
+
+# أنماط JavaScript/TypeScript
+_JS_IMPORT_RES = [re.compile(pattern) for pattern in (
+    r'import\s+.*\s+from\s+[\'"]([^\'"]+)[\'"]',  # ES6 import
+    r'const\s+\w+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)',  # CommonJS require
+    r'import\([\'"]([^\'"]+)[\'"]\)',  # Dynamic import
+)]
+_JS_CLASS_RE = re.compile(r'class\s+(\w+)(?:\s+extends\s+(\w+))?')
+_JS_FN_RE = re.compile(r'function\s+(\w+)\s*\(')
+_JS_VAR_RE = re.compile(r'(const|let|var)\s+(\w+)\s*=')
+_JS_COMPONENT_RE = re.compile(r'const\s+(\w+)\s*=\s*(?:React\.)?(?:memo|forwardRef|createClass)?\(?(?:\(\)|function\s*\([^)]*\)|\([^)]*\)\s*=>\s*)')
+
+# أنماط Dart/Flutter
+_DART_IMPORT_RE = re.compile(r'import\s+[\'"]([^\'"]+)[\'"]')
+_DART_CLASS_RE = re.compile(r'class\s+(\w+)(?:\s+extends\s+(\w+))?(?:\s+implements\s+([^{]+))?')
+_DART_METHOD_RE = re.compile(r'(?:@\w+\s+)*(?:void|Future|Widget|[\w<>]+)\s+(\w+)\s*\(')
+_DART_VAR_RE = re.compile(r'(?:final|const|var|late)?\s+(?:[\w<>?]+)\s+(\w+)\s*=')
+_DART_WIDGET_RE = re.compile(r'class\s+(\w+)\s+extends\s+(?:StatelessWidget|StatefulWidget)')
+_DART_STATE_RE = re.compile(r'class\s+_(\w+)State\s+extends\s+State<(\w+)>')
+
+# أنماط PHP
+_PHP_NAMESPACE_RE = re.compile(r'namespace\s+([^;]+);')
+_PHP_USE_RE = re.compile(r'use\s+([^;]+);')
+_PHP_CLASS_RE = re.compile(r'class\s+(\w+)(?:\s+extends\s+(\w+))?(?:\s+implements\s+([^{]+))?')
+_PHP_FN_RE = re.compile(r'function\s+(\w+)\s*\(')
+_PHP_PROPERTY_RE = re.compile(r'(?:public|protected|private)(?:\s+static)?\s+\$(\w+)')
+_PHP_METHOD_RE = re.compile(r'(?:public|protected|private)(?:\s+static)?\s+function\s+(\w+)\s*\(')
+
+# أنماط HTML
+_HTML_TITLE_RE = re.compile(r'<title>(.*?)</title>')
+_HTML_SCRIPT_RE = re.compile(r'<script[^>]*src=["\']([^"\']+)["\']')
+_HTML_LINK_RE = re.compile(r'<link[^>]*href=["\']([^"\']+)["\']')
+_HTML_FORM_RE = re.compile(r'<form[^>]*(?:id=["\']([^"\']+)["\'])?')
+_HTML_DIV_ID_RE = re.compile(r'<div[^>]*id=["\']([^"\']+)["\']')
+
+# أنماط CSS
+_CSS_SELECTOR_RE = re.compile(r'([^{]+){[^}]*}')
+_CSS_PROPERTY_RE = re.compile(r'([a-zA-Z-]+)\s*:\s*([^;]+);')
+
+# تعقيد McCabe: كل شرط if, for, while, case يزيد التعقيد
+_CYCLOMATIC_RES = [re.compile(pattern) for pattern in (
+    r'\bif\b', r'\belse\s+if\b', r'\bfor\b', r'\bwhile\b',
+    r'\bcase\b', r'\bcatch\b', r'\?', r'\|\|', r'\&\&'
+)]
+
+# الأقواس { } ( ) والفواصل المنقوطة، مع النصوص والتعليقات التي يجب تخطيها في JavaScript/Dart
+_BLOCK_SCAN_RE = re.compile(
+    r'//[^\n]*'
+    r'|/\*.*?\*/'
+    r'|\'\'\'.*?\'\'\'|""".*?"""'
+    r'|"(?:\\.|[^"\\\n])*"'
+    r"|'(?:\\.|[^'\\\n])*'"
+    r'|`(?:\\.|[^`\\])*`'
+    r'|[{}();]',
+    re.DOTALL
+)
+
+
+def _line_starts(content: str, line_break: Union[str, re.Pattern] = '\n') -> List[int]:
+    """مواضع بداية الأسطر في المحتوى (لتحويل موضع إلى رقم سطر عبر bisect)"""
+    return [0, *(match.end() for match in re.finditer(line_break, content))]
+
+
+@dataclass
+class _CodeBlocks:
+    """مواضع الكتل والأقواس في محتوى JavaScript/Dart (خارج النصوص والتعليقات)"""
+    line_starts: List[int]              # بدايات الأسطر كما في splitlines
+    brace_pairs: List[Tuple[int, int]]  # أزواج { } مرتبة حسب موضع الفتح
+    brace_opens: List[int]              # مواضع الفتح في brace_pairs (للبحث الثنائي)
+    paren_closes: Dict[int, int]        # موضع "(" -> موضع ")" المقابل
+    semicolons: List[int]               # مواضع ";"
+    skipped_spans: List[Tuple[int, int]]  # النصوص والتعليقات (بداية، نهاية)
+
+
+def _scan_blocks(content: str) -> _CodeBlocks:
+    """
+    مسح خطي لأزواج الأقواس { } و ( ) والفواصل المنقوطة في المحتوى
+    
+    يتجاهل ما داخل النصوص والتعليقات. كتل { } غير المغلقة تمتد حتى نهاية المحتوى.
+    """
+    brace_pairs = []
+    paren_closes = {}
+    semicolons = []
+    skipped_spans = []
+    open_braces = []
+    open_parens = []
+    
+    for match in _BLOCK_SCAN_RE.finditer(content):
+        token = match.group()
+        if token == '{':
+            open_braces.append(match.start())
+        elif token == '}':
+            if open_braces:
+                brace_pairs.append((open_braces.pop(), match.start()))
+        elif token == '(':
+            open_parens.append(match.start())
+        elif token == ')':
+            if open_parens:
+                paren_closes[open_parens.pop()] = match.start()
+        elif token == ';':
+            semicolons.append(match.start())
+        else:
+            skipped_spans.append(match.span())
+    
+    brace_pairs.extend((open_offset, len(content) - 1) for open_offset in open_braces)
+    brace_pairs.sort()
+    
+    return _CodeBlocks(
+        line_starts=_line_starts(content, _LINE_BREAK_RE),
+        brace_pairs=brace_pairs,
+        brace_opens=[open_offset for open_offset, _ in brace_pairs],
+        paren_closes=paren_closes,
+        semicolons=semicolons,
+        skipped_spans=skipped_spans
+    )
+
+
+def _block_end_line(blocks: _CodeBlocks, offset: int, params_open: Optional[int] = None) -> Optional[int]:
+    """
+    رقم السطر (يبدأ من 1) الذي ينتهي عنده كيان يبدأ تعريفه عند offset
+    
+    Args:
+        blocks: نتيجة _scan_blocks للمحتوى
+        offset: موضع بداية تعريف الكيان
+        params_open: موضع "(" قائمة المعاملات للدوال؛ يُبحث عن الجسم بعد ")" المقابل
+            حتى لا تُعد كائنات القيم الافتراضية مثل (opts = {}) جسماً للدالة
+    
+    Returns:
+        سطر "}" المقابل لجسم الكيان، أو سطر ";" إذا سبقت أول "{" (تعريف بلا جسم
+        مثل تعريفات TypeScript المجردة)، أو None إذا لم يوجد أي منهما أو كان
+        التعريف نفسه داخل نص أو تعليق
+    """
+    span_idx = bisect.bisect_right(blocks.skipped_spans, (offset, float('inf'))) - 1
+    if span_idx >= 0 and offset < blocks.skipped_spans[span_idx][1]:
+        return None
+    
+    anchor = offset
+    if params_open is not None and params_open in blocks.paren_closes:
+        anchor = blocks.paren_closes[params_open] + 1
+    
+    idx = bisect.bisect_left(blocks.brace_opens, anchor)
+    semicolon_idx = bisect.bisect_left(blocks.semicolons, anchor)
+    semicolon = blocks.semicolons[semicolon_idx] if semicolon_idx < len(blocks.semicolons) else None
+    
+    if semicolon is not None and (idx == len(blocks.brace_opens) or semicolon < blocks.brace_opens[idx]):
+        end_offset = semicolon
+    elif idx < len(blocks.brace_opens):
+        end_offset = blocks.brace_pairs[idx][1]
+    else:
+        return None
+    
+    return bisect.bisect_right(blocks.line_starts, end_offset)
+
+
+@lru_cache(maxsize=32)
+def _py_block_end_re(indent_level: int) -> re.Pattern:
+    """نمط أول سطر لا يتجاوز مستوى تسلسله indent_level"""
+    return re.compile(rf'{_PY_LINE_START}(?!{_PY_SPACE}{{{indent_level + 1}}})')
+
+
 class CodeEntity:
     """تمثيل كيان برمجي (class, function, variable, etc.)"""
     
@@ -203,15 +388,22 @@ class CodeFile:
     
     def load_content(self) -> bool:
         """تحميل محتوى الملف وحساب قيمة hash"""
-        self.content = read_file(self.file_path)
-        if self.content is not None:
-            self.hash = calculate_file_hash(self.file_path)
-            if os.path.exists(self.file_path):
-                self.last_modified = os.path.getmtime(self.file_path)
-                self.file_size = os.path.getsize(self.file_path)
-                self.line_count = len(self.content.splitlines())
-            return True
-        return False
+        # قراءة واحدة للملف: النص وقيمة hash من البايتات نفسها
+        data = read_file_bytes(self.file_path)
+        if data is None:
+            self.content = None
+            return False
+        
+        self.content = decode_content(data)
+        self.hash = calculate_content_hash(data)
+        self.line_count = count_lines(self.content)
+        try:
+            stat_result = os.stat(self.file_path)
+            self.last_modified = stat_result.st_mtime
+            self.file_size = stat_result.st_size
+        except OSError:
+            pass
+        return True
     
     def save_content(self, new_content: str) -> bool:
         """حفظ محتوى جديد للملف"""
@@ -219,9 +411,10 @@ class CodeFile:
             self.content = new_content
             self.hash = calculate_file_hash(self.file_path)
             self.modified = True
-            self.last_modified = os.path.getmtime(self.file_path)
-            self.file_size = os.path.getsize(self.file_path)
-            self.line_count = len(new_content.splitlines())
+            stat_result = os.stat(self.file_path)
+            self.last_modified = stat_result.st_mtime
+            self.file_size = stat_result.st_size
+            self.line_count = count_lines(new_content)
             # إعادة تحليل الكيانات بعد التعديل
             self.parse_entities()
             return True
@@ -286,58 +479,71 @@ class CodeFile:
         if not self.content:
             return
         
-        lines = self.content.splitlines()
+        content = self.content
+        line_starts = _line_starts(content, _LINE_BREAK_RE)
         
-        # تحليل الاستيرادات
-        import_pattern = r'^import\s+(\w+(?:\.\w+)*)|^from\s+([.\w]+)\s+import'
-        for i, line in enumerate(lines):
-            match = re.search(import_pattern, line)
-            if match:
-                module = match.group(1) or match.group(2)
-                self.imports.append(module)
-                if '.' not in module and not module.startswith('.'):
-                    self.dependencies.add(module)
-        
-        # تحليل الفئات والدوال والمتغيرات
-        class_pattern = r'^class\s+(\w+)(?:\(([^)]*)\))?:'
-        function_pattern = r'^def\s+(\w+)\s*\('
-        method_pattern = r'^\s+def\s+(\w+)\s*\('
-        variable_pattern = r'^(\w+)\s*='
+        # لا يعد ما بعد فاصل السطر الأخير سطراً (كما في splitlines)
+        scan_end = len(content) - 1 if line_starts[-1] == len(content) else len(content)
         
         current_class = None
         current_function = None
         indent_level = -1  # مستوى التسلسل الهرمي الحالي
-        i = 0
+        pos = 0  # بداية أول سطر لم يُفحص مستوى تسلسله بعد
         
-        while i < len(lines):
-            line = lines[i]
+        def close_block(end_pos: int) -> None:
+            """إنهاء الكتلة الحالية عند أول سطر بين pos و end_pos مستوى تسلسله لا يتجاوز indent_level"""
+            nonlocal current_class, current_function, indent_level
+            if indent_level < 0:
+                return
+            
+            end_match = _py_block_end_re(indent_level).search(content, pos, end_pos)
+            if not end_match:
+                return
+            
+            line_start = end_match.start()
+            line_end = _LINE_BREAK_RE.search(content, line_start)
+            line = content[line_start:line_end.start() if line_end else len(content)]
             current_indent = len(line) - len(line.lstrip())
+            i = bisect.bisect_right(line_starts, line_start) - 1
             
-            # التحقق من مستوى التسلسل الهرمي
-            if indent_level >= 0 and current_indent <= indent_level:
-                # انتهاء الكتلة الحالية
-                if current_class and (not current_function or current_indent <= indent_level - 4):
-                    # تحديد نهاية الفئة
-                    current_class.end_line = i
-                    current_class = None
-                    indent_level = -1
-                elif current_function:
-                    # تحديد نهاية الدالة
-                    current_function.end_line = i
-                    current_function = None
-                    indent_level = -1
+            if current_class and (not current_function or current_indent <= indent_level - 4):
+                # تحديد نهاية الفئة
+                current_class.end_line = i
+                current_class = None
+            else:
+                # تحديد نهاية الدالة
+                current_function.end_line = i
+                current_function = None
+            indent_level = -1
+        
+        # مسح المحتوى كاملاً مرة واحدة بنمط يجمع الاستيرادات والفئات والدوال والطرق والمتغيرات
+        for match in _PY_SCAN_RE.finditer(content):
+            line_start = match.start()
             
-            # البحث عن تعريفات الفئات
-            class_match = re.search(class_pattern, line)
-            if class_match:
-                class_name = class_match.group(1)
-                class_parents = class_match.group(2) if class_match.group(2) else ""
+            # التحقق من مستوى التسلسل الهرمي للأسطر السابقة وسطر التعريف نفسه
+            close_block(match.end())
+            pos = match.end()
+            
+            kind = match.lastgroup
+            line_no = bisect.bisect_right(line_starts, line_start)
+            
+            if kind == "import":
+                # تحليل الاستيرادات
+                module = match.group("import_module") or match.group("from_module")
+                self.imports.append(module)
+                if '.' not in module and not module.startswith('.'):
+                    self.dependencies.add(module)
+            
+            elif kind == "class":
+                # تعريفات الفئات
+                class_name = match.group("class_name")
+                class_parents = match.group("class_parents") or ""
                 
                 class_entity = CodeEntity(
                     name=class_name,
                     entity_type="class",
                     file_path=self.file_path,
-                    start_line=i + 1
+                    start_line=line_no
                 )
                 
                 # إضافة المعلومات الإضافية
@@ -346,36 +552,32 @@ class CodeFile:
                 
                 self.entities.append(class_entity)
                 current_class = class_entity
-                indent_level = current_indent
-                i += 1
-                continue
+                indent_level = 0
             
-            # البحث عن تعريفات الدوال
-            function_match = re.search(function_pattern, line)
-            if function_match and not line.startswith(' '):
-                function_name = function_match.group(1)
+            elif kind == "function":
+                # تعريفات الدوال
                 function_entity = CodeEntity(
-                    name=function_name,
+                    name=match.group("function_name"),
                     entity_type="function",
                     file_path=self.file_path,
-                    start_line=i + 1
+                    start_line=line_no
                 )
                 
                 self.entities.append(function_entity)
                 current_function = function_entity
-                indent_level = current_indent
-                i += 1
-                continue
+                indent_level = 0
             
-            # البحث عن تعريفات الطرق (داخل فئة)
-            method_match = re.search(method_pattern, line)
-            if method_match and current_class:
-                method_name = method_match.group(1)
+            elif kind == "method":
+                # تعريفات الطرق (داخل فئة)
+                if not current_class:
+                    continue
+                
+                method_name = match.group("method_name")
                 method_entity = CodeEntity(
                     name=method_name,
                     entity_type="method",
                     file_path=self.file_path,
-                    start_line=i + 1
+                    start_line=line_no
                 )
                 
                 # إضافة خصائص إضافية
@@ -390,22 +592,19 @@ class CodeFile:
                 
                 current_class.add_child(method_entity)
                 current_function = method_entity
-                indent_level = current_indent
-                i += 1
-                continue
+                indent_level = len(match.group("method_indent"))
             
-            # البحث عن تعريفات المتغيرات العامة
-            variable_match = re.search(variable_pattern, line)
-            if variable_match and not line.startswith(' '):
-                variable_name = variable_match.group(1)
+            else:
+                # تعريفات المتغيرات العامة
+                variable_name = match.group("variable_name")
                 # تجاهل المتغيرات الداخلية والثوابت
                 if not variable_name.startswith('_') and not variable_name.isupper():
                     variable_entity = CodeEntity(
                         name=variable_name,
                         entity_type="variable",
                         file_path=self.file_path,
-                        start_line=i + 1,
-                        end_line=i + 1
+                        start_line=line_no,
+                        end_line=line_no
                     )
                     self.entities.append(variable_entity)
                 
@@ -414,9 +613,10 @@ class CodeFile:
                     "secret" in variable_name.lower() or 
                     "token" in variable_name.lower()):
                     # تنبيه حول مفاتيح API
-                    logger.warning(f"تم العثور على متغير يحتمل أن يكون مفتاح API: {variable_name} في {self.file_path}:{i+1}")
-            
-            i += 1
+                    logger.warning(f"تم العثور على متغير يحتمل أن يكون مفتاح API: {variable_name} في {self.file_path}:{line_no}")
+        
+        # التحقق من مستوى التسلسل الهرمي للأسطر المتبقية بعد آخر تعريف
+        close_block(scan_end)
     
     def _parse_javascript_entities(self) -> None:
         """تحليل كيانات JavaScript/TypeScript"""
@@ -425,28 +625,10 @@ class CodeFile:
         
         lines = self.content.splitlines()
         
-        # أنماط كشف الاستيرادات
-        import_patterns = [
-            r'import\s+.*\s+from\s+[\'"]([^\'"]+)[\'"]',  # ES6 import
-            r'const\s+\w+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)',  # CommonJS require
-            r'import\([\'"]([^\'"]+)[\'"]\)',  # Dynamic import
-        ]
-        
-        # أنماط كشف الكيانات
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+(\w+))?'
-        function_pattern = r'function\s+(\w+)\s*\('
-        const_pattern = r'const\s+(\w+)\s*='
-        let_pattern = r'let\s+(\w+)\s*='
-        var_pattern = r'var\s+(\w+)\s*='
-        
-        # أنماط خاصة بـ React
-        component_pattern = r'const\s+(\w+)\s*=\s*(?:React\.)?(?:memo|forwardRef|createClass)?\(?(?:\(\)|function\s*\([^)]*\)|\([^)]*\)\s*=>\s*)'
-        hook_pattern = r'function\s+use(\w+)\s*\('
-        
         # فحص الاستيرادات
         for i, line in enumerate(lines):
-            for pattern in import_patterns:
-                matches = re.findall(pattern, line)
+            for pattern in _JS_IMPORT_RES:
+                matches = pattern.findall(line)
                 for module in matches:
                     self.imports.append(module)
                     # استخراج اسم الحزمة الأساسي
@@ -470,14 +652,19 @@ class CodeFile:
         elif has_react:
             self.language = "react"
         
+        # مواضع الأسطر والكتل لتحديد نهايات الفئات والدوال
+        blocks = _scan_blocks(self.content)
+        line_starts = blocks.line_starts
+        
         # فحص الكيانات
         i = 0
         while i < len(lines):
             line = lines[i]
             line_stripped = line.strip()
+            line_offset = line_starts[i] + len(line) - len(line.lstrip())
             
             # فحص الفئات
-            class_match = re.search(class_pattern, line_stripped)
+            class_match = _JS_CLASS_RE.search(line_stripped)
             if class_match:
                 class_name = class_match.group(1)
                 parent_class = class_match.group(2)
@@ -498,19 +685,11 @@ class CodeFile:
                 
                 self.entities.append(class_entity)
                 
-                # محاولة تحديد نهاية الفئة
-                bracket_count = 0
-                for j in range(i, len(lines)):
-                    if "{" in lines[j]:
-                        bracket_count += lines[j].count("{")
-                    if "}" in lines[j]:
-                        bracket_count -= lines[j].count("}")
-                    if bracket_count == 0 and j > i:
-                        class_entity.end_line = j + 1
-                        break
+                # تحديد نهاية الفئة
+                class_entity.end_line = _block_end_line(blocks, line_offset + class_match.start())
             
             # فحص الدوال
-            function_match = re.search(function_pattern, line_stripped)
+            function_match = _JS_FN_RE.search(line_stripped)
             if function_match:
                 function_name = function_match.group(1)
                 
@@ -532,19 +711,15 @@ class CodeFile:
                 
                 self.entities.append(function_entity)
                 
-                # محاولة تحديد نهاية الدالة
-                bracket_count = 0
-                for j in range(i, len(lines)):
-                    if "{" in lines[j]:
-                        bracket_count += lines[j].count("{")
-                    if "}" in lines[j]:
-                        bracket_count -= lines[j].count("}")
-                    if bracket_count == 0 and j > i:
-                        function_entity.end_line = j + 1
-                        break
+                # تحديد نهاية الدالة
+                function_entity.end_line = _block_end_line(
+                    blocks,
+                    line_offset + function_match.start(),
+                    params_open=line_offset + function_match.end() - 1
+                )
             
             # فحص مكونات React
-            component_match = re.search(component_pattern, line_stripped)
+            component_match = _JS_COMPONENT_RE.search(line_stripped)
             if has_react and component_match:
                 component_name = component_match.group(1)
                 
@@ -560,26 +735,31 @@ class CodeFile:
                 self.entities.append(component_entity)
             
             # فحص المتغيرات
-            for pattern, var_type in [(const_pattern, "constant"), (let_pattern, "variable"), (var_pattern, "variable")]:
-                var_match = re.search(pattern, line_stripped)
-                if var_match:
-                    var_name = var_match.group(1)
-                    
-                    var_entity = CodeEntity(
-                        name=var_name,
-                        entity_type=var_type,
-                        file_path=self.file_path,
-                        start_line=i + 1,
-                        end_line=i + 1
-                    )
-                    
-                    # كشف مفاتيح API محتملة
-                    is_api_key = any(term in var_name.lower() for term in ["apikey", "api_key", "secret", "token", "password"])
-                    if is_api_key:
-                        var_entity.properties["is_sensitive"] = True
-                        logger.warning(f"تم العثور على متغير حساس محتمل: {var_name} في {self.file_path}:{i+1}")
-                    
-                    self.entities.append(var_entity)
+            # أول تعريف لكل كلمة مفتاحية في السطر (const ثم let ثم var)
+            var_matches = {}
+            for var_match in _JS_VAR_RE.finditer(line_stripped):
+                var_matches.setdefault(var_match.group(1), var_match)
+            for keyword, var_type in (("const", "constant"), ("let", "variable"), ("var", "variable")):
+                var_match = var_matches.get(keyword)
+                if not var_match:
+                    continue
+                var_name = var_match.group(2)
+                
+                var_entity = CodeEntity(
+                    name=var_name,
+                    entity_type=var_type,
+                    file_path=self.file_path,
+                    start_line=i + 1,
+                    end_line=i + 1
+                )
+                
+                # كشف مفاتيح API محتملة
+                is_api_key = any(term in var_name.lower() for term in ["apikey", "api_key", "secret", "token", "password"])
+                if is_api_key:
+                    var_entity.properties["is_sensitive"] = True
+                    logger.warning(f"تم العثور على متغير حساس محتمل: {var_name} في {self.file_path}:{i+1}")
+                
+                self.entities.append(var_entity)
             
             i += 1
     
@@ -590,19 +770,9 @@ class CodeFile:
         
         lines = self.content.splitlines()
         
-        # أنماط استيراد الحزم
-        import_pattern = r'import\s+[\'"]([^\'"]+)[\'"]'
-        
-        # أنماط كشف الكيانات
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+(\w+))?(?:\s+implements\s+([^{]+))?'
-        method_pattern = r'(?:@\w+\s+)*(?:void|Future|Widget|[\w<>]+)\s+(\w+)\s*\('
-        variable_pattern = r'(?:final|const|var|late)?\s+(?:[\w<>?]+)\s+(\w+)\s*='
-        widget_pattern = r'class\s+(\w+)\s+extends\s+(?:StatelessWidget|StatefulWidget)'
-        state_pattern = r'class\s+_(\w+)State\s+extends\s+State<(\w+)>'
-        
         # فحص الاستيرادات
         for i, line in enumerate(lines):
-            import_matches = re.findall(import_pattern, line)
+            import_matches = _DART_IMPORT_RE.findall(line)
             for module in import_matches:
                 self.imports.append(module)
                 # تحديد الحزم الخارجية
@@ -617,14 +787,19 @@ class CodeFile:
         if has_flutter:
             self.language = "flutter_dart"
         
+        # مواضع الأسطر والكتل لتحديد نهايات الفئات
+        blocks = _scan_blocks(self.content)
+        line_starts = blocks.line_starts
+        
         # فحص الكيانات
         i = 0
         while i < len(lines):
             line = lines[i]
             line_stripped = line.strip()
+            line_offset = line_starts[i] + len(line) - len(line.lstrip())
             
             # فحص الفئات
-            class_match = re.search(class_pattern, line_stripped)
+            class_match = _DART_CLASS_RE.search(line_stripped)
             if class_match:
                 class_name = class_match.group(1)
                 parent_class = class_match.group(2)
@@ -653,23 +828,16 @@ class CodeFile:
                 self.entities.append(class_entity)
                 
                 # البحث عن نهاية الفئة
-                bracket_count = 0
                 class_end = i
-                for j in range(i, len(lines)):
-                    if "{" in lines[j]:
-                        bracket_count += lines[j].count("{")
-                    if "}" in lines[j]:
-                        bracket_count -= lines[j].count("}")
-                    if bracket_count == 0 and j > i:
-                        class_end = j
-                        class_entity.end_line = j + 1
-                        break
+                class_entity.end_line = _block_end_line(blocks, line_offset + class_match.start())
+                if class_entity.end_line:
+                    class_end = class_entity.end_line - 1
                 
                 # البحث عن الطرق والمتغيرات داخل الفئة
                 current_class = class_entity
                 j = i + 1
                 while j < class_end:
-                    method_match = re.search(method_pattern, lines[j].strip())
+                    method_match = _DART_METHOD_RE.search(lines[j].strip())
                     if method_match:
                         method_name = method_match.group(1)
                         method_entity = CodeEntity(
@@ -684,7 +852,7 @@ class CodeFile:
                         
                         current_class.add_child(method_entity)
                     
-                    var_match = re.search(variable_pattern, lines[j].strip())
+                    var_match = _DART_VAR_RE.search(lines[j].strip())
                     if var_match:
                         var_name = var_match.group(1)
                         var_entity = CodeEntity(
@@ -700,8 +868,8 @@ class CodeFile:
                     j += 1
             
             # فحص خاص لـ Flutter Widgets وState
-            widget_match = re.search(widget_pattern, line_stripped)
-            state_match = re.search(state_pattern, line_stripped)
+            widget_match = _DART_WIDGET_RE.search(line_stripped)
+            state_match = _DART_STATE_RE.search(line_stripped)
             
             if has_flutter and widget_match:
                 widget_name = widget_match.group(1)
@@ -730,25 +898,17 @@ class CodeFile:
         
         lines = self.content.splitlines()
         
-        # أنماط تحليل PHP
-        namespace_pattern = r'namespace\s+([^;]+);'
-        use_pattern = r'use\s+([^;]+);'
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+(\w+))?(?:\s+implements\s+([^{]+))?'
-        function_pattern = r'function\s+(\w+)\s*\('
-        variable_pattern = r'(?:public|protected|private)(?:\s+static)?\s+\$(\w+)'
-        method_pattern = r'(?:public|protected|private)(?:\s+static)?\s+function\s+(\w+)\s*\('
-        
         # متغيرات تتبع السياق
         current_namespace = None
         current_class = None
         
         # تحليل الفضاء المسمى واستيرادات
         for i, line in enumerate(lines):
-            namespace_match = re.search(namespace_pattern, line)
+            namespace_match = _PHP_NAMESPACE_RE.search(line)
             if namespace_match:
                 current_namespace = namespace_match.group(1).strip()
             
-            use_match = re.search(use_pattern, line)
+            use_match = _PHP_USE_RE.search(line)
             if use_match:
                 import_path = use_match.group(1).strip()
                 self.imports.append(import_path)
@@ -770,7 +930,7 @@ class CodeFile:
             line = lines[i]
             
             # تحليل الفئات
-            class_match = re.search(class_pattern, line)
+            class_match = _PHP_CLASS_RE.search(line)
             if class_match:
                 class_name = class_match.group(1)
                 parent_class = class_match.group(2)
@@ -834,7 +994,7 @@ class CodeFile:
                     j_line = lines[j]
                     
                     # تحليل الطرق
-                    method_match = re.search(method_pattern, j_line)
+                    method_match = _PHP_METHOD_RE.search(j_line)
                     if method_match and current_class:
                         method_name = method_match.group(1)
                         method_entity = CodeEntity(
@@ -852,7 +1012,7 @@ class CodeFile:
                         current_class.add_child(method_entity)
                     
                     # تحليل المتغيرات
-                    var_match = re.search(variable_pattern, j_line)
+                    var_match = _PHP_PROPERTY_RE.search(j_line)
                     if var_match and current_class:
                         var_name = var_match.group(1)
                         var_entity = CodeEntity(
@@ -881,7 +1041,7 @@ class CodeFile:
                 continue
             
             # تحليل الدوال المستقلة
-            function_match = re.search(function_pattern, line)
+            function_match = _PHP_FN_RE.search(line)
             if function_match and not line.strip().startswith(('public', 'protected', 'private')):
                 function_name = function_match.group(1)
                 function_entity = CodeEntity(
@@ -905,16 +1065,9 @@ class CodeFile:
         
         lines = self.content.splitlines()
         
-        # أنماط تحليل HTML
-        title_pattern = r'<title>(.*?)</title>'
-        script_pattern = r'<script[^>]*src=["\']([^"\']+)["\']'
-        link_pattern = r'<link[^>]*href=["\']([^"\']+)["\']'
-        form_pattern = r'<form[^>]*(?:id=["\']([^"\']+)["\'])?'
-        div_id_pattern = r'<div[^>]*id=["\']([^"\']+)["\']'
-        
         # تحليل العنوان
         for i, line in enumerate(lines):
-            title_match = re.search(title_pattern, line)
+            title_match = _HTML_TITLE_RE.search(line)
             if title_match:
                 title = title_match.group(1)
                 title_entity = CodeEntity(
@@ -929,8 +1082,8 @@ class CodeFile:
         
         # تحليل الاستيرادات (JavaScript و CSS)
         for i, line in enumerate(lines):
-            script_matches = re.findall(script_pattern, line)
-            link_matches = re.findall(link_pattern, line)
+            script_matches = _HTML_SCRIPT_RE.findall(line)
+            link_matches = _HTML_LINK_RE.findall(line)
             
             for src in script_matches:
                 self.imports.append(src)
@@ -962,7 +1115,7 @@ class CodeFile:
         
         # تحليل النماذج
         for i, line in enumerate(lines):
-            form_match = re.search(form_pattern, line)
+            form_match = _HTML_FORM_RE.search(line)
             if form_match:
                 form_id = form_match.group(1) or f"form_{i}"
                 form_entity = CodeEntity(
@@ -984,7 +1137,7 @@ class CodeFile:
         
         # تحليل العناصر div المهمة
         for i, line in enumerate(lines):
-            div_matches = re.findall(div_id_pattern, line)
+            div_matches = _HTML_DIV_ID_RE.findall(line)
             for div_id in div_matches:
                 div_entity = CodeEntity(
                     name=div_id,
@@ -1001,14 +1154,9 @@ class CodeFile:
         
         lines = self.content.splitlines()
         
-        # أنماط تحليل CSS
-        selector_pattern = r'([^{]+){[^}]*}'
-        property_pattern = r'([a-zA-Z-]+)\s*:\s*([^;]+);'
-        
         i = 0
         while i < len(lines):
             line = lines[i]
-            selector_match = re.search(selector_pattern, line)
             
             # جمع أسطر متعددة للبحث عن selectors
             j = i
@@ -1017,7 +1165,7 @@ class CodeFile:
                 j += 1
                 full_line += " " + lines[j]
             
-            selectors_blocks = re.findall(selector_pattern, full_line)
+            selectors_blocks = _CSS_SELECTOR_RE.findall(full_line)
             
             for selector in selectors_blocks:
                 selector = selector.strip()
@@ -1041,7 +1189,7 @@ class CodeFile:
                     # البحث عن خصائص داخل الـ selector
                     properties = {}
                     for k in range(i, end_line + 1):
-                        property_matches = re.findall(property_pattern, lines[k])
+                        property_matches = _CSS_PROPERTY_RE.findall(lines[k])
                         for prop_name, prop_value in property_matches:
                             properties[prop_name.strip()] = prop_value.strip()
                     
@@ -1082,17 +1230,11 @@ class CodeFile:
         lines = self.content.splitlines()
         
         # حساب تعقيد McCabe
-        # (كل شرط if, for, while, case يزيد التعقيد)
-        cyclomatic_patterns = [
-            r'\bif\b', r'\belse\s+if\b', r'\bfor\b', r'\bwhile\b',
-            r'\bcase\b', r'\bcatch\b', r'\?', r'\|\|', r'\&\&'
-        ]
-        
         cyclomatic_complexity = 1  # القيمة الأساسية
         
         for line in lines:
-            for pattern in cyclomatic_patterns:
-                cyclomatic_complexity += len(re.findall(pattern, line))
+            for pattern in _CYCLOMATIC_RES:
+                cyclomatic_complexity += len(pattern.findall(line))
         
         complexity_metrics["cyclomatic_complexity"] = cyclomatic_complexity
         
@@ -0,0 +1,259 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+import analyzer
+import local_analysis
+from analyzer import (
+    AnalysisCache, AnalysisThread, APIThreadManager, LocalAnalyzer, SecurityAnalyzer, _CACHE_VERSION
+)
+
+
+ISSUES = [{"line": 3, "type": "security", "severity": "high"}]
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / "analysis")
+
+
+def _open(cache_file, **kwargs):
+    cache = AnalysisCache(cache_file, **kwargs)
+    assert cache.open()
+    return cache
+
+
+def _store(cache, key, issues, stored_at):
+    """تخزين نتيجة بوقت تخزين محدد"""
+    cache._db[f"v{_CACHE_VERSION}:{key}"] = (stored_at, issues)
+
+
+def test_miss_then_hit_after_set(cache_file):
+    cache = _open(cache_file)
+    assert cache.get("abc") is None
+    cache.set("abc", ISSUES)
+    assert cache.get("abc") == ISSUES
+    cache.close()
+
+
+def test_results_persist_across_reopen(cache_file):
+    cache = _open(cache_file)
+    cache.set("abc", ISSUES)
+    cache.close()
+    
+    cache = _open(cache_file)
+    assert cache.get("abc") == ISSUES
+    cache.close()
+
+
+def test_closed_cache_misses(cache_file):
+    cache = AnalysisCache(cache_file)
+    cache.set("abc", ISSUES)
+    assert cache.get("abc") is None
+
+
+def test_expired_entry_misses(cache_file):
+    cache = _open(cache_file, max_age=100)
+    _store(cache, "abc", ISSUES, time.time() - 200)
+    assert cache.get("abc") is None
+    cache.close()
+
+
+def test_old_hit_refreshes_timestamp(cache_file):
+    cache = _open(cache_file, max_age=100)
+    _store(cache, "abc", ISSUES, time.time() - 60)
+    assert cache.get("abc") == ISSUES
+    stored_at, _ = cache._db[f"v{_CACHE_VERSION}:abc"]
+    assert time.time() - stored_at < 10
+    cache.close()
+
+
+def test_entries_from_other_versions_miss(cache_file):
+    cache = _open(cache_file)
+    cache._db[f"v{_CACHE_VERSION - 1}:abc"] = (time.time(), ISSUES)
+    cache._db["abc"] = ISSUES
+    assert cache.get("abc") is None
+    cache.close()
+
+
+def test_prune_keeps_newest_entries(cache_file):
+    cache = _open(cache_file, max_entries=2, max_age=1000)
+    now = time.time()
+    _store(cache, "old", ISSUES, now - 30)
+    _store(cache, "mid", ISSUES, now - 20)
+    _store(cache, "new", ISSUES, now - 10)
+    _store(cache, "expired", ISSUES, now - 2000)
+    cache._db[f"v{_CACHE_VERSION - 1}:stale"] = (now, ISSUES)
+    cache.close()
+    
+    cache = _open(cache_file, max_entries=2, max_age=1000)
+    assert sorted(key for key in cache._db.keys() if key != "__meta__") == [
+        f"v{_CACHE_VERSION}:mid",
+        f"v{_CACHE_VERSION}:new",
+    ]
+    assert cache.get("old") is None
+    assert cache.get("new") == ISSUES
+    cache.close()
+
+
+class _SlowAnalyzer:
+    """محلل بطيء لاختبار إيقاف خيط التحليل"""
+    
+    def __init__(self, started):
+        self.started = started
+    
+    def analyze_file(self, file_path, content):
+        self.started.set()
+        time.sleep(0.05)
+        return []
+
+
+def test_cleanup_stops_running_analysis_thread():
+    import threading
+    
+    started = threading.Event()
+    files = [{"path": f"file{i}.py", "content": "x = 1\n"} for i in range(20)]
+    thread = AnalysisThread([_SlowAnalyzer(started)], files)
+    thread.start()
+    assert started.wait(5)
+    
+    start = time.monotonic()
+    remaining = APIThreadManager.cleanup_all_threads(timeout_ms=2000)
+    assert remaining == []
+    assert time.monotonic() - start < 1
+    assert thread.isFinished()
+
+
+SAMPLE_FILES = {
+    "app.py": "import os\nprint(os.name)\nos.system(cmd)\nexec(code)\n",
+    "page.html": "<img src='a.png'>\n<form method='get'>\n",
+    "main.js": "console.log(x);\ndocument.write(y);\nlocalStorage.setItem(k, v);\n",
+    "notes.txt": "print(\n",
+}
+
+
+def _sample_files(count):
+    names = sorted(SAMPLE_FILES)
+    return [
+        (i, {"path": f"dir{i}/{names[i % len(names)]}", "content": SAMPLE_FILES[names[i % len(names)]]})
+        for i in range(count)
+    ]
+
+
+def test_local_analysis_does_not_import_qt_or_api_clients():
+    code = (
+        "import sys, local_analysis\n"
+        "print(sorted(m for m in ('PySide6', 'api_clients', 'requests', 'openai', 'networkx') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(local_analysis.__file__), check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_worker_rebuilds_local_analyzers_by_name():
+    analyzers = [LocalAnalyzer(), SecurityAnalyzer()]
+    names = tuple(local_analysis._local_analyzer_name(a) for a in analyzers)
+    assert names == ("LocalAnalyzer", "LocalSecurityAnalyzer")
+    
+    local_analysis._init_analysis_worker()
+    for _, file_info in _sample_files(4):
+        assert local_analysis._analyze_in_worker(names, file_info) == \
+            local_analysis._analyze_one(file_info, analyzers)
+
+
+def test_process_pool_matches_sequential_analysis(monkeypatch):
+    analyzers = [LocalAnalyzer(), SecurityAnalyzer()]
+    files = _sample_files(40)
+    expected = {index: local_analysis._analyze_one(file_info, analyzers) for index, file_info in files}
+    
+    monkeypatch.setattr(analyzer, "_ANALYSIS_WORKERS", 2)
+    monkeypatch.setattr(analyzer, "_PROCESS_MIN_FILES", 10)
+    thread = AnalysisThread(analyzers, [])
+    try:
+        results = list(thread._analyze_files(files))
+    finally:
+        analyzer.shutdown_analysis_executor()
+    
+    assert [index for index, _ in results] == [index for index, _ in files]
+    assert dict(results) == expected
+
+
+def test_literal_prefilter_failure_disables_prefilter_only(monkeypatch):
+    expected = LocalAnalyzer().analyze_file("app.py", SAMPLE_FILES["app.py"])
+    assert expected
+    
+    def broken(items):
+        raise IndexError("unexpected parse tree layout")
+    
+    monkeypatch.setattr(local_analysis, "_sequence_literals", broken)
+    assert local_analysis._required_literals(r"print\(") is None
+    
+    analyzer_without_prefilter = LocalAnalyzer()
+    assert analyzer_without_prefilter._literals["python"] is None
+    assert analyzer_without_prefilter.analyze_file("app.py", SAMPLE_FILES["app.py"]) == expected
+
+
+def _per_line_issues(analyzer, rules_by_language, file_path, content, issue_type):
+    """النتائج المرجعية: كل قاعدة على كل سطر منفرداً (كما في التحليل قبل دمج الأنماط)"""
+    language = analyzer._detect_language(file_path)
+    return [
+        {
+            "file": file_path,
+            "line": i + 1,
+            "severity": rule["severity"],
+            "message": rule["message"],
+            "code": line.strip(),
+            "type": issue_type
+        }
+        for i, line in enumerate(content.split("\n"))
+        for rule in rules_by_language.get(language, ())
+        if rule["_re"].search(line)
+    ]
+
+
+SCAN_CASES = [
+    # قاعدتان على السطر نفسه
+    ("two_rules.py", "x = 1\nexec(os.system(cmd))\nprint(x)\n"),
+    # تطابق على السطر الأخير دون سطر جديد في النهاية
+    ("last_line.py", "import os\nx = 1\nprint(x)"),
+    ("last_line.js", "let a = 1;\nconsole.log(a)"),
+    # فئات منفية [^...] كان يمكن أن يمتد تطابقها عبر الأسطر
+    ("negated.html", "<img\nsrc='a.png'>\n<a\nhref='x'>\n<img src='b.png'>\n<form method='get'>"),
+    ("negated.py", "open(\npath, 'w')\nopen(path, 'w')\n"),
+    # أسطر فارغة وتطابقات متتالية ونهايات أسطر \r\n
+    ("mixed.py", "\n\nprint(1)\r\nprint(2)\r\n\n# TODO later\nexcept:\n"),
+    ("empty.php", ""),
+    ("nomatch.py", "x = 1\ny = 2\n"),
+]
+
+
+@pytest.mark.parametrize("file_path, content", SCAN_CASES)
+def test_fused_scan_matches_per_line_rules(file_path, content):
+    local = LocalAnalyzer()
+    security = SecurityAnalyzer()
+    
+    assert local.analyze_file(file_path, content) == \
+        _per_line_issues(local, local.rules, file_path, content, "quality")
+    assert security.analyze_file(file_path, content) == \
+        _per_line_issues(security, security.local_rules, file_path, content, "security")
+
+
+def test_fused_scan_reports_two_rules_on_one_line():
+    issues = LocalAnalyzer().analyze_file("two_rules.py", SCAN_CASES[0][1])
+    assert [(issue["line"], issue["message"]) for issue in issues if issue["line"] == 2] == [
+        (2, "استخدام exec لتنفيذ كود ديناميكي (خطر أمني محتمل)"),
+        (2, "استخدام os.system لتنفيذ أوامر النظام (خطر أمني محتمل)"),
+    ]
+
+
+def test_negated_classes_are_bounded_to_one_line():
+    assert local_analysis._line_bounded(r"<img[^>]+>") == r"<img[^\n>]+>"
+    assert local_analysis._line_bounded(r"a\[^b") == r"a\[^b"
+    
+    issues = LocalAnalyzer().analyze_file("negated.html", SCAN_CASES[3][1])
+    assert [issue["line"] for issue in issues] == [5]
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("PySide6")
+pytest.importorskip("requests")
+
+from api_clients import APIConfig, APIManager
+
+
+class _FakeClient:
+    def __init__(self, issues):
+        self.issues = issues
+    
+    def analyze_code(self, code, language):
+        return {"issues": [dict(issue) for issue in self.issues]}
+
+
+def test_multiple_providers_dedup_tolerates_non_string_messages(monkeypatch):
+    clients = {
+        "openai": _FakeClient([
+            {"line": 3, "message": ["قائمة", "رسائل"], "severity": "عالية"},
+            {"line": 5, "message": {"text": "قاموس"}, "severity": "منخفضة"},
+        ]),
+        "claude": _FakeClient([
+            {"line": "3", "message": ["قائمة", "رسائل"], "severity": "عالية"},
+            {"line": 7, "message": "نص", "severity": "متوسطة"},
+        ]),
+    }
+    manager = APIManager(APIConfig())
+    monkeypatch.setattr(manager, "get_available_providers", lambda: tuple(clients))
+    monkeypatch.setattr(manager, "get_client", lambda provider=None: clients[provider])
+    
+    result = manager.analyze_code_with_multiple_providers("x = 1", "python")
+    
+    assert [(issue["line"], issue["source"]) for issue in result["issues"]] == [
+        (3, "openai"), (7, "claude"), (5, "openai")
+    ]
+    assert result["stats"] == {"total_issues": 3, "providers_used": 2}
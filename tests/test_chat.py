@@ -0,0 +1,130 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("PySide6")
+pytest.importorskip("msgpack")
+
+from PySide6.QtWidgets import QApplication
+
+from api_clients import APIConfig
+from chat import ChatComponent, ChatRunnable, ChatSession, ChatWorker, _SOA_MIN_MESSAGES
+from utils import loads_json, save_json
+
+
+@pytest.fixture(scope="module", autouse=True)
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QApplication.instance() or QApplication([])
+
+
+def _component(project_dir):
+    return ChatComponent(APIConfig(), str(project_dir))
+
+
+def _session(message_count: int) -> ChatSession:
+    session = ChatSession(id="session_1", title="محادثة", created_at=1000.0)
+    for i in range(message_count):
+        session.add_message("user" if i % 2 == 0 else "assistant", f"رسالة {i}")
+    return session
+
+
+def _messages(session: ChatSession):
+    return [(msg.role, msg.content, msg.timestamp) for msg in session.messages]
+
+
+@pytest.mark.parametrize("message_count", [3, _SOA_MIN_MESSAGES + 5])
+def test_msgpack_session_round_trip(tmp_path, message_count):
+    session = _session(message_count)
+    component = _component(tmp_path)
+    component.current_session = session
+    assert component.save_current_session()
+    
+    sessions_dir = tmp_path / "_chat_sessions"
+    assert (sessions_dir / "session_1.msgp").is_file()
+    assert not (sessions_dir / "session_1.json").exists()
+    
+    reloaded = _component(tmp_path)
+    reloaded.load_all_sessions()
+    loaded = reloaded.load_session("session_1")
+    assert loaded is not None
+    assert loaded.title == session.title
+    assert loaded.created_at == session.created_at
+    assert _messages(loaded) == _messages(session)
+
+
+def test_json_session_is_migrated_to_msgpack(tmp_path):
+    session = _session(4)
+    sessions_dir = tmp_path / "_chat_sessions"
+    sessions_dir.mkdir()
+    assert save_json(session.to_dict(), str(sessions_dir / "session_1.json"))
+    
+    component = _component(tmp_path)
+    component.load_all_sessions()
+    assert [s.id for s in component.sessions] == ["session_1"]
+    assert (sessions_dir / "session_1.msgp").is_file()
+    assert not (sessions_dir / "session_1.json").exists()
+    
+    index = json.loads((sessions_dir / "_index.json").read_text(encoding="utf-8"))
+    assert index == [session.index_entry()]
+    
+    loaded = component.load_session("session_1")
+    assert _messages(loaded) == _messages(session)
+
+
+@pytest.mark.parametrize("message_count", [0, 3, _SOA_MIN_MESSAGES + 5])
+def test_to_json_bytes_matches_to_dict(message_count):
+    session = _session(message_count)
+    assert loads_json(session.to_json_bytes()) == session.to_dict()
+    
+    # الترميز التدريجي بعد إضافة رسائل جديدة
+    session.add_message("user", "رسالة إضافية")
+    assert loads_json(session.to_json_bytes()) == session.to_dict()
+
+
+def test_delete_session_removes_file_and_index_entry(tmp_path):
+    component = _component(tmp_path)
+    component.current_session = _session(2)
+    component._insert_session(component.current_session)
+    assert component.save_current_session()
+    
+    assert component.delete_session("session_1")
+    sessions_dir = tmp_path / "_chat_sessions"
+    assert not (sessions_dir / "session_1.msgp").exists()
+    assert json.loads((sessions_dir / "_index.json").read_text(encoding="utf-8")) == []
+
+
+def _start_without_pool(component, worker):
+    """تسجيل مهمة كما يفعل send_message دون تشغيلها في مجمع الخيوط"""
+    worker.finished.connect(component._on_worker_finished)
+    worker.error.connect(component._on_worker_error)
+    worker.done.connect(component._on_worker_done)
+    runnable = ChatRunnable(worker)
+    component._active_runnables[worker] = runnable
+    return runnable
+
+
+def test_canceled_runnable_already_dequeued_is_released(tmp_path):
+    component = _component(tmp_path)
+    worker = ChatWorker(APIConfig(), "مرحبا", [])
+    runnable = _start_without_pool(component, worker)
+    
+    # أُلغي العامل بعد أن أخذ المجمع المهمة وقبل أن تتحقق run من الإلغاء
+    worker.canceled = True
+    runnable.run()
+    
+    assert component._active_runnables == {}
+
+
+def test_finished_runnable_is_released(tmp_path, monkeypatch):
+    component = _component(tmp_path)
+    worker = ChatWorker(APIConfig(), "مرحبا", [])
+    monkeypatch.setattr(worker, "process", lambda: worker.finished.emit("أهلاً"))
+    received = []
+    component.message_received.connect(received.append)
+    
+    _start_without_pool(component, worker).run()
+    
+    assert component._active_runnables == {}
+    assert [message.content for message in received] == ["أهلاً"]
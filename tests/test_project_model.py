@@ -0,0 +1,98 @@
+import pytest
+
+pytest.importorskip("networkx")
+
+from project_model import CodeFile, _scan_blocks, _block_end_line
+
+
+def _function_end_line(content: str, name: str):
+    """نهاية الدالة name كما يحسبها محلل JavaScript"""
+    offset = content.index(f"function {name}")
+    params_open = content.index("(", offset)
+    return _block_end_line(_scan_blocks(content), offset, params_open=params_open)
+
+
+def _parse_js(content: str):
+    code_file = CodeFile("example.ts", "javascript")
+    code_file.content = content
+    code_file._parse_javascript_entities()
+    return {
+        (entity.name, entity.start_line): entity.end_line
+        for entity in code_file.entities
+        if entity.type in ("class", "function")
+    }
+
+
+def test_default_parameter_object_is_not_the_body():
+    content = "function a(opts = {}) {\n  return opts;\n}\n"
+    assert _function_end_line(content, "a") == 3
+
+
+def test_bodiless_overloads_end_at_semicolon():
+    content = (
+        "export function f(x: number): void;\n"
+        "export function f(\n"
+        "    x: string,\n"
+        "): void;\n"
+        "function g() {\n"
+        "  h();\n"
+        "}\n"
+    )
+    assert _parse_js(content) == {("f", 1): 1, ("f", 2): 4, ("g", 5): 7}
+
+
+def test_braces_in_strings_and_comments_are_ignored():
+    content = (
+        "class A extends B {\n"
+        "  m() { const s = \"}\"; // }\n"
+        "    /* { */ return `${x}`;\n"
+        "  }\n"
+        "}\n"
+    )
+    assert _parse_js(content) == {("A", 1): 5}
+
+
+def test_one_line_body_ends_on_same_line():
+    assert _parse_js("function f() { return 1; }\n\nfunction g() {}\n") == {("f", 1): 1, ("g", 3): 3}
+
+
+def test_match_inside_comment_has_no_end_line():
+    content = "// the hljs class gives blocks a color\nfunction g() {\n}\n"
+    blocks = _scan_blocks(content)
+    assert _block_end_line(blocks, content.index("class")) is None
+
+
+def test_unclosed_block_runs_to_end_of_file():
+    assert _function_end_line("function f() {\n  a();\n", "f") == 2
+
+
+def _parse_py(content: str):
+    code_file = CodeFile("example.py", "python")
+    code_file.content = content
+    code_file._parse_python_entities()
+    return [
+        (entity.name, entity.start_line, entity.end_line,
+         [(child.name, child.start_line, child.end_line) for child in entity.children])
+        for entity in code_file.entities
+    ]
+
+
+def test_python_lines_count_form_feeds_like_splitlines():
+    content = "import os\n\n\x0c\ndef a():\n    return 1\n\x0c\ndef b():\n    pass\n"
+    assert _parse_py(content) == [("a", 5, 6, []), ("b", 9, None, [])]
+
+
+def test_python_definitions_after_other_line_breaks():
+    content = (
+        "class C:\r\n"
+        "    def m(self):\r\n"
+        "        pass\r\n"
+        "\x0c\r\n"
+        "x = 1\u2028def f():\n"
+        "    pass\n"
+    )
+    assert _parse_py(content) == [
+        ("C", 1, 3, [("m", 2, None)]),
+        ("x", 6, 6, []),
+        ("f", 7, None, []),
+    ]
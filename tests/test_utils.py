@@ -0,0 +1,18 @@
+import math
+
+from utils import load_json
+
+
+def test_load_json_accepts_nan(tmp_path):
+    path = tmp_path / "pending.json"
+    path.write_bytes(b'{"score": NaN, "name": "\xd8\xa7"}')
+    data = load_json(str(path))
+    assert math.isnan(data["score"])
+    assert data["name"] == "ا"
+
+
+def test_load_json_invalid_or_missing_returns_none(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text("{", encoding="utf-8")
+    assert load_json(str(path)) is None
+    assert load_json(str(tmp_path / "missing.json")) is None
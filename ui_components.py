@@ -2595,6 +2595,7 @@ class ChatPanel(QWidget):
         super().__init__(parent)
         self.chat_history = []
         self.current_file = None
+        self._stream_start = None  # موضع بداية رد المساعد الجاري بثه (None عند عدم وجود بث)
         
         self._setup_ui()
     
@@ -2700,6 +2701,9 @@ class ChatPanel(QWidget):
             message: نص الرسالة
             is_code: هل الرسالة عبارة عن شفرة برمجية
         """
+        # إنهاء أي رد جارٍ بثه قبل إضافة رسالة جديدة بعده
+        self.end_stream()
+        
         # إضافة إلى السجل
         self.chat_history.append({
             "role": "user" if sender == "أنت" else "assistant",
@@ -2710,16 +2714,8 @@ class ChatPanel(QWidget):
         cursor = self.chat_display.textCursor()
         cursor.movePosition(QTextCursor.End)
         
-        # إنشاء تنسيق للمرسل
-        sender_format = QTextCharFormat()
-        sender_format.setFontWeight(QFont.Bold)
-        if sender == "أنت":
-            sender_format.setForeground(QColor("#0066cc"))
-        else:
-            sender_format.setForeground(QColor("#cc5500"))
-        
         # كتابة اسم المرسل
-        cursor.insertText(f"{sender}: ", sender_format)
+        cursor.insertText(f"{sender}: ", self._sender_format(sender))
         
         # كتابة الرسالة بتنسيق عادي
         message_format = QTextCharFormat()
@@ -2761,6 +2757,68 @@ class ChatPanel(QWidget):
         self.chat_display.setTextCursor(cursor)
         self.chat_display.ensureCursorVisible()
     
+    def _sender_format(self, sender: str) -> QTextCharFormat:
+        """تنسيق اسم المرسل"""
+        sender_format = QTextCharFormat()
+        sender_format.setFontWeight(QFont.Bold)
+        if sender == "أنت":
+            sender_format.setForeground(QColor("#0066cc"))
+        else:
+            sender_format.setForeground(QColor("#cc5500"))
+        return sender_format
+    
+    def append_stream_chunk(self, sender: str, chunk: str):
+        """
+        إلحاق جزء من رد يصل على دفعات برسالة الرد الجارية
+        
+        Args:
+            sender: المرسل
+            chunk: الجزء الجديد من نص الرد
+        """
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        
+        # بدء رسالة الرد عند أول جزء
+        if self._stream_start is None:
+            self._stream_start = cursor.position()
+            cursor.insertText(f"{sender}: ", self._sender_format(sender))
+        
+        cursor.insertText(chunk, QTextCharFormat())
+        
+        # تمرير العرض إلى الأسفل
+        self.chat_display.setTextCursor(cursor)
+        self.chat_display.ensureCursorVisible()
+    
+    def finish_stream(self, sender: str, message: str, is_code: bool = False):
+        """
+        استبدال الرد الجاري بثه بالرسالة الكاملة بعد تنسيقها
+        
+        Args:
+            sender: المرسل
+            message: نص الرد الكامل
+            is_code: هل الرسالة عبارة عن شفرة برمجية
+        """
+        if self._stream_start is not None:
+            cursor = self.chat_display.textCursor()
+            cursor.setPosition(self._stream_start)
+            cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+            self._stream_start = None
+        
+        self.add_message(sender, message, is_code)
+    
+    def end_stream(self):
+        """إنهاء الرد الجاري بثه مع إبقاء ما وصل منه (مثلاً عند حدوث خطأ)"""
+        if self._stream_start is None:
+            return
+        
+        self._stream_start = None
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertBlock()
+        cursor.insertBlock()
+        self.chat_display.setTextCursor(cursor)
+    
     def _send_message(self):
         """إرسال رسالة"""
         message = self.message_input.toPlainText().strip()
@@ -2815,6 +2873,7 @@ class ChatPanel(QWidget):
         """مسح المحادثة"""
         self.chat_display.clear()
         self.chat_history = []
+        self._stream_start = None
 
 
 class ResultPanel(QWidget):
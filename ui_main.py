@@ -358,6 +358,7 @@ class MainWindow(QMainWindow):
         
         # اتصالات مكون المحادثة
         self.chat_component.message_sent.connect(self._on_chat_message_sent_internal)
+        self.chat_component.message_chunk_received.connect(self._on_chat_chunk_received)
         self.chat_component.message_received.connect(self._on_chat_message_received)
         self.chat_component.error_occurred.connect(self._on_chat_error)
     
@@ -564,6 +565,10 @@ class MainWindow(QMainWindow):
         # إيقاف جميع المواضيع النشطة
         if hasattr(self, 'chat_widget') and self.chat_widget:
             self.chat_widget.stop_all_threads()
+        
+        # حفظ جلسة المحادثة المجدولة قبل الإغلاق
+        if hasattr(self, 'chat_component') and self.chat_component:
+            self.chat_component.flush_session_save()
             
         # إيقاف أي مواضيع تحليل نشطة
         if hasattr(self, 'analysis_threads'):
@@ -711,7 +716,9 @@ class MainWindow(QMainWindow):
             self.dependency_view_action.setEnabled(True)
             self.modifications_action.setEnabled(True)
             
-            # تحديث مكون المحادثة
+            # تحديث مكون المحادثة (بعد حفظ الجلسة المجدولة في المكون السابق)
+            if self.chat_component:
+                self.chat_component.flush_session_save()
             self.chat_component = ChatComponent(self.api_config, folder_path)
             self._setup_chat_connections()
             
@@ -734,6 +741,7 @@ class MainWindow(QMainWindow):
         """إعداد اتصالات مكون المحادثة"""
         # إعادة ربط إشارات المحادثة
         self.chat_component.message_sent.connect(self._on_chat_message_sent_internal)
+        self.chat_component.message_chunk_received.connect(self._on_chat_chunk_received)
         self.chat_component.message_received.connect(self._on_chat_message_received)
         self.chat_component.error_occurred.connect(self._on_chat_error)
         
@@ -1329,18 +1337,24 @@ class MainWindow(QMainWindow):
         # (تجنب الازدواجية)
         pass
     
+    def _on_chat_chunk_received(self, chunk: str):
+        """معالجة جزء جديد من رد المساعد أثناء البث"""
+        # إلحاق الجزء برسالة الرد الجارية في واجهة المحادثة
+        self.chat_widget.append_stream_chunk("assistant", chunk)
+    
     def _on_chat_message_received(self, message):
         """معالجة استلام رسالة من مكون المحادثة"""
-        # عرض الرسالة المستلمة في واجهة المحادثة
+        # استبدال الرد الجاري بثه بالرسالة الكاملة المنسقة
         is_code = "```" in message.content
-        self.chat_widget.add_message("assistant", message.content, is_code)
+        self.chat_widget.finish_stream("assistant", message.content, is_code)
         
         # الانتقال إلى تبويب المحادثة
         self.tabs.setCurrentWidget(self.chat_widget)
     
     def _on_chat_error(self, error: str):
         """معالجة خطأ في المحادثة"""
-        # عرض رسالة خطأ في واجهة المحادثة
+        # إنهاء الرد الجاري بثه وعرض رسالة خطأ في واجهة المحادثة
+        self.chat_widget.end_stream()
         self.chat_widget.add_system_message(f"حدث خطأ: {error}")
     
     def _on_analysis_started(self):
@@ -9,10 +9,18 @@ import json
 import hashlib
 import logging
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Tuple, Optional, Union, Set
 
+# مكتبة orjson (اختيارية) أسرع بكثير من json في القراءة والكتابة
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # إعداد التسجيل
 logging.basicConfig(
     level=logging.INFO,
@@ -43,6 +51,13 @@ DEFAULT_EXCLUDED_DIRS = [
     '.next', 'bin', 'obj', 'target', 'vendor'
 ]
 
+# ترتيب مستويات الخطورة (الأعلى خطورة أولاً)
+SEVERITY_RANK = {"عالية": 0, "متوسطة": 1, "منخفضة": 2}
+
+def severity_sort_key(issue: Dict[str, Any]) -> int:
+    """مفتاح ترتيب المشاكل حسب الخطورة"""
+    return SEVERITY_RANK.get(issue.get("severity", "متوسطة"), 3)
+
 def get_file_type(file_path: str) -> Optional[str]:
     """
     تحديد نوع الملف بناءً على الامتداد
@@ -59,6 +74,14 @@ def get_file_type(file_path: str) -> Optional[str]:
             return lang
     return None
 
+def _advise_sequential(f) -> None:
+    """إعلام نظام التشغيل بأن الملف سيقرأ بشكل تسلسلي (إذا كان النظام يدعم ذلك)"""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
 def read_file(file_path: str) -> Optional[str]:
     """
     قراءة محتوى الملف
@@ -71,6 +94,7 @@ def read_file(file_path: str) -> Optional[str]:
     """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
+            _advise_sequential(f)
             return f.read()
     except UnicodeDecodeError:
         try:
@@ -87,6 +111,45 @@ def read_file(file_path: str) -> Optional[str]:
         logger.error(f"خطأ في قراءة الملف {file_path}: {str(e)}")
         return None
 
+def read_file_bytes(file_path: str) -> Optional[bytes]:
+    """
+    قراءة محتوى الملف كبايتات دون فك ترميزه
+    
+    Args:
+        file_path: مسار الملف
+        
+    Returns:
+        محتوى الملف كبايتات أو None في حالة الخطأ
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            _advise_sequential(f)
+            return f.read()
+    except FileNotFoundError:
+        logger.error(f"الملف غير موجود: {file_path}")
+        return None
+    except Exception as e:
+        logger.error(f"خطأ في قراءة الملف {file_path}: {str(e)}")
+        return None
+
+def decode_content(data: bytes) -> str:
+    """
+    فك ترميز محتوى ملف مقروء كبايتات بنفس نتيجة read_file
+    
+    Args:
+        data: محتوى الملف كبايتات
+        
+    Returns:
+        محتوى الملف كنص بأسطر منتهية بـ \n
+    """
+    try:
+        content = data.decode('utf-8')
+    except UnicodeDecodeError:
+        content = data.decode('latin-1')
+    
+    # توحيد نهايات الأسطر كما يفعل فتح الملف في الوضع النصي
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
 def write_file(file_path: str, content: str) -> bool:
     """
     كتابة محتوى إلى ملف
@@ -179,6 +242,18 @@ def write_binary_file(file_path: str, content: bytes) -> bool:
         logger.error(f"خطأ في كتابة الملف الثنائي {file_path}: {str(e)}")
         return False
 
+def calculate_content_hash(data: bytes) -> str:
+    """
+    حساب القيمة المختصرة (hash) لمحتوى ملف مقروء كبايتات
+    
+    Args:
+        data: محتوى الملف كبايتات
+        
+    Returns:
+        قيمة MD5 hash للمحتوى
+    """
+    return hashlib.md5(data).hexdigest()
+
 def calculate_file_hash(file_path: str) -> Optional[str]:
     """
     حساب القيمة المختصرة (hash) للملف
@@ -191,7 +266,7 @@ def calculate_file_hash(file_path: str) -> Optional[str]:
     """
     try:
         with open(file_path, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
+            return calculate_content_hash(f.read())
     except FileNotFoundError:
         logger.error(f"الملف غير موجود: {file_path}")
         return None
@@ -240,6 +315,18 @@ def create_directory(directory_path: str) -> bool:
         logger.error(f"خطأ في إنشاء المجلد {directory_path}: {str(e)}")
         return False
 
+def ensure_dir(directory_path: str) -> bool:
+    """
+    التأكد من وجود مجلد وإنشاؤه إذا لم يكن موجوداً
+    
+    Args:
+        directory_path: مسار المجلد
+        
+    Returns:
+        True إذا كان المجلد موجوداً أو تم إنشاؤه، False في حالة الخطأ
+    """
+    return create_directory(directory_path)
+
 def delete_file(file_path: str) -> bool:
     """
     حذف ملف
@@ -497,13 +584,66 @@ def get_project_metadata(directory: str) -> Dict[str, Any]:
     
     return metadata
 
-def save_json(data: Any, file_path: str) -> bool:
+def write_bytes_atomic(file_path: str, data: bytes, durable: bool = False) -> None:
+    """
+    كتابة بايتات إلى ملف بشكل ذري (ملف مؤقت في نفس المجلد ثم إعادة تسمية)
+    
+    Args:
+        file_path: مسار الملف
+        data: البايتات المراد كتابتها
+        durable: استدعاء fsync قبل إعادة التسمية لضمان بقاء البيانات بعد انقطاع الطاقة
+    """
+    # اسم مؤقت فريد لكل عملية وخيط، حتى لا تتداخل عمليات الحفظ المتزامنة
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def dumps_json(data: Any, indent: bool = False) -> bytes:
+    """
+    ترميز البيانات إلى بايتات JSON بترميز UTF-8 (باستخدام orjson إذا كانت متوفرة)
+    
+    Args:
+        data: البيانات المراد ترميزها
+        indent: تنسيق الناتج بمسافتين بدلاً من الصيغة المضغوطة
+        
+    Returns:
+        بايتات JSON
+    """
+    if HAS_ORJSON:
+        try:
+            option = orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            # بيانات لا يدعمها orjson (مثل الأعداد الكبيرة جداً)، يتم استخدام json
+            pass
+    
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def save_json(data: Any, file_path: str, durable: bool = False) -> bool:
     """
     حفظ بيانات بصيغة JSON
     
+    يُكتب الملف بشكل ذري، فلا يبقى ملف مكتوب جزئياً عند حدوث خطأ أثناء الحفظ.
+    
     Args:
         data: البيانات المراد حفظها
         file_path: مسار الملف
+        durable: استدعاء fsync قبل استبدال الملف
         
     Returns:
         True إذا نجحت العملية، False في حالة الخطأ
@@ -513,14 +653,31 @@ def save_json(data: Any, file_path: str) -> bool:
         directory = os.path.dirname(file_path)
         if directory and not os.path.exists(directory):
             os.makedirs(directory, exist_ok=True)
-            
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        
+        write_bytes_atomic(file_path, dumps_json(data, indent=True), durable)
         return True
     except Exception as e:
         logger.error(f"خطأ في حفظ ملف JSON {file_path}: {str(e)}")
         return False
 
+def loads_json(data: Union[str, bytes]) -> Any:
+    """
+    تحليل نص أو بايتات JSON (باستخدام orjson إذا كانت متوفرة)
+    
+    Args:
+        data: نص JSON أو بايتات مرمزة بـ UTF-8
+        
+    Returns:
+        البيانات المحللة (يرفع json.JSONDecodeError عند فشل التحليل)
+    """
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson أكثر صرامة (مثل NaN)، يتم الرجوع إلى json للحفاظ على السلوك نفسه
+            pass
+    return json.loads(data)
+
 def load_json(file_path: str) -> Optional[Any]:
     """
     تحميل بيانات من ملف JSON
@@ -536,8 +693,9 @@ def load_json(file_path: str) -> Optional[Any]:
             logger.error(f"ملف JSON غير موجود: {file_path}")
             return None
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # loads_json يرجع إلى json عند رفض orjson للمحتوى (مثل NaN)
+        with open(file_path, 'rb') as f:
+            return loads_json(f.read())
     except json.JSONDecodeError:
         logger.error(f"خطأ في تنسيق ملف JSON {file_path}")
         return None
@@ -1080,6 +1238,24 @@ def change_extension(path: str, new_extension: str) -> str:
     
     return base + new_extension
 
+# فواصل الأسطر التي يعتمدها str.splitlines (\r\n تُعد فاصلاً واحداً)
+_LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+def count_lines(content: str) -> int:
+    """
+    عد أسطر نص دون تقسيمه إلى قائمة أسطر
+    
+    Args:
+        content: النص
+        
+    Returns:
+        عدد الأسطر، مطابق لـ len(content.splitlines())
+    """
+    if not content:
+        return 0
+    breaks = sum(content.count(char) for char in _LINE_BREAKS) - content.count("\r\n")
+    return breaks + (content[-1] not in _LINE_BREAKS)
+
 def count_lines_in_file(file_path: str) -> int:
     """
     عد أسطر الملف
@@ -1095,7 +1271,7 @@ def count_lines_in_file(file_path: str) -> int:
         if content is None:
             return 0
         
-        return len(content.splitlines())
+        return count_lines(content)
     except Exception as e:
         logger.error(f"خطأ في عد أسطر الملف {file_path}: {str(e)}")
         return 0